@@ -5,11 +5,77 @@ from Components.Element import cached
 from Components.Converter.Poll import Poll
 from os import path
 from sys import version_info
+from time import time
 
 WIDESCREEN = [1, 3, 4, 7, 8, 0xB, 0xC, 0xF, 0x10]
 
 PY3 = version_info[0] == 3
 
+# only used while the player sends no evVideoSizeChanged for the current service
+FALLBACK_POLL_INTERVAL = 5000
+
+FRAMERATE_FILES = ("/proc/stb/vmpeg/0/framerate", "/proc/stb/vmpeg/0/frame_rate", "/proc/stb/vmpeg/0/fallback_framerate")
+
+
+def _readProc(pathname, base=10):
+    try:
+        with open(pathname, "r") as f:
+            return int(f.read(), base)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+class VideoInfoSnapshot(object):
+    """
+    Decoder values for the playing service, shared by every EStalkerServiceInfo element.
+    Each proc file is read once per refresh, a refresh happens after a service event or fallback poll.
+    """
+
+    def __init__(self):
+        self.service = None
+        self.event = None
+        self.stamp = 0
+        self.stale = True
+        self.sized = False  # evVideoSizeChanged seen for this service
+        self.xres = self.yres = self.aspect = self.framerate = None
+
+    def invalidate(self, event):
+        now = time()
+        # every converter passes on the same event, only the first one counts
+        if event == self.event and now - self.stamp < 0.1:
+            return
+
+        self.event = event
+        self.stamp = now
+        self.stale = True
+
+        if event == iPlayableService.evStart:
+            self.sized = False
+        elif event == iPlayableService.evVideoSizeChanged:
+            self.sized = True
+
+    def get(self, info):
+        service = info.getInfoString(iServiceInformation.sServiceref)
+        if service != self.service:
+            self.service = service
+            self.stale = True
+
+        if self.stale:
+            self.stale = False
+            self.xres = _readProc("/proc/stb/vmpeg/0/xres", 16)
+            self.yres = _readProc("/proc/stb/vmpeg/0/yres", 16)
+            self.aspect = _readProc("/proc/stb/vmpeg/0/aspect")
+            self.framerate = None
+            for pathname in FRAMERATE_FILES:
+                if path.exists(pathname):
+                    self.framerate = _readProc(pathname)
+                    break
+
+        return self
+
+
+videoinfo = VideoInfoSnapshot()
+
 
 class EStalkerServiceInfo(Poll, Converter):
 
@@ -29,8 +95,8 @@ class EStalkerServiceInfo(Poll, Converter):
     def __init__(self, type):
         Poll.__init__(self)
         Converter.__init__(self, type)
-        self.poll_interval = 1000
-        self.poll_enabled = True
+        self.poll_interval = FALLBACK_POLL_INTERVAL
+        self.poll_enabled = not videoinfo.sized
         self.type, self.interesting_events = {
 
             "IsMultichannel": (self.IS_MULTICHANNEL, (iPlayableService.evUpdatedInfo,)),
@@ -64,49 +130,6 @@ class EStalkerServiceInfo(Poll, Converter):
             return info.getInfoString(what)
         return convert(v)
 
-    def _getProcVal(self, pathname, base=10):
-        val = None
-        try:
-            f = open(pathname, "r")
-            val = int(f.read(), base)
-            f.close()
-            if val >= 2 ** 31:
-                val -= 2 ** 32
-        except Exception as e:
-            print(e)
-            pass
-        return val
-
-    def _getVal(self, pathname, info, infoVal, base=10):
-        val = self._getProcVal(pathname, base=base)
-        return val if val is not None else info.getInfo(infoVal)
-
-    def _getValInt(self, pathname, info, infoVal, base=10, default=-1):
-        val = self._getVal(pathname, info, infoVal, base)
-        return val if val is not None else default
-
-    def _getValStr(self, pathname, info, infoVal, base=10, convert=lambda x: "%d" % x):
-        val = self._getProcVal(pathname, base=base)
-        return convert(val) if val is not None else self.getServiceInfoString(info, infoVal, convert)
-
-    def _getVideoHeight(self, info):
-        return self._getValInt("/proc/stb/vmpeg/0/yres", info, iServiceInformation.sVideoHeight, base=16)
-
-    def _getVideoHeightStr(self, info, convert=lambda x: "%d" % x if x > 0 else "?"):
-        return self._getValStr("/proc/stb/vmpeg/0/yres", info, iServiceInformation.sVideoHeight, base=16, convert=convert)
-
-    def _getVideoWidth(self, info):
-        return self._getValInt("/proc/stb/vmpeg/0/xres", info, iServiceInformation.sVideoWidth, base=16)
-
-    def _getVideoWidthStr(self, info, convert=lambda x: "%d" % x if x > 0 else "?"):
-        return self._getValStr("/proc/stb/vmpeg/0/xres", info, iServiceInformation.sVideoWidth, base=16, convert=convert)
-
-    def _getFrameRate(self, info):
-        return self._getValInt("/proc/stb/vmpeg/0/framerate", info, iServiceInformation.sFrameRate)
-
-    def _getFrameRateStr(self, info, convert=lambda x: "%d" % x if x > 0 else ""):
-        return self._getValStr("/proc/stb/vmpeg/0/framerate", info, iServiceInformation.sFrameRate, convert=convert)
-
     @cached
     def getBoolean(self):
         service = self.source.service
@@ -122,32 +145,11 @@ class EStalkerServiceInfo(Poll, Converter):
         video_width = int(info.getInfo(iServiceInformation.sVideoWidth))
         video_aspect = info.getInfo(iServiceInformation.sAspect)
 
-        if not video_height:
-            if path.exists("/proc/stb/vmpeg/0/yres"):
-                f = open("/proc/stb/vmpeg/0/yres", "r")
-                try:
-                    video_height = int(f.read(), 16)
-                except:
-                    pass
-                f.close()
-
-        if not video_width:
-            if path.exists("/proc/stb/vmpeg/0/xres"):
-                f = open("/proc/stb/vmpeg/0/xres", "r")
-                try:
-                    video_width = int(f.read(), 16)
-                except:
-                    pass
-                f.close()
-
-        if not video_aspect:
-            if path.exists("/proc/stb/vmpeg/0/aspect"):
-                f = open("/proc/stb/vmpeg/0/aspect", "r")
-                try:
-                    video_aspect = int(f.read())
-                except:
-                    pass
-                f.close()
+        if not (video_height and video_width and video_aspect):
+            snapshot = videoinfo.get(info)
+            video_height = video_height or snapshot.yres or 0
+            video_width = video_width or snapshot.xres or 0
+            video_aspect = video_aspect or snapshot.aspect
 
         if self.type in (self.IS_MULTICHANNEL, self.AUDIO_STEREO):
             audio = service.audioTracks()
@@ -216,14 +218,7 @@ class EStalkerServiceInfo(Poll, Converter):
             return ""
 
         if self.type == self.XRES:
-            video_width = None
-            if path.exists("/proc/stb/vmpeg/0/xres"):
-                f = open("/proc/stb/vmpeg/0/xres", "r")
-                try:
-                    video_width = int(f.read(), 16)
-                except:
-                    pass
-                f.close()
+            video_width = videoinfo.get(info).xres
             if not video_width:
                 try:
                     video_width = int(self.getServiceInfoString(info, iServiceInformation.sVideoWidth))
@@ -232,14 +227,7 @@ class EStalkerServiceInfo(Poll, Converter):
             return "%d" % video_width
 
         elif self.type == self.YRES:
-            video_height = None
-            if path.exists("/proc/stb/vmpeg/0/yres"):
-                f = open("/proc/stb/vmpeg/0/yres", "r")
-                try:
-                    video_height = int(f.read(), 16)
-                except:
-                    pass
-                f.close()
+            video_height = videoinfo.get(info).yres
             if not video_height:
                 try:
                     video_height = int(self.getServiceInfoString(info, iServiceInformation.sVideoHeight))
@@ -249,28 +237,7 @@ class EStalkerServiceInfo(Poll, Converter):
             return "%d" % video_height
 
         elif self.type == self.FRAMERATE:
-            video_rate = None
-            if path.exists("/proc/stb/vmpeg/0/framerate"):
-                f = open("/proc/stb/vmpeg/0/framerate", "r")
-                try:
-                    video_rate = int(f.read())
-                except:
-                    pass
-                f.close()
-            elif path.exists("/proc/stb/vmpeg/0/frame_rate"):
-                f = open("/proc/stb/vmpeg/0/frame_rate", "r")
-                try:
-                    video_rate = int(f.read())
-                except:
-                    pass
-                f.close()
-            elif path.exists("/proc/stb/vmpeg/0/fallback_framerate"):
-                f = open("/proc/stb/vmpeg/0/fallback_framerate", "r")
-                try:
-                    video_rate = int(f.read())
-                except:
-                    pass
-                f.close()
+            video_rate = videoinfo.get(info).framerate
 
             if not video_rate:
                 try:
@@ -294,54 +261,19 @@ class EStalkerServiceInfo(Poll, Converter):
             return -1
 
         if self.type == self.XRES:
-            video_width = None
-            if path.exists("/proc/stb/vmpeg/0/xres"):
-                f = open("/proc/stb/vmpeg/0/xres", "r")
-                try:
-                    video_width = int(f.read(), 16)
-                except:
-                    video_width = None
-                f.close()
+            video_width = videoinfo.get(info).xres
             if not video_width:
                 video_width = info.getInfo(iServiceInformation.sVideoWidth)
             return str(video_width)
 
         elif self.type == self.YRES:
-            video_height = None
-            if path.exists("/proc/stb/vmpeg/0/yres"):
-                f = open("/proc/stb/vmpeg/0/yres", "r")
-                try:
-                    video_height = int(f.read(), 16)
-                except:
-                    video_height = None
-                f.close()
+            video_height = videoinfo.get(info).yres
             if not video_height:
                 video_height = info.getInfo(iServiceInformation.sVideoHeight)
             return str(video_height)
 
         elif self.type == self.FRAMERATE:
-            video_rate = None
-            if path.exists("/proc/stb/vmpeg/0/framerate"):
-                f = open("/proc/stb/vmpeg/0/framerate", "r")
-                try:
-                    video_rate = int(f.read())
-                except:
-                    pass
-                f.close()
-            elif path.exists("/proc/stb/vmpeg/0/frame_rate"):
-                f = open("/proc/stb/vmpeg/0/frame_rate", "r")
-                try:
-                    video_rate = int(f.read())
-                except:
-                    pass
-                f.close()
-            elif path.exists("/proc/stb/vmpeg/0/fallback_framerate"):
-                f = open("/proc/stb/vmpeg/0/fallback_framerate", "r")
-                try:
-                    video_rate = int(f.read())
-                except:
-                    pass
-                f.close()
+            video_rate = videoinfo.get(info).framerate
 
             if not video_rate:
                 video_rate = info.getInfo(iServiceInformation.sFrameRate)
@@ -352,5 +284,14 @@ class EStalkerServiceInfo(Poll, Converter):
     value = property(getValue)
 
     def changed(self, what):
+        if what[0] == self.CHANGED_SPECIFIC:
+            videoinfo.invalidate(what[1])
+            if what[1] == iPlayableService.evVideoSizeChanged:
+                self.poll_enabled = False
+            elif what[1] == iPlayableService.evStart:
+                self.poll_enabled = True
+        elif what[0] == self.CHANGED_POLL:
+            videoinfo.invalidate(self.CHANGED_POLL)
+
         if what[0] != self.CHANGED_SPECIFIC or what[1] in self.interesting_events:
             Converter.changed(self, what)
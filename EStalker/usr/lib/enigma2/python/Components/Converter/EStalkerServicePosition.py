@@ -3,6 +3,61 @@ from Components.Converter.Converter import Converter
 from Components.Converter.Poll import Poll
 from enigma import iPlayableService
 from Components.Element import cached, ElementError
+from time import time
+from weakref import WeakKeyDictionary
+
+# poll intervals (ms). fast is only used while the position jumps (seek / trick mode),
+# slow while paused or when the stream has no length (live). Detailed keeps its 100ms while playing.
+INTERVAL_FAST = 100
+INTERVAL_DETAILED = 100
+INTERVAL_NORMAL = 500
+INTERVAL_SLOW = 3000
+INTERVAL_LENGTH = 5000
+
+SEEK_HOLD = 3  # seconds to stay fast after a jump
+
+
+class PositionSample(object):
+    """Position and length of one source, read once per tick however many converters show them."""
+    max_age = 0.05
+
+    def __init__(self):
+        self.stamp = 0
+        self.position = None
+        self.length = None
+        self.paused = False
+        self.seek_until = 0
+
+    def update(self, seek):
+        now = time()
+        if now - self.stamp < self.max_age:
+            return self
+
+        position = length = None
+        if seek is not None:
+            pos = seek.getPlayPosition()
+            position = 0 if pos[0] else pos[1]
+            l = seek.getLength()
+            length = 0 if l[0] else l[1]
+
+        if self.stamp and position is not None and self.position is not None:
+            moved = position - self.position
+            expected = (now - self.stamp) * 90000
+            self.paused = moved == 0
+            if moved < 0 or moved > expected * 1.5 + 90000:
+                self.seek_until = now + SEEK_HOLD
+
+        self.position = position
+        self.length = length
+        self.stamp = now
+        return self
+
+    @property
+    def seeking(self):
+        return time() < self.seek_until
+
+
+_samples = WeakKeyDictionary()
 
 
 class EStalkerServicePosition(Poll, Converter, object):
@@ -52,38 +107,50 @@ class EStalkerServicePosition(Poll, Converter, object):
         else:
             raise ElementError("type must be {Length|Position|Remaining|Gauge|Summary} with optional arguments {Negate|Detailed|ShowHours|ShowNoSeconds} for ServicePosition converter")
 
-        if self.detailed:
-            self.poll_interval = 100
-        elif self.type == self.TYPE_LENGTH or self.type == self.TYPE_VFD_LENGTH:
-            self.poll_interval = 2000
-        else:
-            self.poll_interval = 500
-
+        self.poll_interval = self.getInterval(None)
         self.poll_enabled = True
 
     def getSeek(self):
         s = self.source.service
         return s and s.seek()
 
+    def getSample(self):
+        try:
+            sample = _samples.get(self.source)
+            if sample is None:
+                sample = _samples[self.source] = PositionSample()
+        except TypeError:
+            # source can't be weak referenced, keep a private sample
+            sample = self.__dict__.setdefault("_sample", PositionSample())
+        return sample.update(self.getSeek())
+
+    def getInterval(self, sample):
+        if self.type in (self.TYPE_LENGTH, self.TYPE_VFD_LENGTH):
+            return INTERVAL_LENGTH
+        if sample is not None and sample.seeking:
+            return INTERVAL_FAST
+        if sample is not None and (sample.paused or not sample.length):
+            return INTERVAL_SLOW
+        return INTERVAL_DETAILED if self.detailed else INTERVAL_NORMAL
+
+    def poll(self):
+        interval = self.getInterval(self.getSample())
+        # setting poll_interval restarts the timer, so leave it alone while suspended (hidden)
+        if interval != self.poll_interval and not self.suspended:
+            self.poll_interval = interval
+        Poll.poll(self)
+
     @cached
     def getPosition(self):
-        seek = self.getSeek()
-        if seek is None:
+        if self.getSeek() is None:
             return None
-        pos = seek.getPlayPosition()
-        if pos[0]:
-            return 0
-        return pos[1]
+        return self.getSample().position
 
     @cached
     def getLength(self):
-        seek = self.getSeek()
-        if seek is None:
+        if self.getSeek() is None:
             return None
-        length = seek.getLength()
-        if length[0]:
-            return 0
-        return length[1]
+        return self.getSample().length
 
     @cached
     def getCutlist(self):
@@ -261,3 +328,8 @@ class EStalkerServicePosition(Poll, Converter, object):
 
         if time_refresh:
             self.downstream_elements.changed(what)
+
+        # a service event (start, seek status, eof...) may end a pause or slow phase, check again soon
+        if what[0] == self.CHANGED_SPECIFIC and not self.suspended and self.poll_interval > INTERVAL_NORMAL:
+            if self.type not in (self.TYPE_LENGTH, self.TYPE_VFD_LENGTH):
+                self.poll_interval = INTERVAL_NORMAL
@@ -37,6 +37,8 @@ from enigma import eWidget, eLabel, eTimer, ePoint, eSize, gFont, \
 from Components.Renderer.Renderer import Renderer
 from skin import parseColor, parseFont
 
+from collections import OrderedDict
+
 
 # scroll type:
 NONE = 0
@@ -52,6 +54,10 @@ BOTTOM = 3
 CENTER = 2
 BLOCK = 3
 
+# text size cache shared by all instances: (text, font, flags, direction, box) -> (width, height)
+METRICS_MAX = 256
+text_metrics = OrderedDict()
+
 
 class EStalkerRunningText(Renderer):
     def __init__(self):
@@ -61,6 +67,7 @@ class EStalkerRunningText(Renderer):
         self.soffset = (0, 0)
         self.txtflags = 0
         self.txtext = ""
+        self.srctext = None     # last text received from the source, unchanged text is not laid out again
         self.scroll_label = self.mTimer = self.mStartPoint = None
         self.X = self.Y = self.W = self.H = self.mStartDelay = 0
         self.mAlways = 1        # always move text
@@ -124,6 +131,7 @@ class EStalkerRunningText(Renderer):
                 self.txtflags |= RT_WRAP
 
         self.halign = valign = eLabel.alignLeft
+        fps = 0
         if self.skinAttributes:
             attribs = []
             for (attrib, value) in self.skinAttributes:
@@ -167,6 +175,8 @@ class EStalkerRunningText(Renderer):
                             self.mStep = retValue(val, 1, self.mStep)
                         elif opt == "steptime" and val:
                             self.mStepTimeout = retValue(val, 25, self.mStepTimeout)
+                        elif opt == "fps" and val:
+                            fps = retValue(val, 1, 0)
                         elif opt == "startdelay" and val:
                             self.mStartDelay = retValue(val, 0, self.mStartDelay)
                         elif opt == "pause" and val:
@@ -193,6 +203,12 @@ class EStalkerRunningText(Renderer):
             self.skinAttributes = attribs
         ret = Renderer.applySkin(self, desktop, screen)
 
+        if fps:
+            # fewer, larger steps at the same speed (pixels per second)
+            speed = abs(self.mStep) * 1000.0 / self.mStepTimeout
+            self.mStepTimeout = max(25, 1000 // min(fps, 40))
+            self.mStep = max(1, int(round(speed * self.mStepTimeout / 1000.0)))
+
         if self.mOneShot:
             self.mOneShot = max(self.mStepTimeout, self.mOneShot)
         if self.mLoopTimeout:
@@ -228,15 +244,21 @@ class EStalkerRunningText(Renderer):
         Renderer.connect(self, source)
 
     def changed(self, what):
+        if what[0] != self.CHANGED_CLEAR and self.mShown and self.instance:
+            if (self.source.text or "") == self.srctext:
+                # source re-emitted the same text, keep the current layout and scroll position
+                return
+
         if self.mTimer is not None:
             self.mTimer.stop()
         if what[0] == self.CHANGED_CLEAR:
             self.txtext = ""
+            self.srctext = None
             if self.instance:
                 self.scroll_label.setText("")
         else:
             if self.mShown:
-                self.txtext = self.source.text or ""
+                self.txtext = self.srctext = self.source.text or ""
                 if self.instance and not self.calcMoving():
                     self.scroll_label.resize(eSize(self.W, self.H))
                     self.moveLabel(self.X, self.Y)
@@ -244,6 +266,23 @@ class EStalkerRunningText(Renderer):
     def moveLabel(self, X, Y):
         self.scroll_label.move(ePoint(X - self.soffset[0], Y - self.soffset[1]))
 
+    def textSize(self):
+        key = (self.txtext, getattr(self.txfont, "family", ""), self.txfont.pointSize, self.txtflags, self.direction, self.W, self.H)
+        size = text_metrics.pop(key, None)
+
+        if size is None:
+            if self.direction in (LEFT, RIGHT) or not (self.txtflags & RT_WRAP):
+                self.scroll_label.resize(eSize(self.txfont.pointSize * len(self.txtext), self.H))  # stupid workaround, have no better idea right now...
+
+            text_size = self.scroll_label.calculateSize()
+            size = (text_size.width(), text_size.height())
+
+            if len(text_metrics) >= METRICS_MAX:
+                text_metrics.popitem(last=False)
+
+        text_metrics[key] = size
+        return size
+
     def calcMoving(self):
         self.X = self.Y = 0
         if not (self.txtflags & RT_WRAP):
@@ -256,12 +295,7 @@ class EStalkerRunningText(Renderer):
            self.scroll_label is None:
             return False
 
-        if self.direction in (LEFT, RIGHT) or not (self.txtflags & RT_WRAP):
-            self.scroll_label.resize(eSize(self.txfont.pointSize * len(self.txtext), self.H))  # stupid workaround, have no better idea right now...
-
-        text_size = self.scroll_label.calculateSize()
-        text_width = text_size.width()
-        text_height = text_size.height()
+        text_width, text_height = self.textSize()
 
         if self.direction in (LEFT, RIGHT) or not (self.txtflags & RT_WRAP):
             text_width += 10
@@ -386,6 +420,9 @@ class EStalkerRunningText(Renderer):
         return True
 
     def movingLoop(self):
+        if not self.mShown:
+            return
+
         if self.A <= self.P <= self.B:
             if self.direction in (LEFT, RIGHT):
                 self.moveLabel(self.P, self.Y)
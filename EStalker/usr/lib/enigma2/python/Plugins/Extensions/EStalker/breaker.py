@@ -0,0 +1,182 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Per host circuit breaker for the portal requests.
+# closed     requests go through, connection errors, timeouts and 502/504 answers are counted
+#            (500 and the 503 panels send to throttle bursts are answers from a live host)
+# open       after failure_threshold failures in a row (within failure_window seconds) requests fail
+#            at once, a background thread checks the host and half opens the circuit when it answers
+# half-open  one trial request goes through, success closes the circuit, failure opens it again
+#            for twice as long (up to max_open_seconds)
+# A dead portal then costs a few timeouts instead of one per request.
+
+import threading
+import time
+
+import requests
+
+from . import _
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+
+failure_threshold = 5
+failure_window = 30
+open_seconds = 5
+max_open_seconds = 120
+probe_timeout = 3
+
+# a half-open trial that never reported back (killed thread) stops blocking the host after this
+trial_timeout = 30
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker(object):
+    def __init__(self, host):
+        self.host = host
+        self.state = CLOSED
+        self.failures = 0
+        self.last_failure = 0
+        self.opened_at = 0
+        self.open_for = open_seconds
+        self.trial_started = 0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """True when a request to this host may go out now."""
+        with self.lock:
+            now = time.time()
+
+            if self.state == CLOSED:
+                return True
+
+            if self.state == OPEN:
+                if now - self.opened_at < self.open_for:
+                    return False
+                self.state = HALF_OPEN
+                self.trial_started = 0
+
+            if self.trial_started and now - self.trial_started < trial_timeout:
+                return False
+
+            self.trial_started = now
+            return True
+
+    def remaining(self):
+        with self.lock:
+            if self.state != OPEN:
+                return 0
+            return max(0, int(self.opened_at + self.open_for - time.time()) + 1)
+
+    def success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                print("[EStalker] {} is answering again, circuit closed".format(self.host))
+            self.state = CLOSED
+            self.failures = 0
+            self.open_for = open_seconds
+            self.trial_started = 0
+
+    def failure(self):
+        with self.lock:
+            now = time.time()
+
+            if self.state == HALF_OPEN:
+                self.open_for = min(self.open_for * 2, max_open_seconds)
+                self._open(now)
+                return
+
+            if self.state == OPEN:
+                return
+
+            if now - self.last_failure > failure_window:
+                self.failures = 0
+
+            self.failures += 1
+            self.last_failure = now
+
+            if self.failures >= failure_threshold:
+                self._open(now)
+
+    def _open(self, now):
+        # called with the lock held
+        self.state = OPEN
+        self.opened_at = now
+        self.trial_started = 0
+
+        print("[EStalker] {} is not answering, requests fail at once for {}s".format(self.host, self.open_for))
+
+        if not self.probing:
+            self.probing = True
+            thread = threading.Thread(target=self._probe)
+            thread.daemon = True
+            thread.start()
+
+    def _probe(self):
+        while True:
+            with self.lock:
+                wait = self.opened_at + self.open_for - time.time()
+
+            if wait > 0:
+                time.sleep(wait)
+
+            answered = False
+            try:
+                # any http answer means the host is back, the trial request decides the rest
+                r = requests.get(self.host, timeout=(probe_timeout, probe_timeout), verify=False, stream=True)
+                r.close()
+                answered = True
+            except Exception:
+                pass
+
+            with self.lock:
+                if self.state != OPEN:
+                    self.probing = False
+                    return
+
+                if answered:
+                    self.state = HALF_OPEN
+                    self.trial_started = 0
+                    self.probing = False
+                    return
+
+                self.open_for = min(self.open_for * 2, max_open_seconds)
+                self.opened_at = time.time()
+
+
+breakers = {}
+breakers_lock = threading.Lock()
+
+
+def host_of(url):
+    parsed = urlparse(url)
+    return "{}://{}".format(parsed.scheme or "http", parsed.netloc)
+
+
+def get_breaker(url):
+    host = host_of(url)
+    with breakers_lock:
+        breaker = breakers.get(host)
+        if breaker is None:
+            breaker = breakers[host] = CircuitBreaker(host)
+        return breaker
+
+
+def is_open(url):
+    """For screens that want to tell a dead portal apart from a bad answer."""
+    return get_breaker(url).state == OPEN
+
+
+def unreachable_message(url):
+    """Error text for screens when url failed because its host circuit is open, "" otherwise."""
+    breaker = get_breaker(url)
+    if breaker.state != OPEN:
+        return ""
+    return _("Portal not reachable, retrying in {} seconds.").format(breaker.remaining())
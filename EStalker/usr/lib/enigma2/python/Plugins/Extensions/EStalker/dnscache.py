@@ -0,0 +1,231 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# In process DNS cache. socket.getaddrinfo (requests / urllib3) and socket.gethostbyname (the twisted
+# threaded resolver behind Agent and downloadPage) are wrapped while the plugin is open, so every new
+# session, picon, cover and TMDB download reuses the last answer for a host. The originals are put back
+# when the main menu closes.
+# Only hosts the plugin itself talks to are cached (register, called by make_request, xtream_request and
+# netstats.track), lookups of other hosts go to the resolver unchanged.
+# getaddrinfo does not report the record TTL, answers are kept for ttl seconds. When the resolver fails
+# an answer up to stale_ttl seconds old is used instead. At most max_entries hosts are kept.
+# The portal hosts of playlists.json are resolved in the background when the plugin opens.
+
+import json
+import socket
+import threading
+import time
+
+from collections import OrderedDict
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+from .plugin import cfg, debugs
+
+
+ttl = 300
+stale_ttl = 86400
+
+max_entries = 256
+
+# host -> (expires, stale until, [(family, address)]), least recently used first
+entries = OrderedDict()
+entries_lock = threading.Lock()
+
+# hosts the plugin has asked for
+registered = set()
+
+_getaddrinfo = socket.getaddrinfo
+_gethostbyname = socket.gethostbyname
+
+installed = False
+
+
+def _is_address(host):
+    for family in (socket.AF_INET, getattr(socket, "AF_INET6", None)):
+        if family is None:
+            continue
+        try:
+            socket.inet_pton(family, host)
+            return True
+        except (socket.error, ValueError, AttributeError):
+            pass
+    return False
+
+
+def _cacheable(host):
+    if isinstance(host, bytes):
+        try:
+            host = host.decode("ascii")
+        except UnicodeDecodeError:
+            return None
+
+    if not host or host == "localhost" or _is_address(host):
+        return None
+
+    return host.lower().rstrip(".")
+
+
+def register(url):
+    """Marks the host of url as one of the plugin's, its lookups are cached from now on."""
+    try:
+        if isinstance(url, bytes):
+            url = url.decode("utf-8", "ignore")
+        name = _cacheable(urlparse(url).hostname or "")
+    except Exception:
+        return
+
+    if name and name not in registered and len(registered) < max_entries:
+        registered.add(name)
+
+
+def _lookup_name(host):
+    if not installed or not cfg.dnscache.value:
+        return None
+
+    name = _cacheable(host)
+    return name if name in registered else None
+
+
+def resolve(host):
+    """The addresses of host, from the cache while they are fresh. Raises socket.error like getaddrinfo."""
+    now = time.time()
+    with entries_lock:
+        entry = entries.get(host)
+        if entry:
+            entries.pop(host)
+            entries[host] = entry
+
+    if entry and now < entry[0]:
+        return entry[2]
+
+    try:
+        results = _getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        addresses = [(family, sockaddr[0]) for family, _type, _proto, _name, sockaddr in results]
+    except socket.error:
+        if entry and now < entry[1]:
+            if debugs:
+                print("[EStalker] resolver failed for {}, using the last answer".format(host))
+            return entry[2]
+        raise
+
+    if addresses:
+        with entries_lock:
+            entries.pop(host, None)
+            entries[host] = (now + ttl, now + stale_ttl, addresses)
+            while len(entries) > max_entries:
+                entries.popitem(last=False)
+
+    return addresses
+
+
+def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    name = _lookup_name(host)
+
+    # only plain tcp lookups are answered from the cache
+    if not name or type not in (0, socket.SOCK_STREAM) or proto not in (0, socket.IPPROTO_TCP) or flags:
+        return _getaddrinfo(host, port, family, type, proto, flags)
+
+    try:
+        port_number = int(port or 0)
+    except ValueError:
+        return _getaddrinfo(host, port, family, type, proto, flags)
+
+    result = []
+    for address_family, address in resolve(name):
+        if family not in (0, address_family):
+            continue
+
+        if address_family == socket.AF_INET:
+            sockaddr = (address, port_number)
+        else:
+            sockaddr = (address, port_number, 0, 0)
+
+        result.append((address_family, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", sockaddr))
+
+    if not result:
+        return _getaddrinfo(host, port, family, type, proto, flags)
+
+    return result
+
+
+def gethostbyname(host):
+    name = _lookup_name(host)
+    if not name:
+        return _gethostbyname(host)
+
+    for family, address in resolve(name):
+        if family == socket.AF_INET:
+            return address
+
+    return _gethostbyname(host)
+
+
+def install():
+    global installed
+    if installed:
+        return
+
+    socket.getaddrinfo = getaddrinfo
+    socket.gethostbyname = gethostbyname
+    installed = True
+
+
+def uninstall(*args):
+    """Gives the rest of enigma2 its own resolver back, called when the main menu closes."""
+    global installed
+    if not installed:
+        return
+
+    if socket.getaddrinfo is getaddrinfo:
+        socket.getaddrinfo = _getaddrinfo
+    if socket.gethostbyname is gethostbyname:
+        socket.gethostbyname = _gethostbyname
+    installed = False
+
+
+def playlist_hosts():
+    hosts = set()
+
+    try:
+        with open(cfg.playlists_json.value, "r") as f:
+            playlists = json.load(f)
+    except Exception:
+        return hosts
+
+    for playlist in playlists:
+        try:
+            playlist_info = playlist.get("playlist_info", {})
+            if playlist_info.get("valid", True) is False:
+                continue
+
+            for url in (playlist_info.get("host"), playlist_info.get("portal")):
+                name = _cacheable(urlparse(str(url or "")).hostname or "")
+                if name:
+                    hosts.add(name)
+                    register(str(url))
+        except Exception:
+            pass
+
+    return hosts
+
+
+def _preresolve(hosts):
+    for host in hosts:
+        try:
+            resolve(host)
+        except Exception:
+            pass
+
+
+def preresolve():
+    """Resolve the playlist hosts in a background thread, the first requests then find them cached."""
+    if not cfg.dnscache.value:
+        return
+
+    thread = threading.Thread(target=_preresolve, args=(playlist_hosts(),))
+    thread.daemon = True
+    thread.start()
@@ -11,6 +11,9 @@ import io
 import hashlib
 
 from . import estalker_globals as glob
+from . import netstats
+from . import ratelimit
+from .breaker import get_breaker
 from .utils import get_local_timezone
 
 try:
@@ -26,6 +29,10 @@ except ImportError:
     from urllib.parse import quote
 
 
+# 503 answers are retried after 1, 2 and 4 seconds, then the channel is given up
+max_retries = 3
+
+
 class EStalker_EPG_Short:
     def __init__(self, visible_ids, done_callback=None, partial_callback=None):
         # optional partial callback for immediate display
@@ -35,12 +42,25 @@ class EStalker_EPG_Short:
         self.epg_data = []
         self.responses_received = 0
         self.total_requests = len(visible_ids)
-        self.agent = Agent(reactor, contextFactory=contextFactory)
+        self.retries = {}
+        self.agent = Agent(reactor, contextFactory=contextFactory, connectTimeout=5)
         self.prepare()
 
     def download_single_epg(self, ch_id):
         url = self.portal + "?type=itv&action=get_short_epg&ch_id={}&limit=10&size=10".format(ch_id)
-        d = self.agent.request(b'GET', url.encode(), self.headers)
+
+        if not self.breaker.allow():
+            self.responses_received += 1
+            self.check_complete()
+            return
+
+        # lowest class but playback, retried once the bucket has room
+        wait = ratelimit.delay(url, ratelimit.EPG)
+        if wait > 0:
+            reactor.callLater(wait, self.download_single_epg, ch_id)
+            return
+
+        d = netstats.track(self.agent.request(b'GET', url.encode(), self.headers), url, "get_short_epg")
         d.addCallback(lambda response, ch_id=ch_id: self.handle_response(response, ch_id))
         d.addErrback(lambda failure, ch_id=ch_id: self.handle_error(failure, ch_id))
 
@@ -52,6 +72,7 @@ class EStalker_EPG_Short:
         host = str(glob.active_playlist["playlist_info"].get("host", "")).rstrip("/")
         mac = glob.active_playlist["playlist_info"].get("mac", "").upper()
         self.portal = glob.active_playlist["playlist_info"].get("portal", None)
+        self.breaker = get_breaker(self.portal or "")
         path_prefix = glob.active_playlist["playlist_info"].get("path_prefix", "")
         referer = host + path_prefix + "index.html"
         sn = hashlib.md5(mac.encode()).hexdigest().upper()[:13]
@@ -88,12 +109,28 @@ class EStalker_EPG_Short:
         for ch_id in self.visible_ids:
             self.download_single_epg(ch_id)
 
+    def retry(self, ch_id):
+        # False when the channel is out of retries, the caller counts it as done
+        attempt = self.retries.get(ch_id, 0)
+        if attempt >= max_retries:
+            return False
+
+        self.retries[ch_id] = attempt + 1
+        netstats.count_retry(self.portal, "get_short_epg")
+        try:
+            reactor.callLater(2 ** attempt, self.download_single_epg, ch_id)
+        except:
+            return False
+        return True
+
     def handle_response(self, response, ch_id):
-        if response.code == 503:
-            try:
-                reactor.callLater(1.0, self.download_single_epg, ch_id)
-            except:
-                pass
+        # 503 is the panel throttling the EPG burst, it is retried below and does not count against the host
+        if response.code in (502, 504):
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+
+        if response.code == 503 and self.retry(ch_id):
             return
 
         d = readBody(response)
@@ -143,12 +180,11 @@ class EStalker_EPG_Short:
         if hasattr(failure.value, 'response'):
             response = failure.value.response
             code = getattr(response, 'code', 0)
-            if code == 503 and ch_id is not None:
-                try:
-                    reactor.callLater(1.0, self.download_single_epg, ch_id)
-                except:
-                    pass
+            if code == 503 and ch_id is not None and self.retry(ch_id):
                 return
+        else:
+            # no answer at all, connection refused or timed out
+            self.breaker.failure()
 
         self.responses_received += 1
         self.check_complete()
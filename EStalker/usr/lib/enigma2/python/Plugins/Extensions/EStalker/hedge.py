@@ -0,0 +1,174 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Hedged requests for the calls a zap waits on (create_link, the short EPG of the focused channel).
+# The request is sent, and when no answer is in after the p90 latency seen for that portal the same
+# request is sent again on its own connection. The first usable answer is returned, the other one is
+# dropped when it comes in (a requests call can not be aborted from another thread, it ends on its
+# own timeout). Hedges are limited to hedge_ratio of the requests to a portal, so a slow portal does
+# not get twice the load.
+# create_link is only hedged on portals whose links carry no play token (xtream.plain_link), elsewhere
+# a second copy answered late would invalidate the token of the link already playing.
+# The caller waits at most answer_timeout seconds, on the UI thread call it through deferToThread.
+
+import threading
+import time
+from collections import deque
+
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+from .netstats import action_of, count_retry
+from .plugin import cfg, debugs
+from .ratelimit import PLAYBACK
+from .utils import make_request
+from .xtream import plain_link
+
+
+sample_size = 50
+min_samples = 10
+
+# hedge delay until min_samples answers have been timed, and the range the p90 is clamped to
+default_delay = 1.0
+min_delay = 0.1
+max_delay = 3.0
+
+# share of the requests that may be hedged, plus a few hedges allowed before there is any history
+hedge_ratio = 0.1
+hedge_allowance = 2
+
+# counters are halved past this, so the budget follows the recent requests
+counter_limit = 1000
+
+# longest wait for an answer, a little over the connect and read timeouts of make_request
+answer_timeout = 15
+
+# actions that hand out a token, only hedged when the portal's links are known to carry none
+token_actions = ("create_link",)
+
+
+class LatencyStats(object):
+    def __init__(self, host):
+        self.host = host
+        self.samples = deque(maxlen=sample_size)
+        self.requests = 0
+        self.hedges = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def delay(self):
+        with self.lock:
+            if len(self.samples) < min_samples:
+                return default_delay
+            ordered = sorted(self.samples)
+
+        p90 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+        return min(max_delay, max(min_delay, p90))
+
+    def count(self):
+        with self.lock:
+            self.requests += 1
+            if self.requests > counter_limit:
+                self.requests //= 2
+                self.hedges //= 2
+
+    def take_hedge(self):
+        with self.lock:
+            if self.hedges >= self.requests * hedge_ratio + hedge_allowance:
+                return False
+            self.hedges += 1
+            return True
+
+
+stats = {}
+stats_lock = threading.Lock()
+
+
+def get_stats(url):
+    parsed = urlparse(url)
+    host = "{}://{}".format(parsed.scheme or "http", parsed.netloc)
+
+    with stats_lock:
+        latency = stats.get(host)
+        if latency is None:
+            latency = stats[host] = LatencyStats(host)
+        return latency
+
+
+def _start(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+
+
+def hedged_request(url, headers, priority=PLAYBACK):
+    """make_request for a json GET, hedged when cfg.hedging is on. Blocks like make_request, None after answer_timeout."""
+    if not cfg.hedging.value or (action_of(url) in token_actions and not plain_link(url)):
+        return make_request(url, method="GET", headers=headers, params=None, response_type="json", priority=priority)
+
+    latency = get_stats(url)
+    latency.count()
+    answers = Queue()
+
+    deadline = time.time() + answer_timeout
+
+    def attempt(number):
+        started = time.time()
+        result = None
+        try:
+            # every attempt builds its own session, so the hedge does not share the slow connection
+            result = make_request(url, method="GET", headers=dict(headers or {}), params=None, response_type="json", priority=priority)
+            if result is not None:
+                latency.record(time.time() - started)
+        except Exception as e:
+            print("[EStalker] hedged request error:", e)
+        finally:
+            answers.put((number, result))
+
+    def answer():
+        try:
+            return answers.get(timeout=max(0, deadline - time.time()))
+        except Empty:
+            if debugs:
+                print("*** hedged request timed out ***", url)
+            return None, None
+
+    _start(attempt, 1)
+
+    try:
+        return answers.get(timeout=latency.delay())[1]
+    except Empty:
+        pass
+
+    if not latency.take_hedge():
+        return answer()[1]
+
+    if debugs:
+        print("*** hedging request ***", url)
+
+    count_retry(url)
+
+    _start(attempt, 2)
+
+    # the first answer that is not empty wins, an empty one waits for the other attempt
+    result = None
+    for i in range(2):
+        number, result = answer()
+        if number is None:
+            break
+        if result:
+            if debugs and number == 2:
+                print("*** hedged request won ***", url)
+            return result
+
+    return result
@@ -36,6 +36,7 @@ except ImportError:
 
 # Third-party imports
 from PIL import Image
+from twisted.internet import threads
 from twisted.web.client import downloadPage
 
 # Enigma2 components
@@ -53,8 +54,17 @@ from enigma import eServiceReference, eTimer
 from . import _
 from . import estalker_globals as glob
 from .plugin import cfg, common_path, dir_tmp, pythonVer, screenwidth, skin_directory, debugs, isDreambox
+from .pagestore import PageStore
 from .eStaticText import StaticText
+from .rows import LiveRow
+from .virtuallist import VirtualList
+from .breaker import is_open, unreachable_message
 from .utils import get_local_timezone, make_request, perform_handshake, get_profile_data
+from .profiler import profiled
+from .netstats import count_retry, track
+from .hedge import hedged_request
+from .ratelimit import EPG
+from .xtream import category_items, direct_link, learn_link
 
 # HTTPS twisted client hack
 try:
@@ -103,6 +113,7 @@ def clean_names(response):
     return response
 
 
+@profiled
 class EStalker_Live_Categories(Screen):
     ALLOW_SUSPEND = True
 
@@ -158,6 +169,7 @@ class EStalker_Live_Categories(Screen):
         self["page"] = StaticText("")
         self["listposition"] = StaticText("")
         self.itemsperpage = 14
+        self.virtual_list = VirtualList(self["main_list"], self.itemsperpage)
 
         self.filterresult = ""
         self.chosen_category = ""
@@ -393,7 +405,7 @@ class EStalker_Live_Categories(Screen):
         if response:
             for index, channel in enumerate(response):
                 if not isinstance(channel, dict) or not channel:
-                    self.list2.append([index, "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", False, False, False, None, None])
+                    self.list2.append(LiveRow.empty(index))
                     continue
 
                 stream_id = str(channel.get("id", ""))
@@ -461,7 +473,7 @@ class EStalker_Live_Categories(Screen):
                 20 = nextunixtime
                 """
 
-                self.list2.append([
+                self.list2.append(LiveRow(
                     index,
                     str(name),
                     str(stream_id),
@@ -483,7 +495,7 @@ class EStalker_Live_Categories(Screen):
                     hidden,
                     None,
                     None
-                ])
+                ))
 
         if self.firstlist:
             glob.originalChannelList2 = self.list2[:]
@@ -496,8 +508,8 @@ class EStalker_Live_Categories(Screen):
             print("*** downloadApiData ***", url)
 
         # Initialize storage for all data if it doesn't exist
-        if not hasattr(self, 'all_data') or not isinstance(self.all_data, list):
-            self.all_data = []
+        if not isinstance(getattr(self, 'all_data', None), PageStore):
+            self.all_data = PageStore()
 
         if "all_channels" not in url:
             paged_url = self._updateUrlPage(url, self.current_page)
@@ -530,24 +542,29 @@ class EStalker_Live_Categories(Screen):
                 if "all_channels" in url:
                     return current_page_data
 
-                if not hasattr(self, 'all_data') or not isinstance(self.all_data, list) or not self.all_data:
-                    self.all_data = [{} for _ in range(self.total_items)]
-
-                # Calculate the position where this page's data should be stored
-                start_index = (self.current_page - 1) * 14
+                if not isinstance(self.all_data, PageStore) or not self.all_data:
+                    self.all_data = PageStore()
 
-                # Insert the new data at the correct positions
-                for i, item in enumerate(current_page_data):
-                    self.all_data[start_index + i] = item
+                if current_page_data:
+                    self.all_data.add(self.current_page, current_page_data, self.total_items)
                     self.pages_downloaded.add(paged_url)
 
+                    if self.current_page == 1:
+                        items = category_items(paged_url, current_page_data, self.total_items, self.headers)
+                        if items:
+                            if pythonVer == 3 and glob.hassuperscript:
+                                clean_names({"js": {"data": items}})
+
+                            for page in self.all_data.fill(items):
+                                self.pages_downloaded.add(self._updateUrlPage(url, page))
+
                 return self.all_data
 
         except Exception as e:
             print("Error downloading API data for page {}: {}".format(self.current_page, e))
             return self.all_data
 
-        self.session.openWithCallback(self.back, MessageBox, _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
+        self.session.openWithCallback(self.back, MessageBox, unreachable_message(self.portal) or _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
         return self.all_data
 
     def _updateUrlPage(self, url, page):
@@ -561,18 +578,27 @@ class EStalker_Live_Categories(Screen):
         if debugs:
             print("*** createLink ***", url)
 
-        response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+        direct = direct_link(url)
+        if direct:
+            return {"js": {"cmd": direct}}
+
+        response = hedged_request(url, self.headers)
 
         if debugs:
             print("*** createlink response ***", response)
 
-        if not response and self.retry is False:
+        if not response and self.retry is False and not is_open(url):
             self.retry = True
+            count_retry(url)
             self.reauthorize()
-            response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+            response = hedged_request(url, self.headers)
             if debugs:
                 print("*** createlink response 2 ***", response)
 
+        if not response and is_open(url):
+            self.session.open(MessageBox, unreachable_message(url), MessageBox.TYPE_ERROR, timeout=3)
+
+        learn_link(url, response)
         return response
 
     def _get_profile(self, portal, mac, token, token_random, headers, param_mode):
@@ -675,11 +701,11 @@ class EStalker_Live_Categories(Screen):
 
         if self.list2:
             if self.chosen_category == "favourites":
-                self.main_list = [buildLiveStreamList(x[0], x[1], x[2], x[3], x[5], x[7], x[15], x[16], x[17], x[18], x[6]) for x in self.list2 if x[16] is True]
-                self.epglist = [buildEPGListEntry(x[0], x[1], x[9], x[10], x[11], x[12], x[13], x[14], x[18], x[19], x[20]) for x in self.list2 if x[16] is True]
+                self.main_list = self.virtual_list.entries([x for x in self.list2 if x.favourite is True], buildLiveStreamRow)
+                self.epglist = [buildEPGListEntry(x.index, x.name, x.nowtime, x.nowtitle, x.nowdesc, x.nexttime, x.nexttitle, x.nextdesc, x.hidden, x.nowunixtime, x.nextunixtime) for x in self.list2 if x.favourite is True]
             else:
-                self.main_list = [buildLiveStreamList(x[0], x[1], x[2], x[3], x[5], x[7], x[15], x[16], x[17], x[18], x[6]) for x in self.list2 if x[18] is False]
-                self.epglist = [buildEPGListEntry(x[0], x[1], x[9], x[10], x[11], x[12], x[13], x[14], x[18], x[19], x[20]) for x in self.list2 if x[18] is False]
+                self.main_list = self.virtual_list.entries([x for x in self.list2 if x.hidden is False], buildLiveStreamRow)
+                self.epglist = [buildEPGListEntry(x.index, x.name, x.nowtime, x.nowtitle, x.nowdesc, x.nexttime, x.nexttitle, x.nextdesc, x.hidden, x.nowunixtime, x.nextunixtime) for x in self.list2 if x.hidden is False]
 
         self["main_list"].setList(self.main_list)
         self["epg_list"].setList(self.epglist)
@@ -849,9 +875,9 @@ class EStalker_Live_Categories(Screen):
 
                 if scheme == "https" and sslverify:
                     sniFactory = SNIFactory(domain)
-                    downloadPage(desc_image, temp, sniFactory, timeout=2).addCallback(self.resizeImage).addErrback(self.loadDefaultImage)
+                    track(downloadPage(desc_image, temp, sniFactory, timeout=2), desc_image, "images", temp).addCallback(self.resizeImage).addErrback(self.loadDefaultImage)
                 else:
-                    downloadPage(desc_image, temp, timeout=2).addCallback(self.resizeImage).addErrback(self.loadDefaultImage)
+                    track(downloadPage(desc_image, temp, timeout=2), desc_image, "images", temp).addCallback(self.resizeImage).addErrback(self.loadDefaultImage)
             except Exception:
                 self.loadDefaultImage()
 
@@ -1291,7 +1317,7 @@ class EStalker_Live_Categories(Screen):
         if self["main_list"].getCurrent():
             current_index = self["main_list"].getIndex()
             glob.nextlist[-1]["index"] = current_index
-            glob.currentchannellist = self.main_list[:]
+            glob.currentchannellist = self.virtual_list.materialize(self.main_list)[:]
             glob.currentchannellistindex = current_index
 
             if self.level == 1:
@@ -1395,12 +1421,13 @@ class EStalker_Live_Categories(Screen):
 
                     def update_channel_icons_and_list():
                         for channel in self.list2:
-                            channel[17] = (channel[2] == stream_id)
+                            if channel.loaded:
+                                channel.watching = (channel.stream_id == stream_id)
 
                         if self.chosen_category == "favourites":
-                            self.main_list = [buildLiveStreamList(x[0], x[1], x[2], x[3], x[5], x[7], x[15], x[16], x[17], x[18], x[6]) for x in self.list2 if x[16] is True]
+                            self.main_list = self.virtual_list.entries([x for x in self.list2 if x.favourite is True], buildLiveStreamRow)
                         else:
-                            self.main_list = [buildLiveStreamList(x[0], x[1], x[2], x[3], x[5], x[7], x[15], x[16], x[17], x[18], x[6]) for x in self.list2 if x[18] is False]
+                            self.main_list = self.virtual_list.entries([x for x in self.list2 if x.hidden is False], buildLiveStreamRow)
 
                         self["main_list"].setList(self.main_list)
                         self.setIndex()
@@ -1460,21 +1487,19 @@ class EStalker_Live_Categories(Screen):
         if self["main_list"].getCurrent() and self.list2:
             # Clear all watching flags
             for channel in self.list2:
-                channel[17] = False
+                if channel.loaded:
+                    channel.watching = False
 
             # Set watching for currently active channel index
             try:
-                self.list2[idx][17] = True
+                self.list2[idx].watching = True
             except:
                 pass
 
             if self.chosen_category == "favourites":
-                self.main_list = [
-                    buildLiveStreamList(x[0], x[1], x[2], x[3], x[5], x[7], x[15], x[16], x[17], x[18], x[6])for x in self.list2 if x[16] is True
-                ]
+                self.main_list = self.virtual_list.entries([x for x in self.list2 if x.favourite is True], buildLiveStreamRow)
             else:
-                self.main_list = [
-                    buildLiveStreamList(x[0], x[1], x[2], x[3], x[5], x[7], x[15], x[16], x[17], x[18], x[6]) for x in self.list2 if x[18] is False]
+                self.main_list = self.virtual_list.entries([x for x in self.list2 if x.hidden is False], buildLiveStreamRow)
 
             self["main_list"].setList(self.main_list)
 
@@ -1714,79 +1739,95 @@ class EStalker_Live_Categories(Screen):
                 self["epg_list"].setList([])
 
                 if self.level == 2:
-                    try:
-                        stream_id = self["main_list"].getCurrent()[4]
-                        url = self.portal + "?type=itv&action=get_short_epg&ch_id={}&limit=10&size=10".format(stream_id)
-
-                        response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
-
-                        listings = []
-
-                        if response:
-                            listings = response.get("js", [])
-
-                        if listings:
-                            first_start = listings[0].get("start_timestamp", 0)
-                            first_start_dt = datetime.utcfromtimestamp(first_start)
+                    stream_id = self["main_list"].getCurrent()[4]
+                    url = self.portal + "?type=itv&action=get_short_epg&ch_id={}&limit=10&size=10".format(stream_id)
 
-                            now = datetime.now()
+                    # fetched in a worker thread, the hedged request waits for its answers
+                    d = threads.deferToThread(hedged_request, url, self.headers, EPG)
+                    d.addCallback(self.shortEPGResponse, stream_id)
+                    d.addErrback(self.shortEPGFailed)
+            else:
+                self["epg_short_list"].setList([])
+                self.selectedlist = self["main_list"]
+                self.buildLists()
 
-                            self.epgshortlist = []
-                            duplicatecheck = []
+    def shortEPGResponse(self, response, stream_id):
+        # the short EPG was closed, or the list moved on, while the request was out
+        if not self.showingshortEPG:
+            return
 
-                            for index, listing in enumerate(listings):
-                                try:
-                                    title = listing.get("name", "")
-                                    description = listing.get("descr", "")
-                                    t_time = listing.get("t_time")
-                                    t_time_to = listing.get("t_time_to")
+        current = self["main_list"].getCurrent()
+        if self.level != 2 or not current or current[4] != stream_id:
+            self.showingshortEPG = False
+            return
 
-                                    if not t_time or not t_time_to:
-                                        continue
+        try:
+            listings = []
 
-                                    # Build datetime objects using the date from first_start_dt and t_time fields
-                                    date_base = first_start_dt.date()
-                                    start_datetime = datetime.strptime("{} {}".format(date_base, t_time), "%Y-%m-%d %H:%M")
-                                    end_datetime = datetime.strptime("{} {}".format(date_base, t_time_to), "%Y-%m-%d %H:%M")
+            if response:
+                listings = response.get("js", [])
 
-                                    # If t_time_to is before t_time, assume it passes midnight
-                                    if end_datetime < start_datetime:
-                                        end_datetime += timedelta(days=1)
+            if listings:
+                first_start = listings[0].get("start_timestamp", 0)
+                first_start_dt = datetime.utcfromtimestamp(first_start)
 
-                                    epg_date_all = start_datetime.strftime("%a %d/%m")
-                                    epg_time_all = "{} - {}".format(start_datetime.strftime("%H:%M"), end_datetime.strftime("%H:%M"))
+                now = datetime.now()
 
-                                    if [epg_date_all, epg_time_all] not in duplicatecheck and end_datetime >= now:
-                                        duplicatecheck.append([epg_date_all, epg_time_all])
-                                        self.epgshortlist.append(buildShortEPGListEntry(
-                                            str(epg_date_all), str(epg_time_all), str(title), str(description),
-                                            index, start_datetime, end_datetime,
-                                            int(start_datetime.strftime("%s")), int(end_datetime.strftime("%s"))
-                                        ))
+                self.epgshortlist = []
+                duplicatecheck = []
 
-                                except Exception as e:
-                                    print("Error processing short EPG entry using t_time:", e)
+                for index, listing in enumerate(listings):
+                    try:
+                        title = listing.get("name", "")
+                        description = listing.get("descr", "")
+                        t_time = listing.get("t_time")
+                        t_time_to = listing.get("t_time_to")
+
+                        if not t_time or not t_time_to:
+                            continue
+
+                        # Build datetime objects using the date from first_start_dt and t_time fields
+                        date_base = first_start_dt.date()
+                        start_datetime = datetime.strptime("{} {}".format(date_base, t_time), "%Y-%m-%d %H:%M")
+                        end_datetime = datetime.strptime("{} {}".format(date_base, t_time_to), "%Y-%m-%d %H:%M")
+
+                        # If t_time_to is before t_time, assume it passes midnight
+                        if end_datetime < start_datetime:
+                            end_datetime += timedelta(days=1)
+
+                        epg_date_all = start_datetime.strftime("%a %d/%m")
+                        epg_time_all = "{} - {}".format(start_datetime.strftime("%H:%M"), end_datetime.strftime("%H:%M"))
+
+                        if [epg_date_all, epg_time_all] not in duplicatecheck and end_datetime >= now:
+                            duplicatecheck.append([epg_date_all, epg_time_all])
+                            self.epgshortlist.append(buildShortEPGListEntry(
+                                str(epg_date_all), str(epg_time_all), str(title), str(description),
+                                index, start_datetime, end_datetime,
+                                int(start_datetime.strftime("%s")), int(end_datetime.strftime("%s"))
+                            ))
 
-                            self["epg_short_list"].setList(self.epgshortlist)
-                            instance = self["epg_short_list"].master.master.instance
-                            instance.setSelectionEnable(1)
+                    except Exception as e:
+                        print("Error processing short EPG entry using t_time:", e)
 
-                            self["progress"].hide()
-                            self["key_yellow"].setText("")
-                            self["key_blue"].setText("")
-                            self["key_epg"].setText("")
+                self["epg_short_list"].setList(self.epgshortlist)
+                instance = self["epg_short_list"].master.master.instance
+                instance.setSelectionEnable(1)
 
-                            self.selectedlist = self["epg_short_list"]
+                self["progress"].hide()
+                self["key_yellow"].setText("")
+                self["key_blue"].setText("")
+                self["key_epg"].setText("")
 
-                        else:
-                            self.showingshortEPG = not self.showingshortEPG
+                self.selectedlist = self["epg_short_list"]
 
-                    except Exception as e:
-                        print("Error fetching short EPG:", e)
             else:
-                self["epg_short_list"].setList([])
-                self.selectedlist = self["main_list"]
-                self.buildLists()
+                self.showingshortEPG = not self.showingshortEPG
+        except Exception as e:
+            print("Error fetching short EPG:", e)
+
+    def shortEPGFailed(self, failure=None):
+        print("Error fetching short EPG:", failure)
+        self.showingshortEPG = False
 
     def displayShortEPG(self):
         if debugs:
@@ -1862,7 +1903,7 @@ class EStalker_Live_Categories(Screen):
         epgoffset_sec = 0
 
         for channel in self.list2:
-            epg_channel_id = channel[4]
+            epg_channel_id = channel.epg_channel_id
 
             if epg_channel_id in self.short_epg_results:
                 events = self.short_epg_results[epg_channel_id]
@@ -1888,10 +1929,10 @@ class EStalker_Live_Categories(Screen):
                     next_entry = events[index + 1] if (index + 1) < len(events) else None
 
                     if start < now and stop > now:
-                        channel[9] = str(time.strftime("%H:%M", time.localtime(start)))
-                        channel[10] = str(entry.get("name", "") or "")
-                        channel[11] = str(extract_main_description(entry.get("descr", "") or ""))
-                        channel[19] = start
+                        channel.nowtime = str(time.strftime("%H:%M", time.localtime(start)))
+                        channel.nowtitle = str(entry.get("name", "") or "")
+                        channel.nowdesc = str(extract_main_description(entry.get("descr", "") or ""))
+                        channel.nowunixtime = start
 
                         if next_entry:
                             next_start_str = next_entry.get("time", "")
@@ -1901,21 +1942,21 @@ class EStalker_Live_Categories(Screen):
                             except Exception:
                                 next_start = 0
 
-                            channel[12] = str(time.strftime("%H:%M", time.localtime(next_start)) if next_start else "")
-                            channel[13] = str(next_entry.get("name", "") or "")
-                            channel[14] = str(extract_main_description(next_entry.get("descr", "") or ""))
-                            channel[20] = next_start
+                            channel.nexttime = str(time.strftime("%H:%M", time.localtime(next_start)) if next_start else "")
+                            channel.nexttitle = str(next_entry.get("name", "") or "")
+                            channel.nextdesc = str(extract_main_description(next_entry.get("descr", "") or ""))
+                            channel.nextunixtime = next_start
                         else:
-                            channel[12] = ""
-                            channel[13] = ""
-                            channel[14] = ""
-                            channel[20] = 0
+                            channel.nexttime = ""
+                            channel.nexttitle = ""
+                            channel.nextdesc = ""
+                            channel.nextunixtime = 0
 
                         break
 
         self.epglist = [
-            buildEPGListEntry(x[0], x[1], x[9], x[10], x[11], x[12], x[13], x[14], x[18], x[19], x[20])
-            for x in self.list2 if x[18] is False
+            buildEPGListEntry(x.index, x.name, x.nowtime, x.nowtitle, x.nowdesc, x.nexttime, x.nexttitle, x.nextdesc, x.hidden, x.nowunixtime, x.nextunixtime)
+            for x in self.list2 if x.hidden is False
         ]
 
         self["epg_list"].updateList(self.epglist)
@@ -1946,3 +1987,7 @@ def buildLiveStreamList(index, name, stream_id, stream_icon, number, command, ne
     if watching:
         png = LoadPixmap(os.path.join(common_path, "watching.png"))
     return (name, png, index, next_url, stream_id, stream_icon, number, command, hidden, category_id)
+
+
+def buildLiveStreamRow(x):
+    return buildLiveStreamList(x.index, x.name, x.stream_id, x.stream_icon, x.number, x.cmd, x.next_url, x.favourite, x.watching, x.hidden, x.category_id)
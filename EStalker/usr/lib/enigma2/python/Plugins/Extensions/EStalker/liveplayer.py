@@ -31,6 +31,7 @@ except ImportError:
 
 # Third-party imports
 from PIL import Image
+from twisted.internet import threads
 from twisted.web.client import downloadPage
 
 # https twisted client hack #
@@ -69,8 +70,18 @@ from Tools.LoadPixmap import LoadPixmap
 from . import _
 from . import estalker_globals as glob
 from .plugin import cfg, common_path, dir_tmp, pythonVer, screenwidth, skin_directory, debugs
+from .pagestore import PageStore
 from .eStaticText import StaticText
+from .breaker import is_open, unreachable_message
 from .utils import get_local_timezone, make_request, perform_handshake, get_profile_data, _get_current_aspect_ratio
+from .profiler import profiled
+from .netstats import count_retry, track
+from .hedge import hedged_request
+from .ratelimit import PREFETCH
+from .xtream import direct_link, learn_link
+from . import watchdog
+from . import zapstats
+from .rows import LiveRow
 
 try:
     from enigma import eAVSwitch
@@ -79,6 +90,11 @@ except Exception:
 
 playlists_json = cfg.playlists_json.value
 
+# create_link results resolved ahead of a zap, shared between player instances.
+# Stream links carry short lived tokens, so they are kept briefly and used once.
+link_cache_ttl = 60
+link_cache = {}
+
 
 if pythonVer == 3:
     superscript_to_normal = str.maketrans(
@@ -306,6 +322,7 @@ class IPTVInfoBarPVRState:
                 cb(state_summary, speed_summary, statusicon_summary)
 
 
+@profiled
 class EStalker_StreamPlayer(
     InfoBarBase,
     IPTVInfoBarShowHide,
@@ -436,8 +453,16 @@ class EStalker_StreamPlayer(
             "green": self.nextAR,
             "0": self.restartStream,
             "ok": self.OKButton,
+            "info_long": self.showZapStats,
         }, -2)
 
+        self.zap = None
+
+        self.__event_tracker = ServiceEventTracker(screen=self, eventmap={
+            iPlayableService.evStart: self.__evStart,
+            iPlayableService.evUpdatedInfo: self.__evUpdatedInfo,
+        })
+
         self.timerImage = eTimer()
         try:
             self.timerImage.callback.append(self.downloadImage)
@@ -450,12 +475,6 @@ class EStalker_StreamPlayer(
         except:
             self.timerRecent_conn = self.timerRecent.timeout.connect(self.addRecentLiveList)
 
-        self.timerWatchdog = eTimer()
-        try:
-            self.timerWatchdog.callback.append(self.sendWatchdog)
-        except:
-            self.timerWatchdog_conn = self.timerWatchdog.timeout.connect(self.sendWatchdog)
-
         # Pagination variables - add these
         self.all_data = []
         self.pages_downloaded = set()
@@ -465,18 +484,27 @@ class EStalker_StreamPlayer(
         self.sortby = "number"
         self.epg_downloaded_channels = set()
         self.short_epg_results = {}
+        self.pages_prefetching = set()
+        self.closing = False
+
+        self.timerPrefetch = eTimer()
+        try:
+            self.timerPrefetch.callback.append(self.prefetchNeighbours)
+        except:
+            self.timerPrefetch_conn = self.timerPrefetch.timeout.connect(self.prefetchNeighbours)
 
         self.onFirstExecBegin.append(boundFunction(self.playStream, self.servicetype, self.streamurl))
 
-    def sendWatchdog(self):
-        if debugs:
-            print("*** sendWatchdog ***")
+    def __evStart(self):
+        if self.zap:
+            self.zap.mark("service_start")
 
-        watchdog_url = "{0}?type=watchdog&action=get_events&cur_play_type=0&event_active_id=0&init=0&JsHttpRequest=1-xml".format(self.portal)
-        make_request(watchdog_url, method="GET", headers=self.headers, params=None, response_type="json")
+    def __evUpdatedInfo(self):
+        if self.zap:
+            self.zap.finish("first_frame")
 
-        # restart timer for next ping
-        self.timerWatchdog.start(30000, True)
+    def showZapStats(self):
+        self.session.open(MessageBox, zapstats.report(), type=MessageBox.TYPE_INFO)
 
     def _stopTimer(self, name):
         t = getattr(self, name, None)
@@ -608,6 +636,7 @@ class EStalker_StreamPlayer(
 
         self._stopTimer("timerImage")
         self._stopTimer("timerRecent")
+        self._stopTimer("timerPrefetch")
 
         if not streamurl:
             return
@@ -626,6 +655,9 @@ class EStalker_StreamPlayer(
         except:
             pass
 
+        if not self.zap or self.zap.done:
+            self.zap = zapstats.ZapTimer("live", self.portal)
+
         self.reference = eServiceReference(int(servicetype), 0, str(streamurl))
         self.reference.setName(glob.currentchannellist[glob.currentchannellistindex][0])
 
@@ -669,6 +701,8 @@ class EStalker_StreamPlayer(
             except Exception as e:
                 print(e)
 
+        self.zap.mark("play_service")
+
         nowref = self.session.nav.getCurrentlyPlayingServiceReference()
         if nowref:
             glob.newPlayingServiceRef = nowref
@@ -681,8 +715,7 @@ class EStalker_StreamPlayer(
         self.timerRecent.start(5 * 60 * 1000, True)
 
         # start watchdog
-        self._stopTimer("timerWatchdog")
-        self.timerWatchdog.start(30000, True)
+        watchdog.play(self.portal, self.headers, watchdog.LIVE)
 
         self.originalservicetype = self.servicetype
 
@@ -702,6 +735,10 @@ class EStalker_StreamPlayer(
 
         self.refreshInfobar()
 
+        # resolve the neighbouring channels once this one has had time to start
+        if cfg.prefetchlinks.value:
+            self.timerPrefetch.start(2000, True)
+
     def applyAspectRatio(self):
         print("*** applyAspectRatio ***")
         current_ar = _get_current_aspect_ratio()
@@ -717,7 +754,9 @@ class EStalker_StreamPlayer(
 
         self._cleanupTimer("timerImage")
         self._cleanupTimer("timerRecent")
-        self._cleanupTimer("timerWatchdog")
+        watchdog.stop()
+        self._cleanupTimer("timerPrefetch")
+        self.closing = True
 
         glob.nextlist[-1]["index"] = glob.currentchannellistindex
 
@@ -807,9 +846,9 @@ class EStalker_StreamPlayer(
 
             if scheme == "https" and sslverify:
                 sniFactory = SNIFactory(domain)
-                d = downloadPage(url, temp, sniFactory, timeout=2)
+                d = track(downloadPage(url, temp, sniFactory, timeout=2), url, "images", temp)
             else:
-                d = downloadPage(url, temp, timeout=2)
+                d = track(downloadPage(url, temp, timeout=2), url, "images", temp)
 
             d.addCallback(_ok)
             d.addErrback(_err)
@@ -886,20 +925,140 @@ class EStalker_StreamPlayer(
         if debugs:
             print("*** createLink ***", url)
 
-        response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+        direct = direct_link(url)
+        if direct:
+            return {"js": {"cmd": direct}}
+
+        response = hedged_request(url, self.headers)
 
         if debugs:
             print("*** createlink response ***", response)
 
-        if not response and self.retry is False:
+        if not response and self.retry is False and not is_open(url):
             self.retry = True
+            count_retry(url)
+            reauth_start = time.time()
             self.reauthorize()
-            response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+            if self.zap:
+                self.zap.add("reauthorize", time.time() - reauth_start)
+            response = hedged_request(url, self.headers)
             if debugs:
                 print("*** createlink response 2 ***", response)
 
+        if not response and is_open(url):
+            self.session.open(MessageBox, unreachable_message(url), MessageBox.TYPE_ERROR, timeout=3)
+
+        learn_link(url, response)
         return response
 
+    def createLinkUrl(self, command):
+        return "{0}?type=itv&action=create_link&cmd={1}&series=0&forced_storage=0&disable_ad=0&download=0&force_ch_link_check=0&JsHttpRequest=1-xml".format(self.portal, command)
+
+    def needsLink(self, command):
+        return "localhost" in command or "///" in command or "/ch/" in command or "http" not in command
+
+    def parseLink(self, response):
+        if isinstance(response, dict) and "js" in response and "cmd" in response["js"]:
+            return str(response["js"]["cmd"])
+        return ""
+
+    def getCachedLink(self, command):
+        entry = link_cache.pop((self.portal, command), None)
+
+        if entry and entry[1] and entry[0] > time.time():
+            if debugs:
+                print("*** cached link ***", command)
+            return entry[1]
+
+        return ""
+
+    def prefetchNeighbours(self):
+        if debugs:
+            print("*** prefetchNeighbours ***")
+
+        if self.closing or not glob.currentchannellist or not cfg.prefetchlinks.value:
+            return
+
+        now = time.time()
+        for key in [k for k, v in link_cache.items() if v[0] <= now]:
+            del link_cache[key]
+
+        list_length = len(glob.currentchannellist)
+
+        for step in (1, -1):
+            index = (glob.currentchannellistindex + step) % list_length
+
+            if index == glob.currentchannellistindex:
+                continue
+
+            command = str(glob.currentchannellist[index][7])
+
+            if command:
+                self.prefetchLink(command)
+            else:
+                self.prefetchPage(index)
+
+    def prefetchLink(self, command):
+        if not self.needsLink(command):
+            return
+
+        key = (self.portal, command)
+        if key in link_cache or direct_link(self.createLinkUrl(command), probe=False):
+            return
+
+        # placeholder so a second call doesn't resolve the same channel while this one is in flight
+        link_cache[key] = (time.time() + link_cache_ttl, "")
+
+        d = threads.deferToThread(make_request, self.createLinkUrl(command), "GET", dict(self.headers), None, "json", PREFETCH)
+        d.addCallback(self._prefetchLinkDone, key)
+        d.addErrback(self._prefetchLinkFailed, key)
+
+    def _prefetchLinkDone(self, response, key):
+        learn_link(self.createLinkUrl(key[1]), response)
+        streamurl = self.parseLink(response)
+
+        if streamurl:
+            link_cache[key] = (time.time() + link_cache_ttl, streamurl)
+        else:
+            link_cache.pop(key, None)
+
+    def _prefetchLinkFailed(self, failure, key):
+        link_cache.pop(key, None)
+
+    def prefetchPage(self, index):
+        next_url = glob.nextlist[-1].get("next_url", "")
+        if not next_url or "all_channels" in next_url:
+            return
+
+        page = index // self.itemsperpage + 1
+        paged_url = self._updateUrlPage(next_url, page)
+
+        if page in self.pages_prefetching or paged_url in self.pages_downloaded:
+            return
+
+        self.pages_prefetching.add(page)
+
+        d = threads.deferToThread(make_request, paged_url, "GET", dict(self.headers), None, "json", PREFETCH)
+        d.addCallback(self._prefetchPageDone, page, paged_url)
+        d.addErrback(self._prefetchPageFailed, page)
+
+    def _prefetchPageDone(self, data, page, paged_url):
+        self.pages_prefetching.discard(page)
+
+        if self.closing or not data:
+            return
+
+        if pythonVer == 3 and glob.hassuperscript:
+            data = clean_names(data)
+
+        self.current_page = page
+        self.storePage(data, paged_url)
+        self.processdata(self.all_data)
+        self.prefetchNeighbours()
+
+    def _prefetchPageFailed(self, failure, page):
+        self.pages_prefetching.discard(page)
+
     def _get_profile(self, portal, mac, token, token_random, headers, param_mode):
         return get_profile_data(portal, mac, token, token_random, headers, param_mode)
 
@@ -951,6 +1110,7 @@ class EStalker_StreamPlayer(
             print("*** __next___ ***")
 
         self.servicetype = self.originalservicetype
+        self.zap = zapstats.ZapTimer("live", self.portal)
 
         if glob.currentchannellist:
             list_length = len(glob.currentchannellist)
@@ -964,16 +1124,18 @@ class EStalker_StreamPlayer(
             if not command:
                 self.load_page_data()
                 command = str(glob.currentchannellist[glob.currentchannellistindex][7])
+                self.zap.mark("page_load")
 
             if isinstance(command, str):
-                if ("localhost" in command or "///" in command or "/ch/" in command or "http" not in command):
-                    url = "{0}?type=itv&action=create_link&cmd={1}&series=0&forced_storage=0&disable_ad=0&download=0&force_ch_link_check=0&JsHttpRequest=1-xml".format(self.portal, command)
-                    self.retry = False
-                    response = self.createLink(url)
-                    self.streamurl = ""
-
-                    if isinstance(response, dict) and "js" in response and "cmd" in response["js"]:
-                        self.streamurl = str(response["js"]["cmd"])
+                if self.needsLink(command):
+                    self.streamurl = self.getCachedLink(command)
+
+                    if not self.streamurl:
+                        self.retry = False
+                        response = self.createLink(self.createLinkUrl(command))
+                        self.streamurl = self.parseLink(response)
+
+                    self.zap.mark("create_link")
                 else:
                     self.streamurl = command
 
@@ -999,6 +1161,7 @@ class EStalker_StreamPlayer(
             print("*** prev ***")
 
         self.servicetype = self.originalservicetype
+        self.zap = zapstats.ZapTimer("live", self.portal)
 
         if glob.currentchannellist:
             list_length = len(glob.currentchannellist)
@@ -1012,16 +1175,18 @@ class EStalker_StreamPlayer(
             if not command:
                 self.load_page_data()
                 command = str(glob.currentchannellist[glob.currentchannellistindex][7])
+                self.zap.mark("page_load")
 
             if isinstance(command, str):
-                if ("localhost" in command or "///" in command or "/ch/" in command or "http" not in command):
-                    url = "{0}?type=itv&action=create_link&cmd={1}&series=0&forced_storage=0&disable_ad=0&download=0&force_ch_link_check=0&JsHttpRequest=1-xml".format(self.portal, command)
-                    self.retry = False
-                    response = self.createLink(url)
-                    self.streamurl = ""
-
-                    if isinstance(response, dict) and "js" in response and "cmd" in response["js"]:
-                        self.streamurl = str(response["js"]["cmd"])
+                if self.needsLink(command):
+                    self.streamurl = self.getCachedLink(command)
+
+                    if not self.streamurl:
+                        self.retry = False
+                        response = self.createLink(self.createLinkUrl(command))
+                        self.streamurl = self.parseLink(response)
+
+                    self.zap.mark("create_link")
                 else:
                     self.streamurl = command
 
@@ -1081,8 +1246,8 @@ class EStalker_StreamPlayer(
             print("*** downloadApiData ***", url)
 
         # Initialize storage for all data if it doesn't exist
-        if not hasattr(self, 'all_data') or not isinstance(self.all_data, list):
-            self.all_data = []
+        if not isinstance(getattr(self, 'all_data', None), PageStore):
+            self.all_data = PageStore()
 
         if "all_channels" not in url:
             paged_url = self._updateUrlPage(url, self.current_page)
@@ -1104,35 +1269,34 @@ class EStalker_StreamPlayer(
                 if pythonVer == 3 and glob.hassuperscript:
                     data = clean_names(data)
 
-                js = data.get("js", {})
+                if "all_channels" in url:
+                    return data.get("js", {}).get("data", [])
 
-                try:
-                    self.total_items = int(js.get("total_items", 0))
-                except (ValueError, TypeError):
-                    self.total_items = 0
-                current_page_data = js.get("data", [])
+                return self.storePage(data, paged_url)
 
-                if "all_channels" in url:
-                    return current_page_data
+        except Exception as e:
+            print("Error downloading API data for page {}: {}".format(self.current_page, e))
+            return self.all_data
 
-                if not hasattr(self, 'all_data') or not isinstance(self.all_data, list) or not self.all_data:
-                    self.all_data = [{} for _ in range(self.total_items)]
+        self.session.openWithCallback(self.back, MessageBox, unreachable_message(self.portal) or _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
+        return self.all_data
 
-                # Calculate the position where this page's data should be stored
-                start_index = (self.current_page - 1) * 14
+    def storePage(self, data, paged_url):
+        js = data.get("js", {})
 
-                # Insert the new data at the correct positions
-                for i, item in enumerate(current_page_data):
-                    self.all_data[start_index + i] = item
-                    self.pages_downloaded.add(paged_url)
+        try:
+            self.total_items = int(js.get("total_items", 0))
+        except (ValueError, TypeError):
+            self.total_items = 0
+        current_page_data = js.get("data", [])
 
-                return self.all_data
+        if not isinstance(self.all_data, PageStore) or not self.all_data:
+            self.all_data = PageStore()
 
-        except Exception as e:
-            print("Error downloading API data for page {}: {}".format(self.current_page, e))
-            return self.all_data
+        if current_page_data:
+            self.all_data.add(self.current_page, current_page_data, self.total_items)
+            self.pages_downloaded.add(paged_url)
 
-        self.session.openWithCallback(self.back, MessageBox, _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
         return self.all_data
 
     def _updateUrlPage(self, url, page):
@@ -1150,7 +1314,7 @@ class EStalker_StreamPlayer(
         if response:
             for index, channel in enumerate(response):
                 if not isinstance(channel, dict) or not channel:
-                    self.list2.append([index, "", "", "", "", "", "", "", "", "", "", "", "", "", "", "", False, False, False, None, None])
+                    self.list2.append(LiveRow.empty(index))
                     continue
 
                 stream_id = str(channel.get("id", ""))
@@ -1195,7 +1359,7 @@ class EStalker_StreamPlayer(
                 else:
                     glob.active_playlist["player_info"]["livefavourites"] = []
 
-                self.list2.append([
+                self.list2.append(LiveRow(
                     index,
                     str(name),
                     str(stream_id),
@@ -1217,14 +1381,14 @@ class EStalker_StreamPlayer(
                     hidden,
                     None,
                     None
-                ])
+                ))
 
-        self.main_list = [buildLiveStreamList(x[0], x[1], x[2], x[3], x[5], x[7], x[15], x[16], x[17], x[18], x[6]) for x in self.list2 if x[18] is False]
+        self.main_list = [buildLiveStreamList(x.index, x.name, x.stream_id, x.stream_icon, x.number, x.cmd, x.next_url, x.favourite, x.watching, x.hidden, x.category_id) for x in self.list2 if x.hidden is False]
         glob.currentchannellist = self.main_list[:]
 
         self.updateDisplay()
 
-        self.epglist = [buildEPGListEntry(x[0], x[1], x[9], x[10], x[11], x[12], x[13], x[14], x[18], x[19], x[20]) for x in self.list2 if x[18] is False]
+        self.epglist = [buildEPGListEntry(x.index, x.name, x.nowtime, x.nowtitle, x.nowdesc, x.nexttime, x.nexttitle, x.nextdesc, x.hidden, x.nowunixtime, x.nextunixtime) for x in self.list2 if x.hidden is False]
         glob.currentepglist = self.epglist[:]
 
     def updateDisplay(self):
@@ -1304,7 +1468,7 @@ class EStalker_StreamPlayer(
 
         if self.list2:
             for channel in self.list2:
-                epg_channel_id = channel[4]
+                epg_channel_id = channel.epg_channel_id
 
                 if epg_channel_id in self.short_epg_results:
                     events = self.short_epg_results[epg_channel_id]
@@ -1330,10 +1494,10 @@ class EStalker_StreamPlayer(
                         next_entry = events[index + 1] if (index + 1) < len(events) else None
 
                         if start < now and stop > now:
-                            channel[9] = str(time.strftime("%H:%M", time.localtime(start)))
-                            channel[10] = str(entry.get("name", "") or "")
-                            channel[11] = str(extract_main_description(entry.get("descr", "") or ""))
-                            channel[19] = start
+                            channel.nowtime = str(time.strftime("%H:%M", time.localtime(start)))
+                            channel.nowtitle = str(entry.get("name", "") or "")
+                            channel.nowdesc = str(extract_main_description(entry.get("descr", "") or ""))
+                            channel.nowunixtime = start
 
                             if next_entry:
                                 next_start_str = next_entry.get("time", "")
@@ -1343,21 +1507,21 @@ class EStalker_StreamPlayer(
                                 except Exception:
                                     next_start = 0
 
-                                channel[12] = str(time.strftime("%H:%M", time.localtime(next_start)) if next_start else "")
-                                channel[13] = str(next_entry.get("name", "") or "")
-                                channel[14] = str(extract_main_description(next_entry.get("descr", "") or ""))
-                                channel[20] = next_start
+                                channel.nexttime = str(time.strftime("%H:%M", time.localtime(next_start)) if next_start else "")
+                                channel.nexttitle = str(next_entry.get("name", "") or "")
+                                channel.nextdesc = str(extract_main_description(next_entry.get("descr", "") or ""))
+                                channel.nextunixtime = next_start
                             else:
-                                channel[12] = ""
-                                channel[13] = ""
-                                channel[14] = ""
-                                channel[20] = 0
+                                channel.nexttime = ""
+                                channel.nexttitle = ""
+                                channel.nextdesc = ""
+                                channel.nextunixtime = 0
 
                             break
 
             self.epglist = [
-                buildEPGListEntry(x[0], x[1], x[9], x[10], x[11], x[12], x[13], x[14], x[18], x[19], x[20])
-                for x in self.list2 if x[18] is False
+                buildEPGListEntry(x.index, x.name, x.nowtime, x.nowtitle, x.nowdesc, x.nexttime, x.nexttitle, x.nextdesc, x.hidden, x.nowunixtime, x.nextunixtime)
+                for x in self.list2 if x.hidden is False
             ]
 
             glob.currentepglist = self.epglist[:]
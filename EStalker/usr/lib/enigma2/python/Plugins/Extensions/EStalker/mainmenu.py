@@ -23,6 +23,7 @@ from .plugin import skin_directory, common_path, version, cfg
 from .eStaticText import StaticText
 
 from .utils import _get_current_aspect_ratio
+from .profiler import profiled
 
 try:
     from enigma import eAVSwitch
@@ -32,6 +33,7 @@ except Exception:
 playlists_json = cfg.playlists_json.value
 
 
+@profiled
 class EStalker_MainMenu(Screen):
     ALLOW_SUSPEND = True
 
@@ -63,6 +65,7 @@ class EStalker_MainMenu(Screen):
             "menu": self.settings,
             "help": self.resetData,
             "blue": self.resetData,
+            "info_long": self.showNetworkStats,
         }, -2)
 
         self["version"].setText(version)
@@ -155,6 +158,11 @@ class EStalker_MainMenu(Screen):
         from . import server
         self.session.openWithCallback(self.start, server.EStalker_AddServer)
 
+    def showNetworkStats(self):
+        # not on any button label, for tuning timeouts and pool sizes
+        from . import netstats
+        self.session.open(MessageBox, netstats.report(), type=MessageBox.TYPE_INFO)
+
     def __next__(self):
         current_entry = self["list"].getCurrent()
 
@@ -204,7 +204,7 @@ class EStalker_Menu(Screen):
         category = url[1]
         response = make_request(url[0], method="GET", headers=self.headers, params=None, response_type="json")
 
-        if pythonVer == 3:
+        if pythonVer == 3 and response:
             response = clean_names(response)
 
         return category, response
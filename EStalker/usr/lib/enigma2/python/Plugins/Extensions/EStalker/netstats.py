@@ -0,0 +1,212 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Network counters per host and action (handshake, get_ordered_list, create_link, get_short_epg,
+# watchdog, player_api, tmdb, images ...): requests, errors, retries, bytes and a latency histogram.
+# make_request and xtream_request record directly, twisted deferreds are wrapped with track().
+# report() is shown from the main menu (long INFO), export() writes the same data as json.
+
+import json
+import os
+import threading
+import time
+
+from collections import OrderedDict
+
+try:
+    from urlparse import urlparse, parse_qsl
+except ImportError:
+    from urllib.parse import urlparse, parse_qsl
+
+from twisted.internet import defer
+
+from . import _
+from . import dnscache
+
+
+export_file = "/tmp/estalker_netstats.json"
+
+# upper bounds of the latency buckets in ms, the last bucket takes everything slower
+buckets = [50, 100, 250, 500, 1000, 2000, 5000, 10000]
+
+image_extensions = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".svg")
+
+stats = OrderedDict()
+lock = threading.Lock()
+
+
+def action_of(url):
+    parsed = urlparse(url)
+    query = dict(parse_qsl(parsed.query))
+
+    if "themoviedb" in parsed.netloc or "tmdb" in parsed.netloc:
+        return "tmdb"
+    if query.get("type") == "watchdog":
+        return "watchdog"
+    if query.get("action"):
+        return query["action"]
+    if parsed.path.lower().endswith("player_api.php"):
+        return "player_api"
+    if parsed.path.lower().endswith(image_extensions):
+        return "images"
+    return "other"
+
+
+def _entry(url, action):
+    if isinstance(url, bytes):
+        url = url.decode("utf-8", "ignore")
+
+    url = str(url or "")
+    host = urlparse(url).netloc or "unknown"
+    key = (host, action or action_of(url))
+
+    entry = stats.get(key)
+    if entry is None:
+        entry = stats[key] = {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "bytes": 0,
+            "seconds": 0.0,
+            "max": 0.0,
+            "histogram": [0] * (len(buckets) + 1),
+            "last_error": "",
+        }
+    return entry
+
+
+def record(url, seconds, size=0, error=None, action=None):
+    """One finished request. error is a short description, None when an answer came back."""
+    milliseconds = seconds * 1000
+    index = len(buckets)
+    for i, bound in enumerate(buckets):
+        if milliseconds <= bound:
+            index = i
+            break
+
+    with lock:
+        entry = _entry(url, action)
+        entry["requests"] += 1
+        entry["bytes"] += size or 0
+        entry["seconds"] += seconds
+        entry["max"] = max(entry["max"], seconds)
+        entry["histogram"][index] += 1
+        if error:
+            entry["errors"] += 1
+            entry["last_error"] = str(error)
+
+
+def count_retry(url, action=None):
+    with lock:
+        _entry(url, action)["retries"] += 1
+
+
+def track(d, url, action=None, path=None):
+    """Records a twisted request deferred when it fires. path is the file a downloadPage wrote to."""
+    dnscache.register(url)
+    started = time.time()
+
+    def done(result):
+        size = 0
+        if isinstance(result, bytes):
+            size = len(result)
+        elif isinstance(getattr(result, "length", None), int):
+            size = result.length
+        elif path:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                pass
+
+        code = getattr(result, "code", 200)
+        record(url, time.time() - started, size, "http {}".format(code) if code >= 400 else None, action)
+        return result
+
+    def failed(failure):
+        # requests cancelled on a zap are not errors of the host
+        if not failure.check(defer.CancelledError):
+            record(url, time.time() - started, 0, failure.type.__name__, action)
+        return failure
+
+    d.addCallbacks(done, failed)
+    return d
+
+
+def _percentile(histogram, pct):
+    # upper bound of the bucket the percentile falls in
+    total = sum(histogram)
+    if not total:
+        return 0
+
+    target = total * pct / 100.0
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= target:
+            return buckets[i] if i < len(buckets) else buckets[-1]
+    return buckets[-1]
+
+
+def snapshot():
+    with lock:
+        items = [(key, dict(entry, histogram=list(entry["histogram"]))) for key, entry in stats.items()]
+
+    results = []
+    for (host, action), entry in sorted(items):
+        requests = entry["requests"]
+        results.append(OrderedDict([
+            ("host", host),
+            ("action", action),
+            ("requests", requests),
+            ("errors", entry["errors"]),
+            ("retries", entry["retries"]),
+            ("bytes", entry["bytes"]),
+            ("avg_ms", int(entry["seconds"] * 1000 / requests) if requests else 0),
+            ("p50_ms", _percentile(entry["histogram"], 50)),
+            ("p95_ms", _percentile(entry["histogram"], 95)),
+            ("max_ms", int(entry["max"] * 1000)),
+            ("histogram", OrderedDict(zip(["<={}".format(b) for b in buckets] + [">{}".format(buckets[-1])], entry["histogram"]))),
+            ("last_error", entry["last_error"]),
+        ]))
+
+    return results
+
+
+def export(path=export_file):
+    try:
+        with open(path, "w") as f:
+            json.dump({"time": int(time.time()), "stats": snapshot()}, f, indent=2)
+        return True
+    except Exception as e:
+        print("[EStalker] network stats export error:", e)
+        return False
+
+
+def report():
+    results = snapshot()
+
+    if not results:
+        return _("No network requests recorded yet.")
+
+    lines = []
+    host = None
+    for row in results:
+        if row["host"] != host:
+            if host is not None:
+                lines.append("")
+            host = row["host"]
+            lines.append(host)
+
+        lines.append("    {:<16} {:>5} req {:>3} err {:>3} retry {:>7} KB   avg {:>5} p95 <={:>5} ms".format(
+            row["action"][:16], row["requests"], row["errors"], row["retries"], row["bytes"] // 1024, row["avg_ms"], row["p95_ms"]))
+
+    if export():
+        lines.append("")
+        lines.append(_("Saved to") + " " + export_file)
+
+    return "\n".join(lines)
+
+
+def clear():
+    with lock:
+        stats.clear()
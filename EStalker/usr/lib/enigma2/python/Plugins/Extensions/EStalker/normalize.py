@@ -0,0 +1,205 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Title clean up for TMDB / IMDB searches.
+# Shared by vod.py, series.py and vodplayer.py. Standard library only, so it can be
+# imported outside enigma2 (see benchmarks/bench_normalize.py).
+
+import re
+import sys
+import unicodedata
+
+from collections import OrderedDict
+
+pythonVer = sys.version_info.major
+
+memo_max = 4096
+
+_memo = OrderedDict()
+
+# Precompiled regex (stripjunk)
+_re_has_ascii = re.compile(r'[\x00-\x7F]')
+_re_has_non_ascii = re.compile(r'[^\x00-\x7F]')
+
+_re_end_the = re.compile(r'\s*the$', re.IGNORECASE)
+_re_prefix_xx_colon = re.compile(r'^\w{2}:', re.IGNORECASE)
+_re_prefix_xx_pipe_xx = re.compile(r'^\w{2}\|\w{2}\s', re.IGNORECASE)
+
+_re_leading_doublepipes = re.compile(r'^\|\|.*?\|\|')
+_re_leading_singlepipe_block = re.compile(r'^\|.*?\|')
+_re_any_pipe_block = re.compile(r'\|.*?\|')
+
+_re_leading_doublebars = re.compile(u'^┃┃.*?┃┃')
+_re_leading_singlebar_block = re.compile(u'^┃.*?┃')
+_re_any_bar_block = re.compile(u'┃.*?┃')
+
+_re_parens = re.compile(r'\(\(.*?\)\)|\([^()]*\)')
+_re_brackets = re.compile(r'\[\[.*?\]\]|\[.*?\]')
+
+_re_is_year_only = re.compile(r'^\d{4}$')
+_re_trailing_year = re.compile(r'[\s\-]*(?:[\(\[\"]?\d{4}[\)\]\"]?)$')
+
+_re_lang_dash_prefix = re.compile(r'^[A-Za-z0-9\-]{1,7}\s*-\s*', re.IGNORECASE)
+
+
+def _first_char_alternation(strings):
+    # Same matches as '|'.join(strings), but grouped on the first character so the engine
+    # only tries the handful of alternatives that can start at each position.
+    # Order inside a group is kept, so the first listed alternative still wins.
+    groups = OrderedDict()
+    for item in strings:
+        groups.setdefault(item[0].lower(), []).append(item)
+
+    return '|'.join(
+        re.escape(items[0][0]) + '(?:' + '|'.join(re.escape(item[1:]) for item in items) + ')'
+        for items in groups.values()
+    )
+
+
+# Bad substrings
+bad_strings = [
+    "ae|", "al|", "ar|", "at|", "ba|", "be|", "bg|", "br|", "cg|", "ch|", "cz|", "da|", "de|", "dk|",
+    "ee|", "en|", "es|", "eu|", "ex-yu|", "fi|", "fr|", "gr|", "hr|", "hu|", "in|", "ir|", "it|", "lt|",
+    "mk|", "mx|", "nl|", "no|", "pl|", "pt|", "ro|", "rs|", "ru|", "se|", "si|", "sk|", "sp|", "tr|",
+    "uk|", "us|", "yu|",
+    "1080p", "1080p-dual-lat-cine-calidad.com", "1080p-dual-lat-cine-calidad.com-1",
+    "1080p-dual-lat-cinecalidad.mx", "1080p-lat-cine-calidad.com", "1080p-lat-cine-calidad.com-1",
+    "1080p-lat-cinecalidad.mx", "1080p.dual.lat.cine-calidad.com", "3d", "'", "#", "(", ")", "-", "[]", "/",
+    "4k", "720p", "aac", "blueray", "ex-yu:", "fhd", "hd", "hdrip", "hindi", "imdb", "multi:", "multi-audio",
+    "multi-sub", "multi-subs", "multisub", "ozlem", "sd", "top250", "u-", "uhd", "vod", "x264",
+    "amz", "dolby", "audio", "8k", "3840p", "50fps", "60fps", "hevc", "raw ", "vip ", "NF", "d+", "a+", "vp", "prmt", "mrvl"
+]
+_re_bad_strings = re.compile(_first_char_alternation(bad_strings), re.IGNORECASE)
+
+# Bad suffixes
+bad_suffix = [
+    " al", " ar", " ba", " da", " de", " en", " es", " eu", " ex-yu", " fi", " fr", " gr", " hr", " mk",
+    " nl", " no", " pl", " pt", " ro", " rs", " ru", " si", " swe", " sw", " tr", " uk", " yu"
+]
+_re_bad_suffix = re.compile(r'(' + '|'.join(map(re.escape, bad_suffix)) + r')$', re.IGNORECASE)
+
+_re_dots_underscores = re.compile(r"[._'\*]")
+
+
+def normalize_text(text):
+    has_ascii = bool(_re_has_ascii.search(text))
+    has_non_ascii = bool(_re_has_non_ascii.search(text))
+
+    if has_ascii and has_non_ascii:
+
+        if pythonVer == 2:
+            if isinstance(text, str):
+                text = text.decode("utf-8", "ignore")
+
+            text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore")
+
+        else:
+            text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+
+    return text
+
+
+def _stripjunk(text):
+    searchtitle = text
+
+    if pythonVer == 2 and isinstance(searchtitle, str):
+        searchtitle = searchtitle.decode("utf-8", "ignore")
+
+    # Move "the" from the end to the beginning (case-insensitive)
+    if _re_end_the.search(searchtitle.strip().lower()):
+        searchtitle = "The " + searchtitle[:-3].strip()
+
+    # remove xx: at start (case-insensitive)
+    searchtitle = _re_prefix_xx_colon.sub('', searchtitle)
+
+    # remove xx|xx at start (case-insensitive)
+    searchtitle = _re_prefix_xx_pipe_xx.sub('', searchtitle)
+
+    # remove all leading content between and including || or |
+    searchtitle = _re_leading_doublepipes.sub('', searchtitle)
+    searchtitle = _re_leading_singlepipe_block.sub('', searchtitle)
+    searchtitle = _re_any_pipe_block.sub('', searchtitle)
+
+    # remove all leading content between and including ┃┃ or ┃
+    searchtitle = _re_leading_doublebars.sub('', searchtitle)
+    searchtitle = _re_leading_singlebar_block.sub('', searchtitle)
+    searchtitle = _re_any_bar_block.sub('', searchtitle)
+
+    # remove all content between and including () unless it's all digits
+    searchtitle = _re_parens.sub('', searchtitle)
+
+    # remove all content between and including []
+    searchtitle = _re_brackets.sub('', searchtitle)
+
+    # remove trailing year (but not if the whole title *is* a year)
+    if not _re_is_year_only.match(searchtitle.strip()):
+        searchtitle = _re_trailing_year.sub('', searchtitle)
+
+    # remove up to 6 characters followed by space and dash at start (e.g. "EN -", "BE-NL -")
+    searchtitle = _re_lang_dash_prefix.sub('', searchtitle)
+
+    # normalise text
+    searchtitle = normalize_text(searchtitle)
+
+    # Bad substrings to strip (case-insensitive)
+    searchtitle = _re_bad_strings.sub('', searchtitle)
+
+    # Bad suffixes to remove (case-insensitive, only if at end)
+    searchtitle = _re_bad_suffix.sub('', searchtitle)
+
+    # Replace '.', '_', "'", '*' with space
+    searchtitle = _re_dots_underscores.sub(' ', searchtitle)
+
+    # Trim leading/trailing hyphens and whitespace
+    searchtitle = searchtitle.strip(' -').strip()
+
+    if pythonVer == 2 and not isinstance(searchtitle, str):
+        searchtitle = searchtitle.encode("utf-8")
+
+    return str(searchtitle)
+
+
+def stripjunk(text, database=None):
+    # database is kept for the old screen method signature, the result is the same for TMDB and IMDB
+    if not text:
+        return ""
+
+    try:
+        result = _memo.pop(text)
+    except KeyError:
+        result = _stripjunk(text)
+
+        if len(_memo) >= memo_max:
+            _memo.popitem(last=False)
+
+    # re-inserting keeps the most recently used titles at the end
+    _memo[text] = result
+    return result
+
+
+def stripjunk_batch(titles, remember=False):
+    """
+    Clean a whole page or catalog in one pass. Returns a dict of title -> search title.
+    Titles already in the memo are reused, the rest are only added with remember, so a large
+    catalog does not push out the titles the screens are looking at.
+    """
+    results = {}
+
+    for title in titles:
+        if title in results:
+            continue
+
+        if remember:
+            result = stripjunk(title)
+        else:
+            result = _memo.get(title)
+            if result is None:
+                result = _stripjunk(title) if title else ""
+
+        results[title] = result
+
+    return results
+
+
+def clear_memo():
+    _memo.clear()
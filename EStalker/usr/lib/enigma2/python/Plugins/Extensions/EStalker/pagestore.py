@@ -0,0 +1,55 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Pages of a get_ordered_list category, kept by page number.
+# Replaces the [{} for _ in range(total_items)] list the screens used to allocate on the first page:
+# the length still comes from total_items so the list positions and page counts stay the same,
+# but only the downloaded pages hold data. Positions of pages not downloaded yet read as None, and the
+# screens put a placeholder row of rows.py there (its index and nothing else), so a 60k category costs
+# little more than what was actually viewed.
+
+page_size = 14
+
+
+class PageStore(object):
+
+    def __init__(self, total_items=0, size=page_size):
+        self.total_items = total_items
+        self.size = size
+        self.pages = {}
+
+    def add(self, page, items, total_items=None):
+        if total_items is not None:
+            self.total_items = total_items
+        self.pages[page] = list(items)
+
+    def __len__(self):
+        return self.total_items
+
+    def __iter__(self):
+        size = self.size
+        total = self.total_items
+        last_page = (total + size - 1) // size
+
+        for page in range(1, last_page + 1):
+            count = min(size, total - (page - 1) * size)
+            items = self.pages.get(page)
+
+            if items is None:
+                for _ in range(count):
+                    yield None
+                continue
+
+            for i in range(count):
+                yield items[i] if i < len(items) else None
+
+    def fill(self, items):
+        """Store a whole list at once (xtream catalog), returns the page numbers it covered."""
+        size = self.size
+        self.total_items = len(items)
+        pages = []
+        for start in range(0, len(items), size):
+            page = start // size + 1
+            self.pages[page] = items[start:start + size]
+            pages.append(page)
+        return pages
@@ -8,7 +8,6 @@ import json
 import os
 import re
 import socket
-import time
 
 try:
     from http.client import HTTPConnection
@@ -19,11 +18,6 @@ except ImportError:
 
 from datetime import datetime
 
-try:
-    from urllib.parse import urlparse
-except ImportError:
-    from urlparse import urlparse
-
 # Third-party imports
 import requests
 from requests.adapters import HTTPAdapter
@@ -33,6 +27,7 @@ from Components.ActionMap import ActionMap
 from Components.Pixmap import Pixmap
 from Components.Sources.List import List
 from enigma import eTimer
+from twisted.internet import threads
 from Screens.MessageBox import MessageBox
 from Screens.Screen import Screen
 from Tools.LoadPixmap import LoadPixmap
@@ -44,6 +39,9 @@ from . import estalker_globals as glob
 from .plugin import skin_directory, cfg, common_path, version, hasConcurrent, hasMultiprocessing, debugs
 from .eStaticText import StaticText
 from .utils import get_local_timezone, make_request, xtream_request, perform_handshake, get_profile_data
+from .profiler import profiled
+from .ratelimit import acquire
+from .xtream import credentials_cache, find_credentials
 from . import processfiles as loadfiles
 
 try:
@@ -150,6 +148,7 @@ def extract_portal_path_from_stream(resp, url):
 # ########################################################################################
 
 
+@profiled
 class EStalker_Playlists(Screen):
     ALLOW_SUSPEND = True
 
@@ -320,6 +319,7 @@ class EStalker_Playlists(Screen):
         def try_url(url):
             # print("*** trying url ***", url)
             try:
+                acquire(url)
                 with http.get(url, headers=headers, timeout=(3, 5), verify=False, allow_redirects=True) as r:
                     r.raise_for_status()
                     #  print("*** success ***", url)
@@ -353,6 +353,7 @@ class EStalker_Playlists(Screen):
 
         for url in xpcom_urls:
             try:
+                acquire(url)
                 with http.get(url, headers=headers, timeout=(3, 5), verify=False, stream=True, allow_redirects=True) as r:
                     r.raise_for_status()
                     portal_candidate = extract_portal_path_from_stream(r, url)
@@ -985,12 +986,27 @@ class EStalker_UserInfo(Screen):
 
         self["key_red"] = StaticText(_("Close"))
 
+        self.closed = False
+        self.creds_found = False
+        self.xtream_creds = {}
+
+        self.timer = eTimer()
+        try:
+            self.timer_conn = self.timer.timeout.connect(self.fetchAccountInfo)
+        except Exception:
+            self.timer.callback.append(self.fetchAccountInfo)
+
         self.onFirstExecBegin.append(self.createUserSetup)
         self.onLayoutFinish.append(self.__layoutFinished)
+        self.onClose.append(self.__onClose)
 
     def __layoutFinished(self):
         self.setTitle(self.setup_title)
 
+    def __onClose(self):
+        self.closed = True
+        self.timer.stop()
+
     def createUserSetup(self):
         playlist_info = glob.active_playlist.get("playlist_info", {})
         self["portalversion"].setText(str(playlist_info.get("version", "Unknown")))
@@ -1020,49 +1036,7 @@ class EStalker_UserInfo(Screen):
 
     def _fetch_xtream_creds(self, portal, headers, content_type, domain):
         """Attempt to extract Xtream credentials from a portal content list."""
-        try:
-            list_url = "{}?type={}&action=get_ordered_list&genre=*&JsHttpRequest=1-xml".format(portal, content_type)
-            data = make_request(list_url, method="GET", headers=headers, params=None, response_type="json")
-
-            if not data:
-                return {}
-
-            js_data = data.get("js") or {}
-            data_list = js_data.get("data") or []
-
-            first_item = next((v for v in data_list if isinstance(v, dict) and v.get("cmd")), None)
-            if not first_item:
-                return {}
-
-            cmd_val = first_item.get("cmd", "")
-            if str(cmd_val).startswith("/media/"):
-                cmd_val = cmd_val.replace("/media/", "/media/file_")
-
-            create_link_url = "{}?type={}&action=create_link&cmd={}&series=&forced_storage=&disable_ad=0&download=0&force_ch_link_check=0&JsHttpRequest=1-xml".format(
-                portal, content_type, cmd_val
-            )
-
-            link_data = make_request(create_link_url, method="GET", headers=headers, params=None, response_type="json")
-            if not link_data:
-                return {}
-
-            cmd = (link_data.get("js") or {}).get("cmd")
-            if not cmd:
-                return {}
-
-            stream_url = str(cmd)
-            parsed = urlparse(stream_url)
-            if parsed.scheme in ["http", "https"]:
-                stream_url = parsed.geturl()
-
-            match = re.search(r'/movie/([^/]+)/([^/]+)/', stream_url)
-            if match:
-                return {"username": match.group(1), "password": match.group(2)}
-
-        except Exception as e:
-            print("Error fetching Xtream creds:", e, domain)
-
-        return {}
+        return find_credentials(portal, headers, content_type)
 
     def get_stream_url(self):
 
@@ -1079,17 +1053,33 @@ class EStalker_UserInfo(Screen):
         original_url = glob.active_playlist["playlist_info"]["url"]
         referer = os.path.join(original_url, "index.html")
 
+        self.cache_key = (str(portal), str(mac).upper())
+
+        cached = credentials_cache.get(self.cache_key)
+        if cached:
+            self.fetch_xtream_api(cached, delay=0)
+            return
+
         headers = self._build_mag_headers(domain, port, mac, timezone, referer)
 
-        # Try VOD first, then live
-        xtream_creds = self._fetch_xtream_creds(portal, headers, "vod", domain)
-        if not xtream_creds.get("username") or not xtream_creds.get("password"):
-            xtream_creds = self._fetch_xtream_creds(portal, headers, "itv", domain)
+        # VOD and live lookups run side by side in the thread pool, the first one with credentials is used
+        for content_type in ("vod", "itv"):
+            d = threads.deferToThread(self._fetch_xtream_creds, portal, headers, content_type, domain)
+            d.addCallback(self.credsFound)
+            d.addErrback(self.credsFailed)
+
+    def credsFound(self, xtream_creds):
+        if self.closed or self.creds_found:
+            return
 
-        if xtream_creds.get("username") and xtream_creds.get("password"):
+        if xtream_creds and xtream_creds.get("username") and xtream_creds.get("password"):
+            self.creds_found = True
             self.fetch_xtream_api(xtream_creds)
 
-    def fetch_xtream_api(self, xtream_creds):
+    def credsFailed(self, failure):
+        print("Error fetching Xtream creds:", failure.getErrorMessage())
+
+    def fetch_xtream_api(self, xtream_creds, delay=3000):
         """
         if debugs:
             print("*** fetch_xtream_api ***")
@@ -1097,7 +1087,38 @@ class EStalker_UserInfo(Screen):
 
         username = xtream_creds.get("username", "")
         password = xtream_creds.get("password", "")
+
+        if username and password and len(password) != 32:
+            self.xtream_creds = xtream_creds
+            credentials_cache.setdefault(self.cache_key, xtream_creds)
+
+            # the portal has just handed out a stream link for these credentials, give the panel
+            # a moment before asking for the account, without holding up the screen
+            self.timer.start(max(delay, 1), True)
+        else:
+            self.showAccountInfo(None)
+
+    def fetchAccountInfo(self):
+        if self.closed:
+            return
+
         host = glob.active_playlist["playlist_info"]["host"]
+        username = self.xtream_creds.get("username", "")
+        password = self.xtream_creds.get("password", "")
+        api_url = host.rstrip("/") + "/player_api.php?username={}&password={}".format(username, password)
+
+        d = threads.deferToThread(xtream_request, api_url)
+        d.addCallback(self.showAccountInfo)
+        d.addErrback(self.accountInfoFailed)
+
+    def accountInfoFailed(self, failure):
+        print("Error fetching Xtream account:", failure.getErrorMessage())
+        self.showAccountInfo(None)
+
+    def showAccountInfo(self, api_data):
+        if self.closed:
+            return
+
         index = glob.active_playlist["playlist_info"]["index"]
         expiry = glob.active_playlist["playlist_info"]["expiry"]
         status = glob.active_playlist["playlist_info"]["status"]
@@ -1107,28 +1128,23 @@ class EStalker_UserInfo(Screen):
         created_at = ""
         is_trial = ""
 
-        if username and password and len(password) != 32:
-            time.sleep(3)
-            api_url = host.rstrip("/") + "/player_api.php?username={}&password={}".format(username, password)
-            api_data = xtream_request(api_url)
-
-            if api_data and 'user_info' in api_data:
-                user_info = api_data['user_info']
-                active_cons = str(user_info.get('active_cons', ""))
-                max_cons = str(user_info.get('max_connections', ""))
-
-                if user_info.get('auth') == 1:
-                    status_map = {
-                        "Active": _("Active"),
-                        "Banned": _("Banned"),
-                        "Disabled": _("Disabled"),
-                        "Expired": _("Expired"),
-                    }
-                    status = status_map.get(user_info.get("status"), _("Unknown"))
-                    is_trial = user_info.get('is_trial', "")
-
-                created_at = self._format_timestamp(user_info.get('created_at'))
-                expiry = self._format_timestamp(user_info.get('exp_date')) or expiry
+        if api_data and 'user_info' in api_data:
+            user_info = api_data['user_info']
+            active_cons = str(user_info.get('active_cons', ""))
+            max_cons = str(user_info.get('max_connections', ""))
+
+            if user_info.get('auth') == 1:
+                status_map = {
+                    "Active": _("Active"),
+                    "Banned": _("Banned"),
+                    "Disabled": _("Disabled"),
+                    "Expired": _("Expired"),
+                }
+                status = status_map.get(user_info.get("status"), _("Unknown"))
+                is_trial = user_info.get('is_trial', "")
+
+            created_at = self._format_timestamp(user_info.get('created_at'))
+            expiry = self._format_timestamp(user_info.get('exp_date')) or expiry
 
         self["status"].setText(str(status))
         self["expiry"].setText(str(expiry))
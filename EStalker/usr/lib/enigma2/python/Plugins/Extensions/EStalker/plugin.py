@@ -140,6 +140,22 @@ cfg.channelpicons = ConfigYesNo(default=True)
 cfg.infobarpicons = ConfigYesNo(default=True)
 cfg.channelcovers = ConfigYesNo(default=True)
 cfg.infobarcovers = ConfigYesNo(default=True)
+cfg.prefetchlinks = ConfigYesNo(default=True)
+cfg.xtreamcatalog = ConfigYesNo(default=False)
+cfg.xtreamlinks = ConfigYesNo(default=False)
+cfg.ratelimit = ConfigSelectionNumber(0, 50, 1, default=0)
+cfg.rateburst = ConfigSelectionNumber(1, 50, 1, default=16)
+cfg.hedging = ConfigYesNo(default=False)
+cfg.dnscache = ConfigYesNo(default=True)
+cfg.profiling = ConfigSelection(default="off", choices=[
+    ("off", _("Off")),
+    ("cpu", _("CPU (cProfile)")),
+    ("memory", _("CPU and memory (tracemalloc)")),
+])
+cfg.profiledir = ConfigDirectory(default="/tmp/")
+cfg.zaplog = ConfigYesNo(default=False)
+cfg.resumemax = ConfigSelectionNumber(100, 5000, 100, default=1000)
+cfg.resumecheckpoint = ConfigSelectionNumber(0, 300, 30, default=60)
 
 
 # Rename old files if they exist
@@ -225,8 +241,19 @@ if not os.path.isfile(cfg.playlists_json.value):
 
 
 def main(session, **kwargs):
+    from . import dnscache
+    dnscache.install()
+    dnscache.preresolve()
+
+    from . import profiler
+    profiler.start()
+
+    def closed(*args):
+        profiler.stop()
+        dnscache.uninstall()
+
     from . import mainmenu
-    session.open(mainmenu.EStalker_MainMenu)
+    session.openWithCallback(closed, mainmenu.EStalker_MainMenu)
     return
 
 
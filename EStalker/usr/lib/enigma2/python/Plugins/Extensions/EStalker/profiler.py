@@ -0,0 +1,176 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Profiling mode for finding UI stalls on the box (cfg.profiling, off by default).
+# Screen classes decorated with @profiled have their entry points (entry_points below) run under one
+# cProfile profiler while a session is active. A session starts when the plugin opens and is written
+# to cfg.profiledir when the main menu closes:
+#   estalker_<time>.pstats        load with pstats / snakeviz
+#   estalker_<time>.txt           entry point timings, top functions by cumulative time, top allocations
+#   estalker_<time>.tracemalloc   tracemalloc snapshot (memory mode, python 3 only)
+# Only the main thread is profiled, the one the UI stalls on.
+
+import functools
+import os
+import threading
+import time
+
+from collections import OrderedDict
+
+try:
+    import cProfile
+    import pstats
+except ImportError:
+    cProfile = None
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from .plugin import cfg
+
+
+entry_points = (
+    "createSetup",
+    "buildLists",
+    "buildList1",
+    "buildList2",
+    "buildCategories",
+    "buildVod",
+    "buildSeries",
+    "buildSeasons",
+    "buildEpisodes",
+    "getLevel2",
+    "selectionChanged",
+    "next",
+    "__next__",
+    "downloadApiData",
+    "playStream",
+)
+
+top_functions = 40
+top_allocations = 30
+
+
+class ProfileSession(object):
+    def __init__(self, memory):
+        self.started = time.time()
+        self.thread = threading.current_thread()
+        self.profile = cProfile.Profile()
+        self.depth = 0
+        self.timings = OrderedDict()
+        self.memory = memory and tracemalloc is not None
+        self.own_tracing = False
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            self.own_tracing = True
+
+    def enter(self):
+        if self.depth == 0:
+            self.profile.enable()
+        self.depth += 1
+
+    def leave(self, name, seconds):
+        self.depth -= 1
+        if self.depth == 0:
+            self.profile.disable()
+
+        timing = self.timings.setdefault(name, [0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+        timing[2] = max(timing[2], seconds)
+
+    def dump(self, directory):
+        base = os.path.join(directory, time.strftime("estalker_%Y%m%d_%H%M%S", time.localtime(self.started)))
+
+        self.profile.dump_stats(base + ".pstats")
+
+        with open(base + ".txt", "w") as f:
+            f.write("EStalker profile, {:.0f}s session\n\n".format(time.time() - self.started))
+            f.write("{:<50} {:>7} {:>10} {:>10}\n".format("entry point", "calls", "total ms", "max ms"))
+
+            for name, (calls, total, longest) in sorted(self.timings.items(), key=lambda item: -item[1][1]):
+                f.write("{:<50} {:>7} {:>10} {:>10}\n".format(name, calls, int(total * 1000), int(longest * 1000)))
+
+            f.write("\n")
+            stats = pstats.Stats(self.profile, stream=f)
+            stats.sort_stats("cumulative").print_stats(top_functions)
+
+            if self.memory:
+                snapshot = tracemalloc.take_snapshot()
+                snapshot.dump(base + ".tracemalloc")
+
+                f.write("\ntop allocations\n")
+                for stat in snapshot.statistics("lineno")[:top_allocations]:
+                    f.write("{}\n".format(stat))
+
+        return base
+
+
+session = None
+
+
+def start():
+    """Starts a profiling session when cfg.profiling is on."""
+    global session
+
+    mode = cfg.profiling.value
+    if session is not None or mode == "off" or cProfile is None:
+        return
+
+    session = ProfileSession(mode == "memory")
+    print("[EStalker] profiling started")
+
+
+def stop(*args):
+    """Ends the session and writes the results to cfg.profiledir."""
+    global session
+
+    if session is None:
+        return
+
+    current, session = session, None
+
+    try:
+        directory = cfg.profiledir.value or "/tmp/"
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        print("[EStalker] profile written to", current.dump(directory))
+    except Exception as e:
+        print("[EStalker] profile dump error:", e)
+
+    if current.own_tracing:
+        tracemalloc.stop()
+
+
+def _wrap(name, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        current = session
+        if current is None or threading.current_thread() is not current.thread:
+            return function(*args, **kwargs)
+
+        started = time.time()
+        try:
+            current.enter()
+        except ValueError:
+            # another profiler is already running in this interpreter
+            return function(*args, **kwargs)
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            current.leave(name, time.time() - started)
+
+    return wrapper
+
+
+def profiled(cls):
+    """Class decorator, wraps the entry points the class defines itself."""
+    for name in entry_points:
+        function = cls.__dict__.get(name)
+        if callable(function):
+            setattr(cls, name, _wrap("{}.{}".format(cls.__name__, name), function))
+    return cls
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Per host token bucket shared by every request to a portal (make_request, xtream_request,
+# the playlist checks and the short EPG fetcher).
+# cfg.ratelimit tokens are added per second up to cfg.rateburst, each request takes one.
+# Off by default (cfg.ratelimit 0), for portals that ban boxes sending too many requests.
+# Waiting requests are served by priority, and the lower classes leave a few tokens in the
+# bucket, so EPG and prefetch work never takes the tokens a worker thread play or page change needs.
+# Only worker threads are limited. Requests made on the reactor (UI) thread, which is where
+# create_link, page loads and reauthorize run, are only accounted: they take their token at once,
+# running the bucket into debt if needed, so the UI never blocks and the background classes wait longer.
+
+import heapq
+import itertools
+import threading
+import time
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+from twisted.python import threadable
+
+from .plugin import cfg
+
+
+PLAYBACK = 0
+NAVIGATION = 1
+EPG = 2
+PREFETCH = 3
+
+# tokens a request of each class has to leave in the bucket
+reserve = {
+    PLAYBACK: 0,
+    NAVIGATION: 0,
+    EPG: 1,
+    PREFETCH: 2,
+}
+
+
+class TokenBucket(object):
+    def __init__(self, host):
+        self.host = host
+        self.tokens = float(self.burst())
+        self.updated = time.time()
+        self.waiting = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition(threading.Lock())
+
+    @staticmethod
+    def rate():
+        return float(cfg.ratelimit.value)
+
+    @staticmethod
+    def burst():
+        return max(1, int(cfg.rateburst.value))
+
+    def _refill(self, now):
+        burst = self.burst()
+        self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate())
+        self.updated = now
+
+    def _needed(self, priority):
+        # the reserve never asks for more than the bucket can hold
+        return 1 + min(reserve.get(priority, 0), self.burst() - 1)
+
+    def _wait_for(self, needed):
+        rate = self.rate()
+        if rate <= 0:
+            return 0
+        return max(0.01, (needed - self.tokens) / rate)
+
+    def delay(self, priority=NAVIGATION):
+        """
+        Non blocking, for reactor code: takes a token and returns 0, or returns the seconds
+        to wait before asking again. Queued blocking requests of the same or a higher class go first.
+        """
+        with self.condition:
+            if self.rate() <= 0:
+                return 0
+
+            self._refill(time.time())
+            needed = self._needed(priority)
+
+            if (not self.waiting or self.waiting[0][0] > priority) and self.tokens >= needed:
+                self.tokens -= 1
+                return 0
+
+            return self._wait_for(needed)
+
+    def acquire(self, priority=NAVIGATION):
+        """Blocks the calling worker thread until a token of its class is free, never the reactor thread."""
+        with self.condition:
+            if self.rate() <= 0:
+                return
+
+            if threadable.isInIOThread():
+                self._refill(time.time())
+                self.tokens = max(self.tokens - 1, -self.burst())
+                return
+
+            entry = (priority, next(self.counter))
+            heapq.heappush(self.waiting, entry)
+
+            try:
+                while True:
+                    # the limit can be turned off while requests are waiting
+                    if self.rate() <= 0:
+                        return
+
+                    self._refill(time.time())
+                    needed = self._needed(priority)
+
+                    if self.waiting[0] == entry and self.tokens >= needed:
+                        self.tokens -= 1
+                        return
+
+                    self.condition.wait(self._wait_for(needed))
+            finally:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+
+
+buckets = {}
+buckets_lock = threading.Lock()
+
+
+def get_bucket(url):
+    parsed = urlparse(url)
+    host = "{}://{}".format(parsed.scheme or "http", parsed.netloc)
+
+    with buckets_lock:
+        bucket = buckets.get(host)
+        if bucket is None:
+            bucket = buckets[host] = TokenBucket(host)
+        return bucket
+
+
+def acquire(url, priority=NAVIGATION):
+    get_bucket(url).acquire(priority)
+
+
+def delay(url, priority=NAVIGATION):
+    return get_bucket(url).delay(priority)
@@ -1,8 +1,16 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+# Resume points, kept in memory for the whole session and stored as an append-only log.
+# Every save or delete appends one json line, the log is rewritten (compacted) once it holds
+# too many superseded lines. Entries are [lru, pos, length], the oldest are dropped past cfg.resumemax.
+# Appends and the compacted file are fsynced before they count as written, so a power cut can lose at
+# most the line being written, never the log.
+
+import json
 import os
 
+from collections import OrderedDict
 from time import time
 
 try:
@@ -10,52 +18,116 @@ try:
 except ImportError:
     import pickle as cPickle
 
+from .plugin import cfg, dir_etc
 
-def setResumePoint(session):
-    global resumePointCache
+
+log_file = os.path.join(dir_etc, "resumepoints.log")
+old_pickle_file = os.path.join(dir_etc, "resumepoints.pkl")
+
+# compact when the log has this many more lines than live entries
+compact_slack = 200
+
+_log_lines = 0
+
+
+def _max_entries():
+    try:
+        return int(cfg.resumemax.value)
+    except Exception:
+        return 1000
+
+
+def _sync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def _sync_dir(path):
+    # makes the rename of the compacted log itself durable
+    try:
+        fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    except (OSError, AttributeError):
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _append(record):
+    global _log_lines
+    try:
+        with open(log_file, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            _sync(f)
+        _log_lines += 1
+    except Exception as e:
+        print("[EStalker] Failed to write resumepoints:", e)
+        return
+
+    if _log_lines > len(resumePointCache) * 2 + compact_slack:
+        saveResumePoints()
+
+
+def _touch(key, value):
+    # resumePointCache is kept in LRU order, most recently used last
+    resumePointCache.pop(key, None)
+    resumePointCache[key] = value
+
+
+def _evict():
+    maximum = _max_entries()
+    while len(resumePointCache) > maximum:
+        resumePointCache.popitem(last=False)
+
+
+def setResumePoint(session, pos=None, min_move=0):
+    # min_move (pts) skips the write when the stored position is already that close,
+    # used by the periodic checkpoint so a paused or barely moved stream is not rewritten
     service = session.nav.getCurrentService()
     ref = session.nav.getCurrentlyPlayingServiceReference()
-    seek = service.seek()
-    pos = seek.getPlayPosition()
 
-    if not service or not ref or "http" not in ref.toString() or not seek or pos[0]:
+    if not service or not ref or "http" not in ref.toString():
         return
 
-    if session.nav.getCurrentlyPlayingServiceReference():
-        if "http" in session.nav.getCurrentlyPlayingServiceReference().toString():
-            ref = session.nav.getCurrentlyPlayingServiceReference()
+    seek = service.seek()
+    if not seek:
+        return
 
-    if (service is not None) and (ref is not None):
-        seek = service.seek()
-        if seek:
-            pos = seek.getPlayPosition()
-            if not pos[0]:
-                key = ref.toString()
-                lru = int(time())
-                length = seek.getLength()
-                if length:
-                    length = length[1]
-                else:
-                    length = None
-                resumePointCache[key] = [lru, pos[1], length]
+    if pos is None:
+        pos = seek.getPlayPosition()
+        if pos[0]:
+            return
+        pos = pos[1]
 
-                saveResumePoints()
+    key = ref.toString()
+    if min_move:
+        entry = resumePointCache.get(key)
+        if entry and entry[1] is not None and abs(pos - entry[1]) < min_move:
+            return
 
+    lru = int(time())
+    length = seek.getLength()
+    if length and not length[0]:
+        length = length[1]
+    else:
+        length = None
 
-def delResumePoint(ref):
-    global resumePointCache
-    try:
-        del resumePointCache[ref.toString()]
-    except KeyError:
-        pass
+    _touch(key, [lru, pos, length])
+    _append({"k": key, "v": [lru, pos, length]})
+    _evict()
 
-    saveResumePoints()
 
+def delResumePoint(ref):
+    key = ref.toString()
+    if resumePointCache.pop(key, None) is not None:
+        _append({"k": key, "d": 1})
 
-def getResumePoint(session):
-    global resumePointCache
-    resumePointCache = loadResumePoints()
 
+def getResumePoint(session):
     ref = None
     if session.nav.getCurrentlyPlayingServiceReference():
         if "http" in session.nav.getCurrentlyPlayingServiceReference().toString():
@@ -63,35 +135,91 @@ def getResumePoint(session):
 
     if (ref is not None) and (ref.type != 1):
         try:
-            entry = resumePointCache[ref.toString()]
-            entry[0] = int(time())  # update LRU timestamp
+            key = ref.toString()
+            entry = resumePointCache[key]
+            entry[0] = int(time())  # update LRU timestamp, written with the next save or compaction
+            _touch(key, entry)
             return entry[1]
         except KeyError:
             return None
 
 
 def saveResumePoints():
-    global resumePointCache
+    """Rewrite the log with one line per live entry."""
+    global _log_lines
+    _evict()
+
+    tmp_file = log_file + ".tmp"
     try:
-        with open(os.path.join("/etc/enigma2/estalker", "resumepoints.pkl"), "wb") as f:
-            cPickle.dump(resumePointCache, f, cPickle.HIGHEST_PROTOCOL)
+        with open(tmp_file, "w") as f:
+            for key, value in resumePointCache.items():
+                f.write(json.dumps({"k": key, "v": value}) + "\n")
+            _sync(f)
+        os.rename(tmp_file, log_file)
+        _sync_dir(log_file)
+        _log_lines = len(resumePointCache)
     except Exception as e:
         print("[EStalker] Failed to write resumepoints:", e)
 
 
-def loadResumePoints():
+def _load_pickle():
     try:
-        with open(os.path.join("/etc/enigma2/estalker", "resumepoints.pkl"), "rb") as f:
-            PickleFile = cPickle.load(f)
-            return PickleFile
+        with open(old_pickle_file, "rb") as f:
+            return cPickle.load(f) or {}
     except Exception as e:
         print("[EStalker] Failed to load resumepoints:", e)
         return {}
 
 
+def loadResumePoints():
+    global _log_lines
+    cache = OrderedDict()
+    lines = 0
+
+    if os.path.exists(log_file):
+        try:
+            with open(log_file, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        key = record["k"]
+                    except (ValueError, KeyError, TypeError):
+                        # partly written last line after a power cut
+                        continue
+
+                    lines += 1
+                    if record.get("d"):
+                        cache.pop(key, None)
+                    else:
+                        cache.pop(key, None)
+                        cache[key] = list(record["v"])
+        except Exception as e:
+            print("[EStalker] Failed to load resumepoints:", e)
+
+    elif os.path.exists(old_pickle_file):
+        entries = _load_pickle()
+        for key in sorted(entries, key=lambda k: entries[k][0]):
+            cache[key] = entries[key]
+        lines = -1
+
+    _log_lines = lines
+    return cache
+
+
 def updateresumePointCache():
     global resumePointCache
     resumePointCache = loadResumePoints()
 
+    # first run after the pickle store, a lowered cap, or a log left mostly superseded
+    if _log_lines < 0 or _log_lines > len(resumePointCache) * 2 + compact_slack or len(resumePointCache) > _max_entries():
+        saveResumePoints()
+
+        if os.path.exists(old_pickle_file) and os.path.exists(log_file):
+            try:
+                os.remove(old_pickle_file)
+            except OSError:
+                pass
+
 
-resumePointCache = loadResumePoints()
+resumePointCache = OrderedDict()
+updateresumePointCache()
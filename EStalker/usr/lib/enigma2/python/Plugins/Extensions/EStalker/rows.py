@@ -0,0 +1,261 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Row records for the channel, vod and series lists (list2 / list3 / list4).
+# Fixed __slots__, so a row costs less than the 20+ element list it replaces and carries
+# no per row __dict__. Fields are read by name in the list builders, the old positional
+# access (row[16], row[16] = True, row[1:3]) keeps working for the rest of the screens.
+
+# Positions of pages not downloaded yet hold a Placeholder: it keeps only its index, every other
+# field is a class attribute shared by all of them, and it can not be written to.
+
+# row class -> its placeholder class
+_placeholders = {}
+
+
+class Placeholder(object):
+    __slots__ = ("index",)
+
+    # the field names of the row it stands in for
+    fields = ()
+    loaded = False
+
+    def __init__(self, index):
+        object.__setattr__(self, "index", index)
+
+    @classmethod
+    def empty(cls, index):
+        return cls(index)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is a placeholder for a page not downloaded yet, it can not be changed".format(self))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [getattr(self, name) for name in self.fields[index]]
+        return getattr(self, self.fields[index])
+
+    def __setitem__(self, index, value):
+        setattr(self, self.fields[index], value)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __iter__(self):
+        for name in self.fields:
+            yield getattr(self, name)
+
+    def __eq__(self, other):
+        if isinstance(other, Placeholder):
+            return type(self) is type(other) and self.index == other.index
+        return False
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}.empty({})".format(type(self).__name__, self.index)
+
+
+class Row(object):
+    __slots__ = ()
+
+    # values for the placeholder rows of pages not downloaded yet, everything after index
+    placeholder = ()
+    loaded = True
+
+    @classmethod
+    def empty(cls, index):
+        """The read only placeholder for position index of a page not downloaded yet."""
+        placeholder = _placeholders.get(cls)
+        if placeholder is None:
+            attributes = dict(zip(cls.__slots__[1:], cls.placeholder))
+            attributes.update(__slots__=(), fields=cls.__slots__)
+            placeholder = _placeholders[cls] = type(cls.__name__, (Placeholder,), attributes)
+        return placeholder(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [getattr(self, name) for name in self.__slots__[index]]
+        return getattr(self, self.__slots__[index])
+
+    def __setitem__(self, index, value):
+        setattr(self, self.__slots__[index], value)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __iter__(self):
+        for name in self.__slots__:
+            yield getattr(self, name)
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            return type(self) is type(other) and list(self) == list(other)
+        return list(self) == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join(repr(value) for value in self))
+
+
+class LiveRow(Row):
+    __slots__ = (
+        "index", "name", "stream_id", "stream_icon", "epg_channel_id", "number", "category_id", "cmd", "service_ref",
+        "nowtime", "nowtitle", "nowdesc", "nexttime", "nexttitle", "nextdesc", "next_url", "favourite", "watching", "hidden",
+        "nowunixtime", "nextunixtime",
+    )
+
+    placeholder = ("", "", "", "", "", "", "", "", "", "", "", "", "", "", "", False, False, False, None, None)
+
+    def __init__(self, index, name, stream_id, stream_icon, epg_channel_id, number, category_id, cmd, service_ref,
+                 nowtime, nowtitle, nowdesc, nexttime, nexttitle, nextdesc, next_url, favourite, watching, hidden,
+                 nowunixtime, nextunixtime):
+        self.index = index
+        self.name = name
+        self.stream_id = stream_id
+        self.stream_icon = stream_icon
+        self.epg_channel_id = epg_channel_id
+        self.number = number
+        self.category_id = category_id
+        self.cmd = cmd
+        self.service_ref = service_ref
+        self.nowtime = nowtime
+        self.nowtitle = nowtitle
+        self.nowdesc = nowdesc
+        self.nexttime = nexttime
+        self.nexttitle = nexttitle
+        self.nextdesc = nextdesc
+        self.next_url = next_url
+        self.favourite = favourite
+        self.watching = watching
+        self.hidden = hidden
+        self.nowunixtime = nowunixtime
+        self.nextunixtime = nextunixtime
+
+
+class VodRow(Row):
+    __slots__ = (
+        "index", "name", "stream_id", "cover", "added", "rating", "next_url", "favourite", "container_extension", "year",
+        "hidden", "tmdb", "trailer", "category_id", "cmd",
+    )
+
+    placeholder = ("", "", "", "", "", "", False, "", "", False, "", "", "", "")
+
+    def __init__(self, index, name, stream_id, cover, added, rating, next_url, favourite, container_extension, year,
+                 hidden, tmdb, trailer, category_id, cmd):
+        self.index = index
+        self.name = name
+        self.stream_id = stream_id
+        self.cover = cover
+        self.added = added
+        self.rating = rating
+        self.next_url = next_url
+        self.favourite = favourite
+        self.container_extension = container_extension
+        self.year = year
+        self.hidden = hidden
+        self.tmdb = tmdb
+        self.trailer = trailer
+        self.category_id = category_id
+        self.cmd = cmd
+
+
+class SeriesRow(Row):
+    __slots__ = (
+        "index", "name", "series_id", "cover", "plot", "cast", "director", "genre", "release_date", "rating", "last_modified",
+        "next_url", "tmdb", "hidden", "year", "backdrop", "favourite", "category_id",
+    )
+
+    placeholder = ("", "", "", "", "", "", "", "", "", "", "", "", False, "", "", False, "")
+
+    def __init__(self, index, name, series_id, cover, plot, cast, director, genre, release_date, rating, last_modified,
+                 next_url, tmdb, hidden, year, backdrop, favourite, category_id):
+        self.index = index
+        self.name = name
+        self.series_id = series_id
+        self.cover = cover
+        self.plot = plot
+        self.cast = cast
+        self.director = director
+        self.genre = genre
+        self.release_date = release_date
+        self.rating = rating
+        self.last_modified = last_modified
+        self.next_url = next_url
+        self.tmdb = tmdb
+        self.hidden = hidden
+        self.year = year
+        self.backdrop = backdrop
+        self.favourite = favourite
+        self.category_id = category_id
+
+
+class SeasonRow(Row):
+    __slots__ = (
+        "index", "name", "season_id", "cover", "plot", "cast", "director", "genre", "release_date", "rating", "last_modified",
+        "next_url", "tmdb", "hidden", "year", "backdrop", "favourite", "category_id", "season_number",
+    )
+
+    placeholder = ("", "", "", "", "", "", "", "", "", "", "", "", False, "", "", False, "", "")
+
+    def __init__(self, index, name, season_id, cover, plot, cast, director, genre, release_date, rating, last_modified,
+                 next_url, tmdb, hidden, year, backdrop, favourite, category_id, season_number):
+        self.index = index
+        self.name = name
+        self.season_id = season_id
+        self.cover = cover
+        self.plot = plot
+        self.cast = cast
+        self.director = director
+        self.genre = genre
+        self.release_date = release_date
+        self.rating = rating
+        self.last_modified = last_modified
+        self.next_url = next_url
+        self.tmdb = tmdb
+        self.hidden = hidden
+        self.year = year
+        self.backdrop = backdrop
+        self.favourite = favourite
+        self.category_id = category_id
+        self.season_number = season_number
+
+
+class EpisodeRow(Row):
+    __slots__ = (
+        "index", "name", "season_id", "cover", "plot", "cast", "director", "genre", "release_date", "rating", "last_modified",
+        "next_url", "tmdb", "hidden", "year", "backdrop", "favourite", "category_id", "season_number", "episode_id", "cmd",
+    )
+
+    placeholder = ("", "", "", "", "", "", "", "", "", "", "", "", False, "", "", False, "", "", "", "")
+
+    def __init__(self, index, name, season_id, cover, plot, cast, director, genre, release_date, rating, last_modified,
+                 next_url, tmdb, hidden, year, backdrop, favourite, category_id, season_number, episode_id, cmd):
+        self.index = index
+        self.name = name
+        self.season_id = season_id
+        self.cover = cover
+        self.plot = plot
+        self.cast = cast
+        self.director = director
+        self.genre = genre
+        self.release_date = release_date
+        self.rating = rating
+        self.last_modified = last_modified
+        self.next_url = next_url
+        self.tmdb = tmdb
+        self.hidden = hidden
+        self.year = year
+        self.backdrop = backdrop
+        self.favourite = favourite
+        self.category_id = category_id
+        self.season_number = season_number
+        self.episode_id = episode_id
+        self.cmd = cmd
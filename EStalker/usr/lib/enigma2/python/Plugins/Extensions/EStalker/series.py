@@ -15,7 +15,6 @@ from itertools import cycle, islice
 import zlib
 import tempfile
 import hashlib
-import unicodedata
 
 try:
     from http.client import HTTPConnection
@@ -38,7 +37,7 @@ except ImportError:
 from PIL import Image
 # from requests.adapters import HTTPAdapter, Retry
 from twisted.internet import reactor
-from twisted.web.client import Agent, downloadPage, readBody
+from twisted.web.client import Agent, readBody
 from twisted.web.http_headers import Headers
 
 try:
@@ -63,8 +62,19 @@ from enigma import ePicLoad, eServiceReference, eTimer
 from . import _
 from . import estalker_globals as glob
 from .plugin import (cfg, common_path, dir_tmp, pythonVer, screenwidth, skin_directory, debugs, isDreambox)
+from .pagestore import PageStore
 from .eStaticText import StaticText
+from .breaker import is_open, unreachable_message
 from .utils import get_local_timezone, make_request,  perform_handshake, get_profile_data
+from .profiler import profiled
+from .netstats import count_retry, track
+from .hedge import hedged_request
+from .ratelimit import PLAYBACK
+from .xtream import category_items, direct_link, learn_link
+from . import tmdbcache
+from .normalize import stripjunk
+from .rows import EpisodeRow, SeasonRow, SeriesRow
+from .virtuallist import VirtualList
 
 
 if pythonVer == 3:
@@ -92,6 +102,7 @@ def clean_names(response):
     return response
 
 
+@profiled
 class EStalker_Series_Categories(Screen):
     ALLOW_SUSPEND = True
 
@@ -157,6 +168,7 @@ class EStalker_Series_Categories(Screen):
         self["page"] = StaticText("")
         self["listposition"] = StaticText("")
         self.itemsperpage = 14
+        self.virtual_list = VirtualList(self["main_list"], self.itemsperpage)
 
         self.searchString = ""
         self.filterresult = ""
@@ -328,56 +340,6 @@ class EStalker_Series_Categories(Screen):
         self._px_watched = LoadPixmap(os.path.join(common_path, "watched.png"))
         self._px_more = LoadPixmap(os.path.join(common_path, "more.png"))
 
-        # Precompiled regex (stripjunk)
-        self._re_has_ascii = re.compile(r'[\x00-\x7F]')
-        self._re_has_non_ascii = re.compile(r'[^\x00-\x7F]')
-
-        self._re_remove_non_ascii = re.compile(r'[^\x00-\x7F]+')
-
-        self._re_end_the = re.compile(r'\s*the$', re.IGNORECASE)
-        self._re_prefix_xx_colon = re.compile(r'^\w{2}:', re.IGNORECASE)
-        self._re_prefix_xx_pipe_xx = re.compile(r'^\w{2}\|\w{2}\s', re.IGNORECASE)
-
-        self._re_leading_doublepipes = re.compile(r'^\|\|.*?\|\|')
-        self._re_leading_singlepipe_block = re.compile(r'^\|.*?\|')
-        self._re_any_pipe_block = re.compile(r'\|.*?\|')
-
-        self._re_leading_doublebars = re.compile(r'^┃┃.*?┃┃')
-        self._re_leading_singlebar_block = re.compile(r'^┃.*?┃')
-        self._re_any_bar_block = re.compile(r'┃.*?┃')
-
-        self._re_parens = re.compile(r'\(\(.*?\)\)|\([^()]*\)')
-        self._re_brackets = re.compile(r'\[\[.*?\]\]|\[.*?\]')
-
-        self._re_is_year_only = re.compile(r'^\d{4}$')
-        self._re_trailing_year = re.compile(r'[\s\-]*(?:[\(\[\"]?\d{4}[\)\]\"]?)$')
-
-        self._re_lang_dash_prefix = re.compile(r'^[A-Za-z0-9\-]{1,7}\s*-\s*', re.IGNORECASE)
-
-        # Bad substrings
-        bad_strings = [
-            "ae|", "al|", "ar|", "at|", "ba|", "be|", "bg|", "br|", "cg|", "ch|", "cz|", "da|", "de|", "dk|",
-            "ee|", "en|", "es|", "eu|", "ex-yu|", "fi|", "fr|", "gr|", "hr|", "hu|", "in|", "ir|", "it|", "lt|",
-            "mk|", "mx|", "nl|", "no|", "pl|", "pt|", "ro|", "rs|", "ru|", "se|", "si|", "sk|", "sp|", "tr|",
-            "uk|", "us|", "yu|",
-            "1080p", "1080p-dual-lat-cine-calidad.com", "1080p-dual-lat-cine-calidad.com-1",
-            "1080p-dual-lat-cinecalidad.mx", "1080p-lat-cine-calidad.com", "1080p-lat-cine-calidad.com-1",
-            "1080p-lat-cinecalidad.mx", "1080p.dual.lat.cine-calidad.com", "3d", "'", "#", "(", ")", "-", "[]", "/",
-            "4k", "720p", "aac", "blueray", "ex-yu:", "fhd", "hd", "hdrip", "hindi", "imdb", "multi:", "multi-audio",
-            "multi-sub", "multi-subs", "multisub", "ozlem", "sd", "top250", "u-", "uhd", "vod", "x264",
-            "amz", "dolby", "audio", "8k", "3840p", "50fps", "60fps", "hevc", "raw ", "vip ", "NF", "d+", "a+", "vp", "prmt", "mrvl"
-        ]
-        self._re_bad_strings = re.compile('|'.join(map(re.escape, bad_strings)), re.IGNORECASE)
-
-        # Bad suffixes
-        bad_suffix = [
-            " al", " ar", " ba", " da", " de", " en", " es", " eu", " ex-yu", " fi", " fr", " gr", " hr", " mk",
-            " nl", " no", " pl", " pt", " ro", " rs", " ru", " si", " swe", " sw", " tr", " uk", " yu"
-        ]
-        self._re_bad_suffix = re.compile(r'(' + '|'.join(map(re.escape, bad_suffix)) + r')$', re.IGNORECASE)
-
-        self._re_dots_underscores = re.compile(r"[._'\*]")
-
         self.adult_keywords = set([
             "adult", "+18", "18+", "18 rated", "xxx", "sex", "porn",
             "voksen", "volwassen", "aikuinen", "Erwachsene", "dorosly",
@@ -708,7 +670,7 @@ class EStalker_Series_Categories(Screen):
             for index, channel in enumerate(response):
 
                 if not isinstance(channel, dict) or not channel:
-                    self.list2.append([index, "", "", "", "", "", "", "", "", "", "", "", "", False, "", "", False, ""])
+                    self.list2.append(SeriesRow.empty(index))
                     # 0 index, 1 name, 2 series_id, 3 cover, 4 plot, 5 cast, 6 director, 7 genre, 8 releaseDate, 9 rating, 10 last_modified, 11 next_url, 12 tmdb, 13 hidden, 14 year, 15 backdrop, 16 favourite, 17 category_id
                     continue
 
@@ -803,7 +765,7 @@ class EStalker_Series_Categories(Screen):
                     glob.active_playlist["player_info"]["seriesfavourites"] = []
 
                 # 0 index, 1 name, 2 series_id, 3 cover, 4 plot, 5 cast, 6 director, 7 genre, 8 releaseDate, 9 rating, 10 last_modified, 11 next_url, 12 tmdb, 13 hidden, 14 year, 15 backdrop, 16 favourite, 17 category_id
-                self.list2.append([
+                self.list2.append(SeriesRow(
                     index,
                     str(name),
                     str(series_id),
@@ -822,7 +784,7 @@ class EStalker_Series_Categories(Screen):
                     str(backdrop_path),
                     favourite,
                     str(category_id)
-                ])
+                ))
 
         if self.seriesfirstlist:
             glob.originalChannelList2 = self.list2[:]
@@ -841,7 +803,7 @@ class EStalker_Series_Categories(Screen):
             for index, channel in enumerate(response):
 
                 if not isinstance(channel, dict) or not channel:
-                    self.list3.append([index, "", "", "", "", "", "", "", "", "", "", "", "", False, "", "", False, "", ""])
+                    self.list3.append(SeasonRow.empty(index))
                     # 0 index, 1 name, 2 series_id, 3 cover, 4 plot, 5 cast, 6 director, 7 genre, 8 releaseDate, 9 rating, 10 last_modified, 11 next_url, 12 tmdb, 13 hidden, 14 year, 15 backdrop, 16 favourite, 17 category_id, 18 season
                     continue
 
@@ -918,7 +880,7 @@ class EStalker_Series_Categories(Screen):
                 favourite = False
 
                 # 0 index, 1 name, 2 season_id, 3 cover, 4 plot, 5 cast, 6 director, 7 genre, 8 releaseDate, 9 rating, 10 last_modified, 11 next_url, 12 tmdb, 13 hidden, 14 year, 15 backdrop, 16 favourite, 17 category_id, 18 season_number
-                self.list3.append([
+                self.list3.append(SeasonRow(
                     index,
                     str(name),
                     str(season_id),
@@ -938,9 +900,9 @@ class EStalker_Series_Categories(Screen):
                     favourite,
                     str(category_id),
                     str(season_number)
-                ])
+                ))
 
-        self.list3.sort(key=lambda x: int(x[18]) if x[18].isdigit() else 0)
+        self.list3.sort(key=lambda x: int(x.season_number) if x.season_number.isdigit() else 0)
 
         if self.seasonsfirstlist:
             glob.originalChannelList3 = self.list3[:]
@@ -1010,7 +972,7 @@ class EStalker_Series_Categories(Screen):
                 episode_id = episode_num
                 name = "Episode %d" % episode_num
 
-                self.list4.append([
+                self.list4.append(EpisodeRow(
                     index,
                     str(name),
                     str(season_id),
@@ -1032,7 +994,7 @@ class EStalker_Series_Categories(Screen):
                     str(season_number),
                     str(episode_id),
                     str(cmd)
-                ])
+                ))
 
         if self.episodesfirstlist:
             glob.originalChannelList4 = self.list4[:]
@@ -1045,8 +1007,8 @@ class EStalker_Series_Categories(Screen):
             print("*** downloadApiData ***", url)
 
         if self.level == 2:
-            if not hasattr(self, 'all_data') or not isinstance(self.all_data, list):
-                self.all_data = []
+            if not isinstance(getattr(self, 'all_data', None), PageStore):
+                self.all_data = PageStore()
 
             paged_url = self._updateUrlPage(url, self.current_page)
 
@@ -1072,26 +1034,31 @@ class EStalker_Series_Categories(Screen):
                         self.total_items = 0
                     current_page_data = js.get("data", [])
 
-                    if not hasattr(self, 'all_data') or not isinstance(self.all_data, list) or not self.all_data:
-                        self.all_data = [{} for _ in range(self.total_items)]
+                    if not isinstance(self.all_data, PageStore) or not self.all_data:
+                        self.all_data = PageStore()
 
                     self.sort_check = False
 
-                    # Calculate the position where this page's data should be stored
-                    start_index = (self.current_page - 1) * 14
-
-                    # Insert the new data at the correct positions
-                    for i, item in enumerate(current_page_data):
-                        self.all_data[start_index + i] = item
+                    if current_page_data:
+                        self.all_data.add(self.current_page, current_page_data, self.total_items)
                         self.pages_downloaded.add(paged_url)
 
+                        if self.current_page == 1:
+                            items = category_items(paged_url, current_page_data, self.total_items, self.headers)
+                            if items:
+                                if pythonVer == 3 and glob.hassuperscript:
+                                    clean_names({"js": {"data": items}})
+
+                                for page in self.all_data.fill(items):
+                                    self.pages_downloaded.add(self._updateUrlPage(url, page))
+
                     return self.all_data
 
             except Exception as e:
                 print("Error downloading API data for page {}: {}".format(self.current_page, e))
                 return self.all_data
 
-            self.session.openWithCallback(self.back, MessageBox, _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
+            self.session.openWithCallback(self.back, MessageBox, unreachable_message(self.portal) or _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
             return self.all_data
 
         elif self.level == 3:
@@ -1121,17 +1088,13 @@ class EStalker_Series_Categories(Screen):
                         self.seasons_total_items = 0
                     current_page_data = js.get("data", [])
 
-                    if not hasattr(self, 'all_seasons_data') or not isinstance(self.all_seasons_data, list) or not self.all_seasons_data:
-                        self.all_seasons_data = [{} for _ in range(self.seasons_total_items)]
+                    if not isinstance(self.all_seasons_data, PageStore) or not self.all_seasons_data:
+                        self.all_seasons_data = PageStore()
 
                     self.sort_check = False
 
-                    # Calculate the position where this page's data should be stored
-                    start_index = (self.seasons_current_page - 1) * 14
-
-                    # Insert the new data at the correct positions
-                    for i, item in enumerate(current_page_data):
-                        self.all_seasons_data[start_index + i] = item
+                    if current_page_data:
+                        self.all_seasons_data.add(self.seasons_current_page, current_page_data, self.seasons_total_items)
                         self.seasons_pages_downloaded.add(paged_url)
 
                     return self.all_seasons_data
@@ -1140,7 +1103,7 @@ class EStalker_Series_Categories(Screen):
                 print("Error downloading API data for page {}: {}".format(self.seasons_current_page, e))
                 return self.all_seasons_data
 
-            self.session.openWithCallback(self.back, MessageBox, _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
+            self.session.openWithCallback(self.back, MessageBox, unreachable_message(self.portal) or _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
             return self.all_seasons_data
 
         elif self.level == 4:
@@ -1171,17 +1134,13 @@ class EStalker_Series_Categories(Screen):
                         self.episodes_total_items = 0
                     current_page_data = js.get("data", [])
 
-                    if not hasattr(self, 'all_episodes_data') or not isinstance(self.all_episodes_data, list) or not self.all_episodes_data:
-                        self.all_episodes_data = [{} for _ in range(self.episodes_total_items)]
+                    if not isinstance(self.all_episodes_data, PageStore) or not self.all_episodes_data:
+                        self.all_episodes_data = PageStore()
 
                     self.sort_check = False
 
-                    # Calculate the position where this page's data should be stored
-                    start_index = (self.episodes_current_page - 1) * 14
-
-                    # Insert the new data at the correct positions
-                    for i, item in enumerate(current_page_data):
-                        self.all_episodes_data[start_index + i] = item
+                    if current_page_data:
+                        self.all_episodes_data.add(self.episodes_current_page, current_page_data, self.episodes_total_items)
                         self.episodes_pages_downloaded.add(paged_url)
 
                     return self.all_episodes_data
@@ -1190,7 +1149,7 @@ class EStalker_Series_Categories(Screen):
                 print("Error downloading API data for page {}: {}".format(self.episodes_current_page, e))
                 return self.all_episodes_data
 
-            self.session.openWithCallback(self.back, MessageBox, _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
+            self.session.openWithCallback(self.back, MessageBox, unreachable_message(self.portal) or _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
             return self.all_episodes_data
 
     def downloadSearchData(self, url, page=1):
@@ -1198,8 +1157,8 @@ class EStalker_Series_Categories(Screen):
             print("*** downloadSearchData ***", url)
 
         if self.level == 2:
-            if not hasattr(self, 'all_data') or not isinstance(self.all_data, list):
-                self.all_data = []
+            if not isinstance(getattr(self, 'all_data', None), PageStore):
+                self.all_data = PageStore()
 
             paged_url = self._updateUrlPage(url, self.current_page)
 
@@ -1226,15 +1185,13 @@ class EStalker_Series_Categories(Screen):
                         self.total_items = 0
                     current_page_data = js.get("data", [])
 
-                    if not hasattr(self, 'all_data') or not isinstance(self.all_data, list) or not self.all_data:
-                        self.all_data = [{} for _ in range(self.total_items)]
+                    if not isinstance(self.all_data, PageStore) or not self.all_data:
+                        self.all_data = PageStore()
 
                     self.sort_check = False
 
-                    start_index = (self.current_page - 1) * 14
-
-                    for i, item in enumerate(current_page_data):
-                        self.all_data[start_index + i] = item
+                    if current_page_data:
+                        self.all_data.add(self.current_page, current_page_data, self.total_items)
                         self.pages_downloaded.add(paged_url)
 
                     return self.all_data
@@ -1243,7 +1200,7 @@ class EStalker_Series_Categories(Screen):
                 print("Error downloading API data for page {}: {}".format(self.current_page, e))
                 return self.all_data
 
-            self.session.openWithCallback(self.back, MessageBox, _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
+            self.session.openWithCallback(self.back, MessageBox, unreachable_message(self.portal) or _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
             return self.all_data
 
     def _updateUrlPage(self, url, page):
@@ -1260,18 +1217,27 @@ class EStalker_Series_Categories(Screen):
         if debugs:
             print("*** createLink ***", url)
 
-        response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+        direct = direct_link(url)
+        if direct:
+            return {"js": {"cmd": direct}}
+
+        response = hedged_request(url, self.headers)
 
         if debugs:
             print("*** createlink response ***", response)
 
-        if not response and self.retry is False:
+        if not response and self.retry is False and not is_open(url):
             self.retry = True
+            count_retry(url)
             self.reauthorize()
-            response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+            response = hedged_request(url, self.headers)
             if debugs:
                 print("*** createlink response 2 ***", response)
 
+        if not response and is_open(url):
+            self.session.open(MessageBox, unreachable_message(url), MessageBox.TYPE_ERROR, timeout=3)
+
+        learn_link(url, response)
         return response
 
     def _get_profile(self, portal, mac, token, token_random, headers, param_mode):
@@ -1342,14 +1308,14 @@ class EStalker_Series_Categories(Screen):
             print("*** buildSeries ***")
 
         if self.chosen_category == "favourites":
-            filtered_list = [x for x in self.list2 if x[16]]
+            filtered_list = [x for x in self.list2 if x.favourite]
         else:
-            filtered_list = [x for x in self.list2 if not x[13]]
+            filtered_list = [x for x in self.list2 if not x.hidden]
+
+        def build(x):
+            return buildSeriesTitlesList(x.index, x.name, x.series_id, x.cover, x.plot, x.cast, x.director, x.genre, x.release_date, x.rating, x.last_modified, x.next_url, x.tmdb, x.hidden, x.year, x.backdrop, x.favourite, x.category_id, self._px_more, self._px_fav)
 
-        self.main_list = [
-            buildSeriesTitlesList(x[0], x[1], x[2], x[3], x[4], x[5], x[6], x[7], x[8], x[9], x[10], x[11], x[12], x[13], x[14], x[15], x[16], x[17], self._px_more, self._px_fav)
-            for x in filtered_list
-        ]
+        self.main_list = self.virtual_list.entries(filtered_list, build)
 
         self["main_list"].setList(self.main_list)
 
@@ -1363,10 +1329,10 @@ class EStalker_Series_Categories(Screen):
         # self.main_list = [buildSeriesSeasonsList(x[0], x[1], x[2], x[3], x[4], x[5], x[6], x[7], x[8], x[9], x[10], x[11], x[12], x[13], x[14], x[15], x[16], x[17], x[18]) for x in self.list3 if not x[13]]
 
         if self.list3:
-            self.main_list = [
-                buildSeriesSeasonsList(x[0], x[1], x[2], x[3], x[4], x[5], x[6], x[7], x[8], x[9], x[10], x[11], x[12], x[13], x[14], x[15], x[16], x[17], x[18], self._px_more)
-                for x in self.list3 if not x[13]
-            ]
+            def build(x):
+                return buildSeriesSeasonsList(x.index, x.name, x.season_id, x.cover, x.plot, x.cast, x.director, x.genre, x.release_date, x.rating, x.last_modified, x.next_url, x.tmdb, x.hidden, x.year, x.backdrop, x.favourite, x.category_id, x.season_number, self._px_more)
+
+            self.main_list = self.virtual_list.entries([x for x in self.list3 if not x.hidden], build)
 
             self["main_list"].setList(self.main_list)
 
@@ -1380,10 +1346,10 @@ class EStalker_Series_Categories(Screen):
         # self.main_list = [buildSeriesEpisodesList(x[0], x[1], x[2], x[3], x[4], x[5], x[6], x[7], x[8], x[9], x[10], x[11], x[12], x[13], x[14], x[15], x[16], x[17], x[18], x[19], x[20]) for x in self.list4 if not x[13]]
 
         if self.list4:
-            self.main_list = [
-                buildSeriesEpisodesList(x[0], x[1], x[2], x[3], x[4], x[5], x[6], x[7], x[8], x[9], x[10], x[11], x[12], x[13], x[14], x[15], x[16], x[17], x[18], x[19], x[20], self._px_more)
-                for x in self.list4 if not x[13]
-            ]
+            def build(x):
+                return buildSeriesEpisodesList(x.index, x.name, x.season_id, x.cover, x.plot, x.cast, x.director, x.genre, x.release_date, x.rating, x.last_modified, x.next_url, x.tmdb, x.hidden, x.year, x.backdrop, x.favourite, x.category_id, x.season_number, x.episode_id, x.cmd, self._px_more)
+
+            self.main_list = self.virtual_list.entries([x for x in self.list4 if not x.hidden], build)
 
             self["main_list"].setList(self.main_list)
 
@@ -1475,6 +1441,7 @@ class EStalker_Series_Categories(Screen):
 
             if self.level != 1:
                 self.clearVod()
+                self._stopTimerVod()
                 self.timerVod.start(300, True)
 
         else:
@@ -1568,77 +1535,6 @@ class EStalker_Series_Categories(Screen):
         if self["main_list"].getCurrent() and glob.nextlist[-1]["index"] != 0:
             self["main_list"].setIndex(glob.nextlist[-1]["index"])
 
-    def normalize_text(self, text):
-
-        has_ascii = bool(self._re_has_ascii.search(text))
-        has_non_ascii = bool(self._re_has_non_ascii.search(text))
-
-        if has_ascii and has_non_ascii:
-
-            if pythonVer == 2:
-                if isinstance(text, str):
-                    text = text.decode("utf-8", "ignore")
-
-                text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore")
-
-            else:
-                text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
-
-        return text
-
-    def stripjunk(self, text, database=None):
-        searchtitle = text
-
-        # Move "the" from the end to the beginning (case-insensitive)
-        if self._re_end_the.search(searchtitle.strip().lower()):
-            searchtitle = "The " + searchtitle[:-3].strip()
-
-        # remove xx: at start (case-insensitive)
-        searchtitle = self._re_prefix_xx_colon.sub('', searchtitle)
-
-        # remove xx|xx at start (case-insensitive)
-        searchtitle = self._re_prefix_xx_pipe_xx.sub('', searchtitle)
-
-        # remove all leading content between and including || or |
-        searchtitle = self._re_leading_doublepipes.sub('', searchtitle)
-        searchtitle = self._re_leading_singlepipe_block.sub('', searchtitle)
-        searchtitle = self._re_any_pipe_block.sub('', searchtitle)
-
-        # remove all leading content between and including ┃┃ or ┃
-        searchtitle = self._re_leading_doublebars.sub('', searchtitle)
-        searchtitle = self._re_leading_singlebar_block.sub('', searchtitle)
-        searchtitle = self._re_any_bar_block.sub('', searchtitle)
-
-        # remove all content between and including () unless it's all digits
-        searchtitle = self._re_parens.sub('', searchtitle)
-
-        # remove all content between and including []
-        searchtitle = self._re_brackets.sub('', searchtitle)
-
-        # remove trailing year (but not if the whole title *is* a year)
-        if not self._re_is_year_only.match(searchtitle.strip()):
-            searchtitle = self._re_trailing_year.sub('', searchtitle)
-
-        # remove up to 6 characters followed by space and dash at start (e.g. "EN -", "BE-NL -")
-        searchtitle = self._re_lang_dash_prefix.sub('', searchtitle)
-
-        # normalise text
-        searchtitle = self.normalize_text(searchtitle)
-
-        # Bad substrings to strip (case-insensitive)
-        searchtitle = self._re_bad_strings.sub('', searchtitle)
-
-        # Bad suffixes to remove (case-insensitive, only if at end)
-        searchtitle = self._re_bad_suffix.sub('', searchtitle)
-
-        # Replace '.', '_', "'", '*' with space
-        searchtitle = self._re_dots_underscores.sub(' ', searchtitle)
-
-        # Trim leading/trailing hyphens and whitespace
-        searchtitle = searchtitle.strip(' -').strip()
-
-        return str(searchtitle)
-
     def getTMDB(self):
         if debugs:
             print("**** getTMDB level***", self.level)
@@ -1685,12 +1581,8 @@ class EStalker_Series_Categories(Screen):
                 self.getTMDBDetails(tmdb)
                 return
 
-            try:
-                os.remove(os.path.join(dir_tmp, "search.txt"))
-            except:
-                pass
-
-            searchtitle = self.stripjunk(title)
+            searchtitle = stripjunk(title)
+            key = tmdbcache.make_key("tv", "search", searchtitle, self.storedyear, cfg.TMDBLanguage2.value)
             searchtitle = quote(searchtitle, safe="")
 
             if self.storedyear:
@@ -1698,12 +1590,10 @@ class EStalker_Series_Categories(Screen):
             else:
                 searchurl = 'http://api.themoviedb.org/3/search/tv?api_key={}&query={}'.format(self.check(self.apitoken), searchtitle)
 
-            if pythonVer == 3:
-                searchurl = searchurl.encode()
-
-            filepath = os.path.join(dir_tmp, "search.txt")
+            req_id = self._vod_req_id
             try:
-                downloadPage(searchurl, filepath, timeout=10).addCallback(self.processTMDB).addErrback(self.failed)
+                d = tmdbcache.fetch(key, searchurl, parser=tmdbcache.first_result_id("results"), ttl=tmdbcache.search_ttl)
+                d.addCallback(self.processTMDB, req_id).addErrback(self.failed)
             except Exception as e:
                 print("download TMDB error {}".format(e))
 
@@ -1718,39 +1608,25 @@ class EStalker_Series_Categories(Screen):
 
         return
 
-    def processTMDB(self, result=None):
+    def processTMDB(self, resultid=None, req_id=None):
         if debugs:
             print("*** processTMDB ***")
 
-        resultid = ""
-        search_file_path = os.path.join(dir_tmp, "search.txt")
-        try:
-            with codecs.open(search_file_path, "r", encoding="utf-8") as f:
-                response = f.read()
-
-            if response:
-                self.searchresult = json.loads(response)
-                if "results" in self.searchresult and self.searchresult["results"]:
-                    resultid = self.searchresult["results"][0].get("id")
-                    self.tmdb2 = resultid
-
-                    if not resultid:
-                        self.displayTMDB()
-                        return
-
-                    self.getTMDBDetails(resultid)
-                else:
-                    self.storedyear = ""
-                    self.tmdbretry += 1
-                    if self.tmdbretry < 2:
-                        self.getTMDB()
-                    else:
-                        self.tmdbretry = 0
-                        self.displayTMDB()
-                        return
+        if req_id != self._vod_req_id:
+            return
 
-        except Exception as e:
-            print("Error processing TMDB response:", e)
+        if resultid:
+            self.tmdb2 = resultid
+            self.getTMDBDetails(resultid)
+        else:
+            self.storedyear = ""
+            self.tmdbretry += 1
+            if self.tmdbretry < 2:
+                self.getTMDB()
+            else:
+                self.tmdbretry = 0
+                self.displayTMDB()
+                return
 
     def getTMDBDetails(self, resultid=None):
         if debugs:
@@ -1759,46 +1635,48 @@ class EStalker_Series_Categories(Screen):
         detailsurl = ""
         languagestr = ""
 
-        try:
-            os.remove(os.path.join(dir_tmp, "search.txt"))
-        except:
-            pass
-
         language = cfg.TMDBLanguage2.value
 
         if language:
             languagestr = "&language=" + str(language)
 
         if self.level == 2:
+            key = tmdbcache.make_key("tv", resultid, language)
             detailsurl = "http://api.themoviedb.org/3/tv/{}?api_key={}&append_to_response=credits,images,content_ratings{}&include_image_language=en".format(
                 resultid, self.check(self.apitoken), languagestr
             )
 
         elif self.level == 3:
             self.storedseason = self["main_list"].getCurrent()[19]
+            key = tmdbcache.make_key("tv", resultid, "season", self.storedseason, language)
             detailsurl = "http://api.themoviedb.org/3/tv/{}/season/{}?api_key={}&append_to_response=credits,images,content_ratings{}&include_image_language=en".format(
                 resultid, self.storedseason, self.check(self.apitoken), languagestr
             )
 
         elif self.level == 4:
             self.storedepisode = self["main_list"].getCurrent()[20]
+            key = tmdbcache.make_key("tv", resultid, "season", self.storedseason, "episode", self.storedepisode, language)
             detailsurl = "http://api.themoviedb.org/3/tv/{}/season/{}/episode/{}?api_key={}&append_to_response=credits,images,content_ratings{}&include_image_language=en".format(
                 resultid, self.storedseason, self.storedepisode, self.check(self.apitoken), languagestr
             )
 
-        if pythonVer == 3:
-            detailsurl = detailsurl.encode()
+        else:
+            return
 
-        filepath = os.path.join(dir_tmp, "search.txt")
+        req_id = self._vod_req_id
         try:
-            downloadPage(detailsurl, filepath, timeout=10).addCallback(self.processTMDBDetails).addErrback(self.failed2)
+            d = tmdbcache.fetch(key, detailsurl)
+            d.addCallback(self.processTMDBDetails, req_id).addErrback(self.failed2, req_id)
         except Exception as e:
             print("download TMDB details error:", e)
 
-    def failed2(self, data=None):
+    def failed2(self, data=None, req_id=None):
         if debugs:
             print("*** failed 2 ***")
 
+        if req_id != self._vod_req_id:
+            return
+
         if data:
             # print(data)
             if self.level == 2:
@@ -1811,30 +1689,16 @@ class EStalker_Series_Categories(Screen):
                 self.displayTMDB()
                 return
 
-    def processTMDBDetails(self, result=None):
+    def processTMDBDetails(self, details=None, req_id=None):
         if debugs:
             print("*** processTMDBDetails ***")
 
-        response = ""
-        self.tmdbdetails = []
-        self.tmdbresults = {}
-        logos = []
-
-        try:
-            with codecs.open(os.path.join(dir_tmp, "search.txt"), "r", encoding="utf-8") as f:
-                response = f.read()
-        except Exception as e:
-            print("Error reading TMDB response:", e)
-            return
-
-        if not response:
+        if req_id != self._vod_req_id:
             return
 
-        try:
-            self.tmdbdetails = json.loads(response, object_pairs_hook=OrderedDict)
-        except Exception as e:
-            print("Error parsing TMDB response:", e)
-            return
+        self.tmdbdetails = details
+        self.tmdbresults = {}
+        logos = []
 
         if not self.tmdbdetails:
             return
@@ -2248,6 +2112,7 @@ class EStalker_Series_Categories(Screen):
             desc_image.encode(),
             Headers({'User-Agent': [b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"]})
         )
+        track(self.cover_download_deferred, desc_image, "images")
 
         self.cover_download_deferred.addCallback(self.coverResponse, req_id)
         self.cover_download_deferred.addErrback(self.coverError, req_id)
@@ -2263,6 +2128,7 @@ class EStalker_Series_Categories(Screen):
             url.encode(),
             Headers({'User-Agent': [b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"]})
         )
+        track(self.cover_download_deferred, url, "images")
         self.cover_download_deferred.addCallback(self.coverFromUrlResponse, req_id)
         self.cover_download_deferred.addErrback(self.coverError, req_id)
 
@@ -2400,6 +2266,7 @@ class EStalker_Series_Categories(Screen):
             logo_image.encode(),
             Headers({'User-Agent': [b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"]})
         )
+        track(self.logo_download_deferred, logo_image, "images")
         self.logo_download_deferred.addCallback(self.logoResponse, req_id)
         self.logo_download_deferred.addErrback(self.logoError, req_id)
 
@@ -2538,6 +2405,7 @@ class EStalker_Series_Categories(Screen):
             backdrop_image.encode(),
             Headers({'User-Agent': [b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"]})
         )
+        track(self.backdrop_download_deferred, backdrop_image, "images")
 
         self.backdrop_download_deferred.addCallback(self.backdropResponse, req_id)
         self.backdrop_download_deferred.addErrback(self.backdropError, req_id)
@@ -2900,7 +2768,7 @@ class EStalker_Series_Categories(Screen):
         if self["main_list"].getCurrent():
             current_index = self["main_list"].getIndex()
             glob.nextlist[-1]["index"] = current_index
-            glob.currentchannellist = self.main_list[:]
+            glob.currentchannellist = self.virtual_list.materialize(self.main_list)[:]
             glob.currentchannellistindex = current_index
 
             if self.level == 1:
@@ -2994,7 +2862,7 @@ class EStalker_Series_Categories(Screen):
                     if str(command).startswith("/media/"):
                         pre_vod_url = (str(self.portal) + "?type=series&action=get_ordered_list&movie_id={}&season_id=0&episode_id=0&category=1&sortby=&p=1&JsHttpRequest=1-xml").format(stream_id)
 
-                        pre_response = make_request(pre_vod_url, method="GET", headers=self.headers, params=None, response_type="json")
+                        pre_response = make_request(pre_vod_url, method="GET", headers=self.headers, params=None, response_type="json", priority=PLAYBACK)
 
                         movie_id = None
 
@@ -165,6 +165,18 @@ class EStalker_Settings(ConfigListScreen, Screen, ProtectedScreen):
         self.cfg_infobarpicons = getConfigListEntry(_("Show infobar picons"), cfg.infobarpicons)
         self.cfg_infobarcovers = getConfigListEntry(_("Show infobar posters"), cfg.infobarcovers)
         self.cfg_ar_id_player = getConfigListEntry(_("Default screen aspect ratio"), cfg.ar_id_player)
+        self.cfg_prefetchlinks = getConfigListEntry(_("Pre-load next/previous channel links"), cfg.prefetchlinks)
+        self.cfg_xtreamcatalog = getConfigListEntry(_("Load full categories from Xtream API (if available)"), cfg.xtreamcatalog)
+        self.cfg_xtreamlinks = getConfigListEntry(_("Build Xtream stream links locally (if available)"), cfg.xtreamlinks)
+        self.cfg_ratelimit = getConfigListEntry(_("Max portal requests per second (0 = off)"), cfg.ratelimit)
+        self.cfg_rateburst = getConfigListEntry(_("Portal request burst"), cfg.rateburst)
+        self.cfg_hedging = getConfigListEntry(_("Resend slow channel EPG requests"), cfg.hedging)
+        self.cfg_dnscache = getConfigListEntry(_("Cache portal DNS lookups"), cfg.dnscache)
+        self.cfg_resumemax = getConfigListEntry(_("Maximum stored resume points"), cfg.resumemax)
+        self.cfg_resumecheckpoint = getConfigListEntry(_("Save resume position every (seconds, 0 = off)"), cfg.resumecheckpoint)
+        self.cfg_profiling = getConfigListEntry(_("Profiling mode (written when EStalker closes)"), cfg.profiling)
+        self.cfg_profiledir = getConfigListEntry(_("Profile output directory"), cfg.profiledir)
+        self.cfg_zaplog = getConfigListEntry(_("Log zap timings to /tmp/estalker_zaptimes.log"), cfg.zaplog)
 
         self.org_main = cfg.main.value
         self.location = cfg.location.value
@@ -181,6 +193,15 @@ class EStalker_Settings(ConfigListScreen, Screen, ProtectedScreen):
             self.cfg_vodtype,
             self.cfg_livepreview,
             self.cfg_stopstream,
+            self.cfg_prefetchlinks,
+            self.cfg_xtreamcatalog,
+            self.cfg_xtreamlinks,
+            self.cfg_ratelimit,
+            self.cfg_rateburst,
+            self.cfg_hedging,
+            self.cfg_dnscache,
+            self.cfg_resumemax,
+            self.cfg_resumecheckpoint,
             self.cfg_TMDBLanguage2,
             # self.cfg_catchupstart,
             # self.cfg_catchupend,
@@ -192,6 +213,9 @@ class EStalker_Settings(ConfigListScreen, Screen, ProtectedScreen):
             self.cfg_channelcovers,
             self.cfg_infobarpicons,
             self.cfg_infobarcovers,
+            self.cfg_zaplog,
+            self.cfg_profiling,
+            self.cfg_profiledir if cfg.profiling.value != "off" else None,
         ]
 
         self.list = [entry for entry in config_entries if entry is not None]
@@ -257,15 +281,18 @@ class EStalker_Settings(ConfigListScreen, Screen, ProtectedScreen):
         if sel:
             if sel == cfg.location:
                 self.openDirectoryBrowser(cfg.location.value, "location")
+            elif sel == cfg.profiledir:
+                self.openDirectoryBrowser(cfg.profiledir.value, "profiledir")
         else:
             pass
 
     def openDirectoryBrowser(self, path, cfgitem):
-        if cfgitem != "location":
+        config_entries = {"location": cfg.location, "profiledir": cfg.profiledir}
+        if cfgitem not in config_entries:
             return
 
         self.session.openWithCallback(
-            self.openDirectoryBrowserCB(cfg.location),
+            self.openDirectoryBrowserCB(config_entries[cfgitem]),
             LocationBox,
             windowTitle=_("Choose Directory:"),
             text=_("Choose directory"),
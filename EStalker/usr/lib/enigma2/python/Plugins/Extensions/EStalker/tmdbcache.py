@@ -0,0 +1,391 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import re
+import sys
+
+from collections import OrderedDict, deque
+from time import time
+
+from twisted.internet import defer, reactor
+from twisted.web.client import Agent, readBody
+from twisted.web.http_headers import Headers
+
+try:
+    from twisted.web.client import BrowserLikePolicyForHTTPS
+    contextFactory = BrowserLikePolicyForHTTPS()
+except ImportError:
+    from twisted.web.client import WebClientContextFactory
+    contextFactory = WebClientContextFactory()
+
+from .netstats import track
+from .plugin import debugs, dir_etc
+
+
+# Two tier cache for TMDB lookups.
+# Memory tier is a small LRU, disk tier is one json file per key in /etc/enigma2/estalker/tmdb/
+# Search results store the tmdb id (or None for "no match"), details store the raw TMDB json.
+
+cache_dir = os.path.join(dir_etc, "tmdb/")
+
+memory_max = 400
+search_ttl = 30 * 24 * 60 * 60
+details_ttl = 7 * 24 * 60 * 60
+negative_ttl = 2 * 24 * 60 * 60
+
+_memory = OrderedDict()
+_pending = {}
+
+# a lookup that has not finished after request_timeout seconds fails, connect and body read included
+request_timeout = 10
+_requests = {}
+_timeouts = {}
+_agent = None
+_purged = False
+
+# background enrichment queue. one request per enrich_interval, never more than
+# enrich_concurrency in flight, keeps well inside TMDB's request limits.
+enrich_interval = 0.25
+enrich_concurrency = 2
+
+_queue = deque()
+_queue_call = None
+_active = 0
+
+_re_spaces = re.compile(r"\s+")
+
+
+class _Miss(object):
+    pass
+
+
+MISS = _Miss()
+
+
+def make_key(*parts):
+    key = []
+    for part in parts:
+        if part is None:
+            part = ""
+        try:
+            part = str(part)
+        except UnicodeEncodeError:
+            part = part.encode("utf-8")
+        key.append(_re_spaces.sub(" ", part).strip().lower())
+    return "|".join(key)
+
+
+def _path(key):
+    if not isinstance(key, bytes):
+        key = key.encode("utf-8")
+    return os.path.join(cache_dir, hashlib.md5(key).hexdigest() + ".json")
+
+
+def _remember(key, expires, value):
+    _memory[key] = (expires, value)
+    try:
+        _memory.move_to_end(key)
+    except AttributeError:
+        # python 2 OrderedDict
+        _memory[key] = _memory.pop(key)
+
+    while len(_memory) > memory_max:
+        _memory.popitem(last=False)
+
+
+def get(key):
+    now = time()
+
+    entry = _memory.get(key)
+    if entry is not None:
+        if entry[0] > now:
+            return entry[1]
+        del _memory[key]
+
+    path = _path(key)
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f, object_pairs_hook=OrderedDict)
+    except (IOError, OSError, ValueError):
+        return MISS
+
+    try:
+        expires = float(entry.get("expires", 0))
+    except (TypeError, ValueError):
+        expires = 0
+
+    if expires <= now:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return MISS
+
+    value = entry.get("value")
+    _remember(key, expires, value)
+    return value
+
+
+def put(key, value, ttl):
+    expires = time() + ttl
+    _remember(key, expires, value)
+
+    try:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        path = _path(key)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"key": key, "expires": expires, "value": value}, f)
+        os.rename(tmp_path, path)
+    except Exception as e:
+        print("[EStalker] tmdb cache write error:", e)
+
+
+def purge():
+    """Remove expired disk entries. Runs once per session, shortly after first use."""
+    if not os.path.exists(cache_dir):
+        return
+
+    now = time()
+    for filename in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, filename)
+        try:
+            if filename.endswith(".tmp"):
+                os.remove(path)
+                continue
+
+            with open(path, "r") as f:
+                entry = json.load(f)
+
+            if float(entry.get("expires", 0)) <= now:
+                os.remove(path)
+        except Exception:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def clear():
+    _memory.clear()
+
+    if not os.path.exists(cache_dir):
+        return
+
+    for filename in os.listdir(cache_dir):
+        try:
+            os.remove(os.path.join(cache_dir, filename))
+        except OSError:
+            pass
+
+
+def _get_agent():
+    global _agent
+    if _agent is None:
+        _agent = Agent(reactor, contextFactory=contextFactory, connectTimeout=5)
+    return _agent
+
+
+def _schedule_purge():
+    global _purged
+    if _purged:
+        return
+    _purged = True
+    try:
+        reactor.callLater(30, purge)
+    except Exception:
+        pass
+
+
+def fetch(key, url, parser=None, ttl=details_ttl):
+    """
+    Returns a Deferred firing with the cached value for key.
+    On a miss the url is requested once, however many callers ask for the same key at the same time.
+    parser turns the decoded json into the value to cache. A falsy value is cached as None (no match) for negative_ttl.
+    Network and http errors go to the errback and are not cached.
+    """
+    value = get(key)
+    if value is not MISS:
+        if debugs:
+            print("*** tmdb cache hit ***", key)
+        return defer.succeed(value)
+
+    d = defer.Deferred()
+
+    if key in _pending:
+        _pending[key].append(d)
+        return d
+
+    _pending[key] = [d]
+    _schedule_purge()
+
+    if not isinstance(url, bytes):
+        url = url.encode("utf-8")
+
+    try:
+        request = track(_get_agent().request(b"GET", url, Headers({b"Accept": [b"application/json"]})), url, "tmdb")
+    except Exception as e:
+        _finish(key, failure=e)
+        return d
+
+    _requests[key] = [request]
+    _timeouts[key] = reactor.callLater(request_timeout, _expire, key)
+
+    request.addCallback(_handle_response, key, parser, ttl)
+    request.addErrback(lambda failure: _finish(key, failure=failure))
+    return d
+
+
+def _expire(key):
+    _timeouts.pop(key, None)
+    for request in _requests.pop(key, []):
+        if not request.called:
+            request.cancel()
+    _finish(key, failure=defer.TimeoutError("TMDB request timed out"))
+
+
+def _handle_response(response, key, parser, ttl):
+    if response.code != 200:
+        readBody(response).addErrback(lambda failure: None)
+        _finish(key, failure=Exception("TMDB http {}".format(response.code)))
+        return
+
+    body = readBody(response)
+    _requests.setdefault(key, []).append(body)
+    body.addCallback(_handle_body, key, parser, ttl)
+    body.addErrback(lambda failure: _finish(key, failure=failure))
+
+
+def _handle_body(body, key, parser, ttl):
+    try:
+        if sys.version_info[0] == 3:
+            body = body.decode("utf-8")
+        data = json.loads(body, object_pairs_hook=OrderedDict)
+        value = parser(data) if parser else data
+    except Exception as e:
+        _finish(key, failure=e)
+        return
+
+    if value:
+        put(key, value, ttl)
+    else:
+        value = None
+        put(key, value, negative_ttl)
+
+    _finish(key, value=value)
+
+
+def _finish(key, value=None, failure=None):
+    timeout = _timeouts.pop(key, None)
+    if timeout is not None and timeout.active():
+        timeout.cancel()
+    _requests.pop(key, None)
+
+    waiters = _pending.pop(key, [])
+    for d in waiters:
+        if failure is not None:
+            d.errback(failure)
+        else:
+            d.callback(value)
+
+
+def first_result_id(results_key="results"):
+    def parser(data):
+        results = data.get(results_key) or []
+        if results:
+            return results[0].get("id") or None
+        return None
+    return parser
+
+
+def enrich(jobs, replace=True):
+    """
+    Queue background lookups. A job is (key, url, parser, ttl, follow).
+    follow, if set, is called with the fetched value and may return another job, which runs next.
+    replace drops anything still waiting from a previous page.
+    """
+    if replace:
+        _queue.clear()
+
+    _queue.extend(jobs)
+    _schedule_enrich(0)
+
+
+def cancel_enrich():
+    global _queue_call
+    _queue.clear()
+
+    if _queue_call is not None:
+        try:
+            _queue_call.cancel()
+        except Exception:
+            pass
+        _queue_call = None
+
+
+def _schedule_enrich(delay):
+    global _queue_call
+    if _queue_call is not None or not _queue:
+        return
+
+    try:
+        _queue_call = reactor.callLater(delay, _run_enrich)
+    except Exception as e:
+        print("[EStalker] tmdb enrich schedule error:", e)
+
+
+def _run_enrich():
+    global _queue_call, _active
+    _queue_call = None
+
+    while _queue and _active < enrich_concurrency:
+        job = _queue.popleft()
+        key, url, parser, ttl, follow = job
+
+        value = get(key)
+        if value is not MISS:
+            _follow(job, value)
+            continue
+
+        _active += 1
+        d = fetch(key, url, parser=parser, ttl=ttl)
+        d.addCallback(_enrich_done, job)
+        d.addErrback(_enrich_failed)
+        break
+
+    _schedule_enrich(enrich_interval)
+
+
+def _enrich_done(value, job):
+    global _active
+    _active -= 1
+    _follow(job, value)
+    _schedule_enrich(enrich_interval)
+
+
+def _enrich_failed(failure=None):
+    global _active
+    _active -= 1
+    if debugs:
+        print("*** tmdb enrich failed ***", failure)
+    _schedule_enrich(enrich_interval)
+
+
+def _follow(job, value):
+    follow = job[4]
+    if not value or not follow:
+        return
+
+    try:
+        nextjob = follow(value)
+    except Exception as e:
+        print("[EStalker] tmdb enrich error:", e)
+        return
+
+    if nextjob:
+        _queue.appendleft(nextjob)
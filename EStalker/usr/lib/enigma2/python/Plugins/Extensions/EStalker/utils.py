@@ -28,6 +28,11 @@ except ImportError:
     from urllib.parse import urlparse, parse_qsl, urlunparse
 
 from .plugin import cfg, pythonVer, debugs
+from .breaker import get_breaker
+from . import dnscache
+from . import netstats
+from . import ratelimit
+from .ratelimit import NAVIGATION
 
 try:
     from enigma import eAVSwitch
@@ -48,6 +53,7 @@ PROTOCOL_PATTERN = re.compile(r"this\.portal_protocol\s*=\s*document\.URL\.repla
 IP_PATTERN = re.compile(r"this\.portal_ip\s*=\s*document\.URL\.replace\(pattern,\s*\"([^\"]+)\"\)")
 PATH_PATTERN = re.compile(r"this\.portal_path\s*=\s*document\.URL\.replace\(pattern,\s*\"([^\"]+)\"\)")
 LOADER_PATTERN = re.compile(r"this\.ajax_loader\s*=\s*(.*?\.php);")
+BAD_GATEWAY_PATTERN = re.compile(r"too many (?:502|504) error")
 URL_PATTERN = re.compile(r"(https?):\/\/([^\/]*)\/([^\/]*)")
 
 playlists_all = []
@@ -77,7 +83,18 @@ def get_local_timezone():
     return default_tz
 
 
-def make_request(url, method="GET", headers=None, params=None, response_type=None):
+def make_request(url, method="GET", headers=None, params=None, response_type=None, priority=NAVIGATION):
+    dnscache.register(url)
+    breaker = get_breaker(url)
+
+    if not breaker.allow():
+        if debugs:
+            print("[EStalker] {} unavailable, request skipped (retry in {}s)".format(breaker.host, breaker.remaining()))
+        return None
+
+    ratelimit.acquire(url, priority)
+    started = time.time()
+
     with requests.Session() as http:
         result = None
         retry = Retry(total=0, backoff_factor=1, status_forcelist=[500, 502, 503, 504])
@@ -102,6 +119,13 @@ def make_request(url, method="GET", headers=None, params=None, response_type=Non
                     url = urlunparse(parsed_url._replace(query=query_string))
                 r = http.get(url, headers=headers, timeout=(5, 8), verify=False, allow_redirects=True)
 
+            netstats.record(url, time.time() - started, len(r.content), "http {}".format(r.status_code) if r.status_code >= 400 else None)
+
+            if r.status_code in (502, 504):
+                breaker.failure()
+            else:
+                breaker.success()
+
             r.raise_for_status()
 
             if response_type == "json":
@@ -120,13 +144,38 @@ def make_request(url, method="GET", headers=None, params=None, response_type=Non
 
             return result
 
+        except requests.exceptions.RetryError as e:
+            # a 5xx answer from the status_forcelist above, only a failing gateway counts against the host
+            netstats.record(url, time.time() - started, 0, type(e).__name__)
+            if BAD_GATEWAY_PATTERN.search(str(e)):
+                breaker.failure()
+            else:
+                breaker.success()
+            return result
+
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            netstats.record(url, time.time() - started, 0, type(e).__name__)
+            breaker.failure()
+            return result
+
         except Exception:
             return result
 
 
-def xtream_request(url):
+def xtream_request(url, priority=NAVIGATION):
     response = None
 
+    dnscache.register(url)
+    breaker = get_breaker(url)
+
+    if not breaker.allow():
+        if debugs:
+            print("[EStalker] {} unavailable, request skipped (retry in {}s)".format(breaker.host, breaker.remaining()))
+        return None
+
+    ratelimit.acquire(url, priority)
+    started = time.time()
+
     hdr = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36",
         "Accept-Encoding": "gzip, deflate",
@@ -139,6 +188,14 @@ def xtream_request(url):
 
         try:
             r = http.get(url, headers=hdr, timeout=(5, 5), verify=False)
+
+            netstats.record(url, time.time() - started, len(r.content), "http {}".format(r.status_code) if r.status_code >= 400 else None)
+
+            if r.status_code in (502, 504):
+                breaker.failure()
+            else:
+                breaker.success()
+
             r.raise_for_status()
 
             try:
@@ -150,6 +207,10 @@ def xtream_request(url):
                 except ValueError:
                     return None
 
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            netstats.record(url, time.time() - started, 0, type(e).__name__)
+            breaker.failure()
+
         except requests.exceptions.RequestException:
             pass
 
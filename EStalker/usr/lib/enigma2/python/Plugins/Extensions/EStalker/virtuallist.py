@@ -0,0 +1,94 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Virtual MultiContent list for the channel, vod and series screens.
+# eListboxPythonMultiContent reads a real python list, so the list handed to the List source
+# still has one entry per row, but all of them start as one shared blank entry. Only the page
+# around the cursor (plus a page either side) is built, more pages are built as the cursor moves.
+# Entering a 10k category costs about the same as a 14 entry one.
+
+
+class VirtualList(object):
+
+    def __init__(self, source, pagesize=14, margin=None):
+        self.source = source
+        self.pagesize = pagesize
+        self.margin = pagesize if margin is None else margin
+        self.rows = []
+        self.build = None
+        self.list = []
+        self.built = bytearray()
+        self.remaining = 0
+        source.onSelectionChanged.append(self.fill)
+
+    def entries(self, rows, build):
+        """Return the list for source.setList(), built around the current index only."""
+        self.rows = rows
+        self.build = build
+        self.built = bytearray(len(rows))
+        self.remaining = len(rows)
+
+        if not rows:
+            self.list = []
+            return self.list
+
+        # rows are the records from rows.py, their placeholder builds the blank entry
+        blank = build(type(rows[0]).empty(0))
+        self.list = [blank] * len(rows)
+
+        self._fill(0)
+        try:
+            self._fill(self.source.getIndex() or 0)
+        except Exception:
+            pass
+        return self.list
+
+    def fill(self):
+        try:
+            index = self.source.getIndex()
+        except Exception:
+            return
+
+        changed = self._fill(index or 0)
+
+        entry_changed = getattr(self.source, "entry_changed", None)
+        if changed and entry_changed:
+            for i in changed:
+                entry_changed(i)
+
+    def _fill(self, index):
+        if not self.remaining:
+            return []
+
+        start = (index // self.pagesize) * self.pagesize - self.margin
+        end = start + self.pagesize + self.margin * 2
+        start = max(0, start)
+        end = min(len(self.rows), end)
+
+        built = self.built
+        changed = []
+        for i in range(start, end):
+            if not built[i]:
+                self.list[i] = self.build(self.rows[i])
+                built[i] = 1
+                changed.append(i)
+
+        self.remaining -= len(changed)
+        return changed
+
+    def materialize(self, entries=None):
+        """
+        Build every entry, for callers that read rows away from the cursor (the players).
+        A list other than this virtual one (category lists) is returned as it is.
+        """
+        if entries is not None and entries is not self.list:
+            return entries
+
+        if self.remaining:
+            built = self.built
+            for i, row in enumerate(self.rows):
+                if not built[i]:
+                    self.list[i] = self.build(row)
+                    built[i] = 1
+            self.remaining = 0
+        return self.list
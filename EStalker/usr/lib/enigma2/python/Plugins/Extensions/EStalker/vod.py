@@ -17,7 +17,6 @@ from itertools import cycle, islice
 import zlib
 import tempfile
 import hashlib
-import unicodedata
 
 try:
     from http.client import HTTPConnection
@@ -60,15 +59,26 @@ from Screens.MessageBox import MessageBox
 from Screens.Screen import Screen
 from Screens.VirtualKeyBoard import VirtualKeyBoard
 from Tools.LoadPixmap import LoadPixmap
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from enigma import ePicLoad, eServiceReference, eTimer
 
 # Local imports
 from . import _
 from . import estalker_globals as glob
 from .plugin import (cfg, common_path, dir_tmp, pythonVer, screenwidth, skin_directory, debugs, isDreambox, isVTI)
+from .pagestore import PageStore
 from .eStaticText import StaticText
+from .breaker import is_open, unreachable_message
 from .utils import get_local_timezone, make_request,  perform_handshake, get_profile_data
+from .profiler import profiled
+from .netstats import count_retry, track
+from .hedge import hedged_request
+from .ratelimit import PLAYBACK
+from .xtream import category_items, direct_link, learn_link
+from . import tmdbcache
+from .normalize import stripjunk, stripjunk_batch
+from .rows import VodRow
+from .virtuallist import VirtualList
 
 
 TMDB_installed = False
@@ -111,6 +121,7 @@ def clean_names(response):
     return response
 
 
+@profiled
 class EStalker_Vod_Categories(Screen):
     ALLOW_SUSPEND = True
 
@@ -175,6 +186,7 @@ class EStalker_Vod_Categories(Screen):
         self["page"] = StaticText("")
         self["listposition"] = StaticText("")
         self.itemsperpage = 14
+        self.virtual_list = VirtualList(self["main_list"], self.itemsperpage)
 
         self.searchString = ""
         self.filterresult = ""
@@ -244,6 +256,12 @@ class EStalker_Vod_Categories(Screen):
         self.sortby = "number"
 
         self._vod_req_id = 0
+        self._tmdb_enrich_window = None
+
+        # covers of the enriched titles, downloaded one at a time ahead of the cursor
+        self._poster_queue = deque()
+        self._poster_files = set()
+        self._poster_download = None
 
         self._tmp_cover = None
         self._tmp_logo = None
@@ -324,56 +342,6 @@ class EStalker_Vod_Categories(Screen):
         self._px_watched = LoadPixmap(os.path.join(common_path, "watched.png"))
         self._px_more = LoadPixmap(os.path.join(common_path, "more.png"))
 
-        # Precompiled regex (stripjunk)
-        self._re_has_ascii = re.compile(r'[\x00-\x7F]')
-        self._re_has_non_ascii = re.compile(r'[^\x00-\x7F]')
-
-        self._re_remove_non_ascii = re.compile(r'[^\x00-\x7F]+')
-
-        self._re_end_the = re.compile(r'\s*the$', re.IGNORECASE)
-        self._re_prefix_xx_colon = re.compile(r'^\w{2}:', re.IGNORECASE)
-        self._re_prefix_xx_pipe_xx = re.compile(r'^\w{2}\|\w{2}\s', re.IGNORECASE)
-
-        self._re_leading_doublepipes = re.compile(r'^\|\|.*?\|\|')
-        self._re_leading_singlepipe_block = re.compile(r'^\|.*?\|')
-        self._re_any_pipe_block = re.compile(r'\|.*?\|')
-
-        self._re_leading_doublebars = re.compile(r'^┃┃.*?┃┃')
-        self._re_leading_singlebar_block = re.compile(r'^┃.*?┃')
-        self._re_any_bar_block = re.compile(r'┃.*?┃')
-
-        self._re_parens = re.compile(r'\(\(.*?\)\)|\([^()]*\)')
-        self._re_brackets = re.compile(r'\[\[.*?\]\]|\[.*?\]')
-
-        self._re_is_year_only = re.compile(r'^\d{4}$')
-        self._re_trailing_year = re.compile(r'[\s\-]*(?:[\(\[\"]?\d{4}[\)\]\"]?)$')
-
-        self._re_lang_dash_prefix = re.compile(r'^[A-Za-z0-9\-]{1,7}\s*-\s*', re.IGNORECASE)
-
-        # Bad substrings
-        bad_strings = [
-            "ae|", "al|", "ar|", "at|", "ba|", "be|", "bg|", "br|", "cg|", "ch|", "cz|", "da|", "de|", "dk|",
-            "ee|", "en|", "es|", "eu|", "ex-yu|", "fi|", "fr|", "gr|", "hr|", "hu|", "in|", "ir|", "it|", "lt|",
-            "mk|", "mx|", "nl|", "no|", "pl|", "pt|", "ro|", "rs|", "ru|", "se|", "si|", "sk|", "sp|", "tr|",
-            "uk|", "us|", "yu|",
-            "1080p", "1080p-dual-lat-cine-calidad.com", "1080p-dual-lat-cine-calidad.com-1",
-            "1080p-dual-lat-cinecalidad.mx", "1080p-lat-cine-calidad.com", "1080p-lat-cine-calidad.com-1",
-            "1080p-lat-cinecalidad.mx", "1080p.dual.lat.cine-calidad.com", "3d", "'", "#", "(", ")", "-", "[]", "/",
-            "4k", "720p", "aac", "blueray", "ex-yu:", "fhd", "hd", "hdrip", "hindi", "imdb", "multi:", "multi-audio",
-            "multi-sub", "multi-subs", "multisub", "ozlem", "sd", "top250", "u-", "uhd", "vod", "x264",
-            "amz", "dolby", "audio", "8k", "3840p", "50fps", "60fps", "hevc", "raw ", "vip ", "NF", "d+", "a+", "vp", "prmt", "mrvl"
-        ]
-        self._re_bad_strings = re.compile('|'.join(map(re.escape, bad_strings)), re.IGNORECASE)
-
-        # Bad suffixes
-        bad_suffix = [
-            " al", " ar", " ba", " da", " de", " en", " es", " eu", " ex-yu", " fi", " fr", " gr", " hr", " mk",
-            " nl", " no", " pl", " pt", " ro", " rs", " ru", " si", " swe", " sw", " tr", " uk", " yu"
-        ]
-        self._re_bad_suffix = re.compile(r'(' + '|'.join(map(re.escape, bad_suffix)) + r')$', re.IGNORECASE)
-
-        self._re_dots_underscores = re.compile(r"[._'\*]")
-
         self.adult_keywords = set([
             "adult", "+18", "18+", "18 rated", "xxx", "sex", "porn",
             "voksen", "volwassen", "aikuinen", "Erwachsene", "dorosly",
@@ -670,7 +638,7 @@ class EStalker_Vod_Categories(Screen):
         if response:
             for index, channel in enumerate(response):
                 if not isinstance(channel, dict) or not channel:
-                    self.list2.append([index, "", "", "", "", "", "", False, "", "", False, "", "", "", "", "", "", "", ""])
+                    self.list2.append(VodRow.empty(index))
                     continue
 
                 stream_id = str(channel.get("id", ""))
@@ -757,7 +725,7 @@ class EStalker_Vod_Categories(Screen):
                 14 = cmd
                 """
 
-                self.list2.append([
+                self.list2.append(VodRow(
                     index,
                     str(name),
                     str(stream_id),
@@ -772,13 +740,8 @@ class EStalker_Vod_Categories(Screen):
                     tmdb,
                     str(trailer),
                     str(category_id),
-                    str(cmd),
-                    "",
-                    "",
-                    "",
-                    "",
-                    ""
-                ])
+                    str(cmd)
+                ))
 
         if self.firstlist:
             glob.originalChannelList2 = self.list2[:]
@@ -791,8 +754,8 @@ class EStalker_Vod_Categories(Screen):
             print("*** downloadApiData ***", url)
 
         # Initialize storage for all data if it doesn't exist
-        if not hasattr(self, 'all_data') or not isinstance(self.all_data, list):
-            self.all_data = []
+        if not isinstance(getattr(self, 'all_data', None), PageStore):
+            self.all_data = PageStore()
 
         paged_url = self._updateUrlPage(url, self.current_page)
 
@@ -819,24 +782,29 @@ class EStalker_Vod_Categories(Screen):
                     self.total_items = 0
                 current_page_data = js.get("data", [])
 
-                if not hasattr(self, 'all_data') or not isinstance(self.all_data, list) or not self.all_data:
-                    self.all_data = [{} for _ in range(self.total_items)]
+                if not isinstance(self.all_data, PageStore) or not self.all_data:
+                    self.all_data = PageStore()
 
-                # Calculate the position where this page's data should be stored
-                start_index = (self.current_page - 1) * 14
-
-                # Insert the new data at the correct positions
-                for i, item in enumerate(current_page_data):
-                    self.all_data[start_index + i] = item
+                if current_page_data:
+                    self.all_data.add(self.current_page, current_page_data, self.total_items)
                     self.pages_downloaded.add(paged_url)
 
+                    if self.current_page == 1:
+                        items = category_items(paged_url, current_page_data, self.total_items, self.headers)
+                        if items:
+                            if pythonVer == 3 and glob.hassuperscript:
+                                clean_names({"js": {"data": items}})
+
+                            for page in self.all_data.fill(items):
+                                self.pages_downloaded.add(self._updateUrlPage(url, page))
+
                 return self.all_data
 
         except Exception as e:
             print("Error downloading API data for page {}: {}".format(self.current_page, e))
             return self.all_data
 
-        self.session.openWithCallback(self.back, MessageBox, _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
+        self.session.openWithCallback(self.back, MessageBox, unreachable_message(self.portal) or _("Server error or invalid link."), MessageBox.TYPE_ERROR, timeout=3)
         return self.all_data
 
     def _updateUrlPage(self, url, page):
@@ -850,18 +818,27 @@ class EStalker_Vod_Categories(Screen):
         if debugs:
             print("*** createLink ***", url)
 
-        response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+        direct = direct_link(url)
+        if direct:
+            return {"js": {"cmd": direct}}
+
+        response = hedged_request(url, self.headers)
 
         if debugs:
             print("*** createlink response ***", response)
 
-        if not response and self.retry is False:
+        if not response and self.retry is False and not is_open(url):
             self.retry = True
+            count_retry(url)
             self.reauthorize()
-            response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+            response = hedged_request(url, self.headers)
             if debugs:
                 print("*** createlink response 2 ***", response)
 
+        if not response and is_open(url):
+            self.session.open(MessageBox, unreachable_message(url), MessageBox.TYPE_ERROR, timeout=3)
+
+        learn_link(url, response)
         return response
 
     def _get_profile(self, portal, mac, token, token_random, headers, param_mode):
@@ -934,17 +911,17 @@ class EStalker_Vod_Categories(Screen):
         watched_set = set(str(x) for x in glob.active_playlist["player_info"].get("vodwatched", []))
 
         if self.chosen_category == "favourites":
-            filtered_list = [x for x in self.list2 if x[7]]
+            filtered_list = [x for x in self.list2 if x.favourite]
         else:
-            filtered_list = [x for x in self.list2 if not x[10]]
+            filtered_list = [x for x in self.list2 if not x.hidden]
 
-        self.main_list = [
-            buildVodStreamList(
-                x[0], x[1], x[2], x[3], x[4], x[5], x[6], x[7], x[8], x[9], x[10], x[11], x[12], x[13], x[14],
+        def build(x):
+            return buildVodStreamList(
+                x.index, x.name, x.stream_id, x.cover, x.added, x.rating, x.next_url, x.favourite, x.container_extension, x.year, x.hidden, x.tmdb, x.trailer, x.category_id, x.cmd,
                 watched_set, self._px_play, self._px_play2, self._px_fav, self._px_watched
             )
-            for x in filtered_list
-        ]
+
+        self.main_list = self.virtual_list.entries(filtered_list, build)
 
         self["main_list"].setList(self.main_list)
 
@@ -962,6 +939,7 @@ class EStalker_Vod_Categories(Screen):
         if self["main_list"].getCurrent():
             self.tmdbresults = {}
             self.getTMDB()
+            self.enrichTMDB()
 
     def selectionChanged(self):
         if debugs:
@@ -1104,115 +1082,156 @@ class EStalker_Vod_Categories(Screen):
         if self["main_list"].getCurrent() and glob.nextlist[-1]["index"] != 0:
             self["main_list"].setIndex(glob.nextlist[-1]["index"])
 
-    def normalize_text(self, text):
-
-        has_ascii = bool(self._re_has_ascii.search(text))
-        has_non_ascii = bool(self._re_has_non_ascii.search(text))
-
-        if has_ascii and has_non_ascii:
+    def getTMDB(self):
+        if debugs:
+            print("**** getTMDB ***")
 
-            if pythonVer == 2:
-                if isinstance(text, str):
-                    text = text.decode("utf-8", "ignore")
+        current_item = self["main_list"].getCurrent()
 
-                text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore")
+        if current_item:
+            title = ""
+            searchtitle = ""
+            self.searchtitle = ""
+            self.isIMDB = False
+            self.tmdb_id_exists = False
+            title = self["main_list"].getCurrent()[0]
+            year = self["main_list"].getCurrent()[9]
+            language = cfg.TMDBLanguage2.value
 
+            if not self.isIMDB:
+                key, searchurl = self._tmdbSearchRequest(title, year)
+                parser = tmdbcache.first_result_id("results")
             else:
-                text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+                key = tmdbcache.make_key("movie", "imdb", self.tmdbresults["tmdb_id"], language)
+                parser = tmdbcache.first_result_id("movie_results")
+                searchurl = 'http://api.themoviedb.org/3/find/{}?api_key={}&external_source=imdb_id'.format(self.tmdbresults["tmdb_id"], self.check(self.apitoken))
 
-        return text
+            req_id = self._vod_req_id
+            try:
+                d = tmdbcache.fetch(key, searchurl, parser=parser, ttl=tmdbcache.search_ttl)
+                d.addCallback(self.processTMDB, req_id).addErrback(self.failed)
+            except Exception as e:
+                print("download TMDB error {}".format(e))
 
-    def stripjunk(self, text, database=None):
-        searchtitle = text
+    def _tmdbSearchRequest(self, title, year, searchtitle=None):
+        language = cfg.TMDBLanguage2.value
+        if searchtitle is None:
+            searchtitle = stripjunk(title, "TMDB")
+        key = tmdbcache.make_key("movie", "search", searchtitle, year, language)
+        searchtitle = quote(searchtitle, safe="")
 
-        # Move "the" from the end to the beginning (case-insensitive)
-        if self._re_end_the.search(searchtitle.strip().lower()):
-            searchtitle = "The " + searchtitle[:-3].strip()
+        if year:
+            searchurl = 'http://api.themoviedb.org/3/search/movie?api_key={}&primary_release_year={}&query={}'.format(self.check(self.apitoken), year, searchtitle)
+        else:
+            searchurl = 'http://api.themoviedb.org/3/search/movie?api_key={}&query={}'.format(self.check(self.apitoken), searchtitle)
 
-        # remove xx: at start (case-insensitive)
-        searchtitle = self._re_prefix_xx_colon.sub('', searchtitle)
+        return key, searchurl
 
-        # remove xx|xx at start (case-insensitive)
-        searchtitle = self._re_prefix_xx_pipe_xx.sub('', searchtitle)
+    def _tmdbDetailsRequest(self, resultid):
+        languagestr = ""
 
-        # remove all leading content between and including || or |
-        searchtitle = self._re_leading_doublepipes.sub('', searchtitle)
-        searchtitle = self._re_leading_singlepipe_block.sub('', searchtitle)
-        searchtitle = self._re_any_pipe_block.sub('', searchtitle)
+        language = cfg.TMDBLanguage2.value
+        if language:
+            languagestr = "&language=" + str(language)
 
-        # remove all leading content between and including ┃┃ or ┃
-        searchtitle = self._re_leading_doublebars.sub('', searchtitle)
-        searchtitle = self._re_leading_singlebar_block.sub('', searchtitle)
-        searchtitle = self._re_any_bar_block.sub('', searchtitle)
+        detailsurl = "http://api.themoviedb.org/3/movie/{}?api_key={}&append_to_response=credits,images,release_dates,videos{}&include_image_language=en".format(
+            resultid, self.check(self.apitoken), languagestr)
 
-        # remove all content between and including () unless it's all digits
-        searchtitle = self._re_parens.sub('', searchtitle)
+        key = tmdbcache.make_key("movie", resultid, language)
+        return key, detailsurl
 
-        # remove all content between and including []
-        searchtitle = self._re_brackets.sub('', searchtitle)
+    def _tmdbDetailsJob(self, resultid):
+        key, detailsurl = self._tmdbDetailsRequest(resultid)
+        return (key, detailsurl, None, tmdbcache.details_ttl, self._queuePoster)
 
-        # remove trailing year (but not if the whole title *is* a year)
-        if not self._re_is_year_only.match(searchtitle.strip()):
-            searchtitle = self._re_trailing_year.sub('', searchtitle)
+    def _posterFile(self, url):
+        return os.path.join(dir_tmp, "xst_vod_cover_{}.jpg".format(hashlib.md5(url.encode("utf-8")).hexdigest()))
 
-        # remove up to 6 characters followed by space and dash at start (e.g. "EN -", "BE-NL -")
-        searchtitle = self._re_lang_dash_prefix.sub('', searchtitle)
+    def _queuePoster(self, details):
+        # the cover of an enriched title goes to the cover temp path, downloadCover takes it from there
+        poster_path = details.get("poster_path") if cfg.channelcovers.value else None
+        if not poster_path:
+            return None
 
-        # normalise text
-        searchtitle = self.normalize_text(searchtitle)
+        url = "http://image.tmdb.org/t/p/{}/{}".format(self._tmdb_coversize, poster_path)
+        path = self._posterFile(url)
 
-        # Bad substrings to strip (case-insensitive)
-        searchtitle = self._re_bad_strings.sub('', searchtitle)
+        if path not in self._poster_files:
+            self._poster_queue.append((url, path))
+            self._nextPoster()
+        return None
 
-        # Bad suffixes to remove (case-insensitive, only if at end)
-        searchtitle = self._re_bad_suffix.sub('', searchtitle)
+    def _nextPoster(self):
+        if self._poster_download is not None or not self._poster_queue:
+            return
 
-        # Replace '.', '_', "'", '*' with space
-        searchtitle = self._re_dots_underscores.sub(' ', searchtitle)
+        url, path = self._poster_queue.popleft()
+        self._poster_files.add(path)
 
-        # Trim leading/trailing hyphens and whitespace
-        searchtitle = searchtitle.strip(' -').strip()
+        try:
+            self._poster_download = track(downloadPage(url.encode() if pythonVer == 3 else url, path + ".part", timeout=10), url, "images", path + ".part")
+            self._poster_download.addCallback(self._posterDone, path).addErrback(self._posterFailed, path)
+        except Exception as e:
+            print("poster prefetch error:", e)
+            self._posterFailed(None, path)
 
-        return str(searchtitle)
+    def _posterDone(self, result, path):
+        self._poster_download = None
+        try:
+            os.rename(path + ".part", path)
+        except OSError:
+            self._posterFailed(None, path)
+            return
+        self._nextPoster()
 
-    def getTMDB(self):
-        if debugs:
-            print("**** getTMDB ***")
+    def _posterFailed(self, failure, path):
+        self._poster_download = None
+        self._safe_unlink(path + ".part")
+        self._poster_files.discard(path)
+        self._nextPoster()
 
-        current_item = self["main_list"].getCurrent()
-
-        if current_item:
-            title = ""
-            searchtitle = ""
-            self.searchtitle = ""
-            self.isIMDB = False
-            self.tmdb_id_exists = False
-            title = self["main_list"].getCurrent()[0]
-            year = self["main_list"].getCurrent()[9]
+    def _cancelPosters(self):
+        self._poster_queue.clear()
 
+        if self._poster_download is not None:
             try:
-                os.remove(os.path.join(dir_tmp, "search.txt"))
-            except:
+                self._poster_download.cancel()
+            except Exception:
                 pass
 
-            searchtitle = self.stripjunk(title, "TMDB")
-            searchtitle = quote(searchtitle, safe="")
+        for path in self._poster_files:
+            self._safe_unlink(path)
+            self._safe_unlink(path + ".part")
+        self._poster_files.clear()
 
-            if not self.isIMDB:
-                searchurl = 'http://api.themoviedb.org/3/search/movie?api_key={}&query={}'.format(self.check(self.apitoken), searchtitle)
-                if year:
-                    searchurl = 'http://api.themoviedb.org/3/search/movie?api_key={}&primary_release_year={}&query={}'.format(self.check(self.apitoken), year, searchtitle)
-            else:
-                searchurl = 'http://api.themoviedb.org/3/find/{}?api_key={}&external_source=imdb_id'.format(self.tmdbresults["tmdb_id"], self.check(self.apitoken))
+    def enrichTMDB(self):
+        # warm the tmdb cache for the current and next page in the background
+        if self.level != 2 or not self.main_list:
+            return
 
-            if pythonVer == 3:
-                searchurl = searchurl.encode()
+        start = (self["main_list"].getIndex() // self.itemsperpage) * self.itemsperpage
+        window = (start, len(self.main_list), cfg.TMDBLanguage2.value)
 
-            filepath = os.path.join(dir_tmp, "search.txt")
-            try:
-                downloadPage(searchurl, filepath, timeout=10).addCallback(self.processTMDB).addErrback(self.failed)
-            except Exception as e:
-                print("download TMDB error {}".format(e))
+        if window == self._tmdb_enrich_window:
+            return
+
+        self._tmdb_enrich_window = window
+        self._poster_queue.clear()
+
+        items = self.main_list[start:start + (self.itemsperpage * 2)]
+        # the page the cursor is on, kept in the memo for getTMDB
+        searchtitles = stripjunk_batch((item[0] for item in items), remember=True)
+
+        jobs = []
+        for item in items:
+            title = item[0]
+            if not title:
+                continue
+
+            key, searchurl = self._tmdbSearchRequest(title, item[9], searchtitles[title])
+            jobs.append((key, searchurl, tmdbcache.first_result_id("results"), tmdbcache.search_ttl, self._tmdbDetailsJob))
+
+        tmdbcache.enrich(jobs)
 
     def failed(self, data=None):
         if debugs:
@@ -1225,88 +1244,41 @@ class EStalker_Vod_Categories(Screen):
 
         return
 
-    def processTMDB(self, result=None):
+    def processTMDB(self, resultid=None, req_id=None):
         if debugs:
             print("***processTMDB ***")
 
-        IMDB = self.isIMDB
-        resultid = ""
-        search_file_path = os.path.join(dir_tmp, "search.txt")
-
-        try:
-            with codecs.open(search_file_path, "r", encoding="utf-8") as f:
-                response = f.read()
-
-            if response:
-                self.searchresult = json.loads(response)
-                if IMDB is False:
-                    results = self.searchresult.get("results", [])
-                else:
-                    results = self.searchresult.get("movie_results", [])
+        if req_id != self._vod_req_id:
+            return
 
-                if results:
-                    resultid = results[0].get("id", "")
+        if not resultid:
+            self.displayTMDB()
+            return
 
-                if not resultid:
-                    self.displayTMDB()
-                    return
-
-                self.getTMDBDetails(resultid)
-        except Exception as e:
-            print("Error processing TMDB response:", e)
+        self.getTMDBDetails(resultid)
 
     def getTMDBDetails(self, resultid=None):
         # self.resultid = resultid
         if debugs:
             print(" *** getTMDBDetails ***")
 
-        detailsurl = ""
-        languagestr = ""
-
-        try:
-            os.remove(os.path.join(dir_tmp, "search.txt"))
-        except:
-            pass
-
-        language = cfg.TMDBLanguage2.value
-        if language:
-            languagestr = "&language=" + str(language)
-
-        detailsurl = "http://api.themoviedb.org/3/movie/{}?api_key={}&append_to_response=credits,images,release_dates,videos{}&include_image_language=en".format(
-            resultid, self.check(self.apitoken), languagestr)
-
-        if pythonVer == 3:
-            detailsurl = detailsurl.encode()
-
-        filepath = os.path.join(dir_tmp, "search.txt")
+        key, detailsurl = self._tmdbDetailsRequest(resultid)
+        req_id = self._vod_req_id
         try:
-            downloadPage(detailsurl, filepath, timeout=10).addCallback(self.processTMDBDetails).addErrback(self.failed)
+            d = tmdbcache.fetch(key, detailsurl)
+            d.addCallback(self.processTMDBDetails, req_id).addErrback(self.failed)
         except Exception as e:
             print("download TMDB details error:", e)
 
-    def processTMDBDetails(self, result=None):
+    def processTMDBDetails(self, details=None, req_id=None):
         if debugs:
             print("*** processTMDBDetails ***")
 
-        response = ""
-        self.tmdbdetails = []
-        self.tmdbresults = {}
-
-        try:
-            with codecs.open(os.path.join(dir_tmp, "search.txt"), "r", encoding="utf-8") as f:
-                response = f.read()
-        except Exception as e:
-            print("Error reading TMDB response:", e)
-            return
-
-        if not response:
+        if req_id != self._vod_req_id:
             return
 
-        try:
-            self.tmdbdetails = json.loads(response, object_pairs_hook=OrderedDict)
-        except Exception as e:
-            print("Error parsing TMDB response:", e)
-            return
+        self.tmdbdetails = details
+        self.tmdbresults = {}
 
         if not self.tmdbdetails:
             return
@@ -1468,7 +1440,7 @@ class EStalker_Vod_Categories(Screen):
                         try:
                             self.list2[current_index][12] = str(selected_video["key"])
                             self.buildVod()
-                        except (IndexError, KeyError):
+                        except (AttributeError, IndexError, KeyError):
                             pass
 
         # Handle certification
@@ -1535,7 +1507,7 @@ class EStalker_Vod_Categories(Screen):
                 self.displayTMDB()
 
             try:
-                downloadPage(fallback_url, filepath, timeout=10).addCallback(handleFallback).addErrback(self.failed)
+                track(downloadPage(fallback_url, filepath, timeout=10), fallback_url, "images", filepath).addCallback(handleFallback).addErrback(self.failed)
                 return  # Delay display until fallback completes
             except Exception as e:
                 print("Fallback TMDB download error:", e)
@@ -1737,6 +1709,13 @@ class EStalker_Vod_Categories(Screen):
             self.loadDefaultCover()
             return
 
+        prefetched = self._posterFile(desc_image)
+        if prefetched in self._poster_files and os.path.isfile(prefetched):
+            self._poster_files.discard(prefetched)
+            self._tmp_cover = prefetched
+            self.resizeCover(prefetched)
+            return
+
         req_id = self._vod_req_id
         # self.redirect_count = 0
 
@@ -1748,6 +1727,7 @@ class EStalker_Vod_Categories(Screen):
             desc_image.encode(),
             Headers({'User-Agent': [b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"]})
         )
+        track(self.cover_download_deferred, desc_image, "images")
 
         self.cover_download_deferred.addCallback(self.coverResponse, req_id)
         self.cover_download_deferred.addErrback(self.coverError, req_id)
@@ -1763,6 +1743,7 @@ class EStalker_Vod_Categories(Screen):
             url.encode(),
             Headers({'User-Agent': [b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"]})
         )
+        track(self.cover_download_deferred, url, "images")
         self.cover_download_deferred.addCallback(self.coverFromUrlResponse, req_id)
         self.cover_download_deferred.addErrback(self.coverError, req_id)
 
@@ -1899,6 +1880,7 @@ class EStalker_Vod_Categories(Screen):
             logo_image.encode(),
             Headers({'User-Agent': [b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"]})
         )
+        track(self.logo_download_deferred, logo_image, "images")
         self.logo_download_deferred.addCallback(self.logoResponse, req_id)
         self.logo_download_deferred.addErrback(self.logoError, req_id)
 
@@ -2031,6 +2013,7 @@ class EStalker_Vod_Categories(Screen):
             backdrop_image.encode(),
             Headers({'User-Agent': [b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/145.0.0.0 Safari/537.36"]})
         )
+        track(self.backdrop_download_deferred, backdrop_image, "images")
 
         self.backdrop_download_deferred.addCallback(self.backdropResponse, req_id)
         self.backdrop_download_deferred.addErrback(self.backdropError, req_id)
@@ -2386,7 +2369,7 @@ class EStalker_Vod_Categories(Screen):
         if self["main_list"].getCurrent():
             current_index = self["main_list"].getIndex()
             glob.nextlist[-1]["index"] = current_index
-            glob.currentchannellist = self.main_list[:]
+            glob.currentchannellist = self.virtual_list.materialize(self.main_list)[:]
             glob.currentchannellistindex = current_index
 
             if self.level == 1:
@@ -2430,7 +2413,7 @@ class EStalker_Vod_Categories(Screen):
                     if str(command).startswith("/media/"):
                         pre_vod_url = (str(self.portal) + "?type=vod&action=get_ordered_list&movie_id={}&category=1&sortby=&p=1&JsHttpRequest=1-xml").format(stream_id)
 
-                        pre_response = make_request(pre_vod_url, method="GET", headers=self.headers, params=None, response_type="json")
+                        pre_response = make_request(pre_vod_url, method="GET", headers=self.headers, params=None, response_type="json", priority=PLAYBACK)
 
                         movie_id = None
 
@@ -2495,6 +2478,9 @@ class EStalker_Vod_Categories(Screen):
             self.group_title = ""
             self._stopTimerVod()
             self._cleanup_vod_assets()
+            self._tmdb_enrich_window = None
+            tmdbcache.cancel_enrich()
+            self._cancelPosters()
 
         if glob.nextlist:
             glob.nextlist.pop()
@@ -2698,7 +2684,7 @@ class EStalker_Vod_Categories(Screen):
         if (isDreambox or isVTI) and TMDB_installed:
             try:
                 name = str(self["main_list"].getCurrent()[0])
-                name = self.stripjunk(name)
+                name = stripjunk(name)
                 if isDreambox:
                     self.session.open(ScreenMain, name, 2)
                 elif isVTI:
@@ -2710,7 +2696,7 @@ class EStalker_Vod_Categories(Screen):
                 from Plugins.Extensions.IMDb.plugin import IMDB
                 try:
                     name = str(self["main_list"].getCurrent()[0])
-                    name = self.stripjunk(name)
+                    name = stripjunk(name)
                 except:
                     name = ""
                 self.session.open(IMDB, name, False)
@@ -2806,7 +2792,7 @@ class EStalker_Vod_Categories(Screen):
             from . import vodplayer
             current_index = self["main_list"].getIndex()
             glob.nextlist[-1]["index"] = current_index
-            glob.currentchannellist = self.main_list[:]
+            glob.currentchannellist = self.virtual_list.materialize(self.main_list)[:]
             glob.currentchannellistindex = current_index
 
             streamtype = glob.active_playlist["player_info"]["vodtype"]
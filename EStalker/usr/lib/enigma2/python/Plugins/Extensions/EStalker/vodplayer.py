@@ -8,9 +8,8 @@ from __future__ import division
 import json
 import hashlib
 import os
-import re
 import tempfile
-import unicodedata
+import time
 from itertools import cycle, islice
 
 try:
@@ -51,7 +50,15 @@ from . import _
 from . import estalker_globals as glob
 from .plugin import cfg, dir_tmp, pythonVer, screenwidth, skin_directory
 from .eStaticText import StaticText
+from .breaker import is_open, unreachable_message
 from .utils import get_local_timezone, make_request, perform_handshake, get_profile_data,  _get_current_aspect_ratio
+from .profiler import profiled
+from .netstats import count_retry, track
+from .hedge import hedged_request
+from .ratelimit import PLAYBACK
+from .xtream import direct_link, learn_link
+from . import watchdog
+from . import zapstats
 
 try:
     from enigma import eAVSwitch
@@ -310,9 +317,6 @@ class EStalkerCueSheetSupport:
         self.is_closing = False
         self.started = False
         self.resume_point = ""
-        if not os.path.exists("/etc/enigma2/estalker/resumepoints.pkl"):
-            with open("/etc/enigma2/estalker/resumepoints.pkl", "w"):
-                pass
 
         self.__event_tracker = ServiceEventTracker(screen=self, eventmap={
             iPlayableService.evUpdatedInfo: self.__serviceStarted,
@@ -367,6 +371,7 @@ class EStalkerCueSheetSupport:
                 print(e)
 
 
+@profiled
 class EStalker_VodPlayer(
     InfoBarBase,
     IPTVInfoBarShowHide,
@@ -492,56 +497,6 @@ class EStalker_VodPlayer(
 
         self.headers["Authorization"] = "Bearer " + self.token
 
-        # Precompiled regex (stripjunk)
-        self._re_has_ascii = re.compile(r'[\x00-\x7F]')
-        self._re_has_non_ascii = re.compile(r'[^\x00-\x7F]')
-
-        self._re_remove_non_ascii = re.compile(r'[^\x00-\x7F]+')
-
-        self._re_end_the = re.compile(r'\s*the$', re.IGNORECASE)
-        self._re_prefix_xx_colon = re.compile(r'^\w{2}:', re.IGNORECASE)
-        self._re_prefix_xx_pipe_xx = re.compile(r'^\w{2}\|\w{2}\s', re.IGNORECASE)
-
-        self._re_leading_doublepipes = re.compile(r'^\|\|.*?\|\|')
-        self._re_leading_singlepipe_block = re.compile(r'^\|.*?\|')
-        self._re_any_pipe_block = re.compile(r'\|.*?\|')
-
-        self._re_leading_doublebars = re.compile(r'^┃┃.*?┃┃')
-        self._re_leading_singlebar_block = re.compile(r'^┃.*?┃')
-        self._re_any_bar_block = re.compile(r'┃.*?┃')
-
-        self._re_parens = re.compile(r'\(\(.*?\)\)|\([^()]*\)')
-        self._re_brackets = re.compile(r'\[\[.*?\]\]|\[.*?\]')
-
-        self._re_is_year_only = re.compile(r'^\d{4}$')
-        self._re_trailing_year = re.compile(r'[\s\-]*(?:[\(\[\"]?\d{4}[\)\]\"]?)$')
-
-        self._re_lang_dash_prefix = re.compile(r'^[A-Za-z0-9\-]{1,7}\s*-\s*', re.IGNORECASE)
-
-        # Bad substrings
-        bad_strings = [
-            "ae|", "al|", "ar|", "at|", "ba|", "be|", "bg|", "br|", "cg|", "ch|", "cz|", "da|", "de|", "dk|",
-            "ee|", "en|", "es|", "eu|", "ex-yu|", "fi|", "fr|", "gr|", "hr|", "hu|", "in|", "ir|", "it|", "lt|",
-            "mk|", "mx|", "nl|", "no|", "pl|", "pt|", "ro|", "rs|", "ru|", "se|", "si|", "sk|", "sp|", "tr|",
-            "uk|", "us|", "yu|",
-            "1080p", "1080p-dual-lat-cine-calidad.com", "1080p-dual-lat-cine-calidad.com-1",
-            "1080p-dual-lat-cinecalidad.mx", "1080p-lat-cine-calidad.com", "1080p-lat-cine-calidad.com-1",
-            "1080p-lat-cinecalidad.mx", "1080p.dual.lat.cine-calidad.com", "3d", "'", "#", "(", ")", "-", "[]", "/",
-            "4k", "720p", "aac", "blueray", "ex-yu:", "fhd", "hd", "hdrip", "hindi", "imdb", "multi:", "multi-audio",
-            "multi-sub", "multi-subs", "multisub", "ozlem", "sd", "top250", "u-", "uhd", "vod", "x264",
-            "amz", "dolby", "audio", "8k", "3840p", "50fps", "60fps", "hevc", "raw ", "vip ", "NF", "d+", "a+", "vp", "prmt", "mrvl"
-        ]
-        self._re_bad_strings = re.compile('|'.join(map(re.escape, bad_strings)), re.IGNORECASE)
-
-        # Bad suffixes
-        bad_suffix = [
-            " al", " ar", " ba", " da", " de", " en", " es", " eu", " ex-yu", " fi", " fr", " gr", " hr", " mk",
-            " nl", " no", " pl", " pt", " ro", " rs", " ru", " si", " swe", " sw", " tr", " uk", " yu"
-        ]
-        self._re_bad_suffix = re.compile(r'(' + '|'.join(map(re.escape, bad_suffix)) + r')$', re.IGNORECASE)
-
-        self._re_dots_underscores = re.compile(r"[._'\*]")
-
         self.adult_keywords = set([
             "adult", "+18", "18+", "18 rated", "xxx", "sex", "porn",
             "voksen", "volwassen", "aikuinen", "Erwachsene", "dorosly",
@@ -560,31 +515,48 @@ class EStalker_VodPlayer(
             "info": self.toggleStreamType,
             "green": self.nextAR,
             "ok": self.refreshInfobar,
+            "info_long": self.showZapStats,
         }, -2)
 
+        self.zap = None
+
+        self.__event_tracker = ServiceEventTracker(screen=self, eventmap={
+            iPlayableService.evStart: self.__evStart,
+            iPlayableService.evUpdatedInfo: self.__evUpdatedInfo,
+        })
+
         self.timerWatched = eTimer()
         try:
             self.timerWatched.callback.append(self.addWatchedList)
         except:
             self.timerWatched_conn = self.timerWatched.timeout.connect(self.addWatchedList)
 
-        self.timerWatchdog = eTimer()
+        self.timerCheckpoint = eTimer()
         try:
-            self.timerWatchdog.callback.append(self.sendWatchdog)
+            self.timerCheckpoint.callback.append(self.checkpointResume)
         except:
-            self.timerWatchdog_conn = self.timerWatchdog.timeout.connect(self.sendWatchdog)
+            self.timerCheckpoint_conn = self.timerCheckpoint.timeout.connect(self.checkpointResume)
 
         self.onFirstExecBegin.append(boundFunction(self.playStream, self.servicetype, self.streamurl))
 
-    def sendWatchdog(self):
-        if glob.categoryname == "series":
-            play_type = 2
-        else:
-            play_type = 1
+    def __evStart(self):
+        if self.zap:
+            self.zap.mark("service_start")
+
+    def __evUpdatedInfo(self):
+        if self.zap:
+            self.zap.finish("first_frame")
 
-        watchdog_url = "{0}?type=watchdog&action=get_events&cur_play_type={1}&event_active_id=0&init=0&JsHttpRequest=1-xml".format(self.portal, play_type)
-        make_request(watchdog_url, method="GET", headers=self.headers, params=None, response_type="json")
-        self.timerWatchdog.start(30000, True)
+    def showZapStats(self):
+        self.session.open(MessageBox, zapstats.report(), type=MessageBox.TYPE_INFO)
+
+    def checkpointResume(self):
+        # one small append to the resume log, skipped until the position moved half a checkpoint
+        # interval (pts, 90000 per second), so a paused or stalled stream is not rewritten
+        try:
+            setResumePoint(self.session, min_move=max(30, int(cfg.resumecheckpoint.value)) * 90000 // 2)
+        except Exception as e:
+            print(e)
 
     def _stopTimer(self, name):
         t = getattr(self, name, None)
@@ -648,79 +620,9 @@ class EStalker_VodPlayer(
         with open(playlists_json, "w") as f:
             json.dump(self.playlists_all, f, indent=4)
 
-    def normalize_text(self, text):
-
-        has_ascii = bool(self._re_has_ascii.search(text))
-        has_non_ascii = bool(self._re_has_non_ascii.search(text))
-
-        if has_ascii and has_non_ascii:
-
-            if pythonVer == 2:
-                if isinstance(text, str):
-                    text = text.decode("utf-8", "ignore")
-
-                text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore")
-
-            else:
-                text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
-
-        return text
-
-    def stripjunk(self, text, database=None):
-        searchtitle = text
-
-        # Move "the" from the end to the beginning (case-insensitive)
-        if self._re_end_the.search(searchtitle.strip().lower()):
-            searchtitle = "The " + searchtitle[:-3].strip()
-
-        # remove xx: at start (case-insensitive)
-        searchtitle = self._re_prefix_xx_colon.sub('', searchtitle)
-
-        # remove xx|xx at start (case-insensitive)
-        searchtitle = self._re_prefix_xx_pipe_xx.sub('', searchtitle)
-
-        # remove all leading content between and including || or |
-        searchtitle = self._re_leading_doublepipes.sub('', searchtitle)
-        searchtitle = self._re_leading_singlepipe_block.sub('', searchtitle)
-        searchtitle = self._re_any_pipe_block.sub('', searchtitle)
-
-        # remove all leading content between and including ┃┃ or ┃
-        searchtitle = self._re_leading_doublebars.sub('', searchtitle)
-        searchtitle = self._re_leading_singlebar_block.sub('', searchtitle)
-        searchtitle = self._re_any_bar_block.sub('', searchtitle)
-
-        # remove all content between and including () unless it's all digits
-        searchtitle = self._re_parens.sub('', searchtitle)
-
-        # remove all content between and including []
-        searchtitle = self._re_brackets.sub('', searchtitle)
-
-        # remove trailing year (but not if the whole title *is* a year)
-        if not self._re_is_year_only.match(searchtitle.strip()):
-            searchtitle = self._re_trailing_year.sub('', searchtitle)
-
-        # remove up to 6 characters followed by space and dash at start (e.g. "EN -", "BE-NL -")
-        searchtitle = self._re_lang_dash_prefix.sub('', searchtitle)
-
-        # normalise text
-        searchtitle = self.normalize_text(searchtitle)
-
-        # Bad substrings to strip (case-insensitive)
-        searchtitle = self._re_bad_strings.sub('', searchtitle)
-
-        # Bad suffixes to remove (case-insensitive, only if at end)
-        searchtitle = self._re_bad_suffix.sub('', searchtitle)
-
-        # Replace '.', '_', "'", '*' with space
-        searchtitle = self._re_dots_underscores.sub(' ', searchtitle)
-
-        # Trim leading/trailing hyphens and whitespace
-        searchtitle = searchtitle.strip(' -').strip()
-
-        return str(searchtitle)
-
     def playStream(self, servicetype, streamurl):
         self._stopTimer("timerWatched")
+        self._stopTimer("timerCheckpoint")
 
         if not streamurl:
             return
@@ -742,12 +644,18 @@ class EStalker_VodPlayer(
         except:
             pass
 
+        if not self.zap or self.zap.done:
+            self.zap = zapstats.ZapTimer(glob.categoryname or "vod", self.portal)
+
         self.reference = eServiceReference(int(self.servicetype), 0, streamurl)
         self.reference.setName(glob.currentchannellist[glob.currentchannellistindex][0])
 
         if self.session.nav.getCurrentlyPlayingServiceReference():
             if self.session.nav.getCurrentlyPlayingServiceReference().toString() != self.reference.toString():
 
+                # keep the position of the episode being zapped away from
+                self.checkpointResume()
+
                 try:
                     self.session.nav.stopService()
                 except:
@@ -758,13 +666,18 @@ class EStalker_VodPlayer(
         else:
             self.session.nav.playService(self.reference)
 
+        self.zap.mark("play_service")
+
         if self.session.nav.getCurrentlyPlayingServiceReference():
             glob.newPlayingServiceRef = self.session.nav.getCurrentlyPlayingServiceReference()
             glob.newPlayingServiceRefString = self.session.nav.getCurrentlyPlayingServiceReference().toString()
 
             self.timerWatched.start(15 * 60 * 1000, True)
             # watchdog
-            self.timerWatchdog.start(30000, True)
+            watchdog.play(self.portal, self.headers, watchdog.SERIES if glob.categoryname == "series" else watchdog.VOD)
+
+            if cfg.resumecheckpoint.value:
+                self.timerCheckpoint.start(int(cfg.resumecheckpoint.value) * 1000, False)
 
         try:
             self.arTimer.stop()
@@ -860,9 +773,9 @@ class EStalker_VodPlayer(
 
             if scheme == "https" and sslverify:
                 sniFactory = SNIFactory(domain)
-                d = downloadPage(url, temp, sniFactory, timeout=5)
+                d = track(downloadPage(url, temp, sniFactory, timeout=5), url, "images", temp)
             else:
-                d = downloadPage(url, temp, timeout=5)
+                d = track(downloadPage(url, temp, timeout=5), url, "images", temp)
 
             d.addCallback(_ok)
             d.addErrback(_err)
@@ -941,12 +854,10 @@ class EStalker_VodPlayer(
             pass
 
     def back(self):
-        try:
-            self.timerWatchdog.stop()
-        except:
-            pass
+        watchdog.stop()
 
         self._cleanupTimer("timerWatched")
+        self._cleanupTimer("timerCheckpoint")
 
         glob.nextlist[-1]["index"] = glob.currentchannellistindex
         try:
@@ -991,6 +902,7 @@ class EStalker_VodPlayer(
     def __next__(self):
         if glob.categoryname == "series":
             self.servicetype = self.originalservicetype
+            self.zap = zapstats.ZapTimer("series", self.portal)
 
             if glob.currentchannellist:
                 list_length = len(glob.currentchannellist)
@@ -1010,7 +922,7 @@ class EStalker_VodPlayer(
                 if str(command).startswith("/media/"):
                     pre_vod_url = (str(self.portal) + "?type=series&action=get_ordered_list&movie_id={}&season_id=0&episode_id=0&category=1&sortby=&p=1&JsHttpRequest=1-xml").format(self.stream_id)
 
-                    pre_response = make_request(pre_vod_url, method="GET", headers=self.headers, params=None, response_type="json")
+                    pre_response = make_request(pre_vod_url, method="GET", headers=self.headers, params=None, response_type="json", priority=PLAYBACK)
 
                     movie_id = None
 
@@ -1026,6 +938,8 @@ class EStalker_VodPlayer(
 
                         command = "/media/file_{}{}".format(movie_id, ext)
 
+                    self.zap.mark("page_load")
+
                 if isinstance(command, str):
                     if ("localhost" in command or "///" in command or "/ch/" in command or "http" not in command):
                         url = "{0}?type=vod&action=create_link&cmd={1}&series={2}&forced_storage=&disable_ad=0&download=0&force_ch_link_check=0&JsHttpRequest=1-xml".format(self.portal, command, episode_id)
@@ -1036,6 +950,8 @@ class EStalker_VodPlayer(
                         if isinstance(response, dict) and "js" in response and "cmd" in response["js"]:
                             next_url = str(response["js"]["cmd"])
 
+                        self.zap.mark("create_link")
+
                     else:
                         next_url = command
 
@@ -1063,6 +979,7 @@ class EStalker_VodPlayer(
     def prev(self):
         if glob.categoryname == "series":
             self.servicetype = self.originalservicetype
+            self.zap = zapstats.ZapTimer("series", self.portal)
 
             if glob.currentchannellist:
                 list_length = len(glob.currentchannellist)
@@ -1082,7 +999,7 @@ class EStalker_VodPlayer(
                 if str(command).startswith("/media/"):
                     pre_vod_url = (str(self.portal) + "?type=series&action=get_ordered_list&movie_id={}&season_id=0&episode_id=0&category=1&sortby=&p=1&JsHttpRequest=1-xml").format(self.stream_id)
 
-                    pre_response = make_request(pre_vod_url, method="GET", headers=self.headers, params=None, response_type="json")
+                    pre_response = make_request(pre_vod_url, method="GET", headers=self.headers, params=None, response_type="json", priority=PLAYBACK)
 
                     movie_id = None
 
@@ -1098,6 +1015,8 @@ class EStalker_VodPlayer(
 
                         command = "/media/file_{}{}".format(movie_id, ext)
 
+                    self.zap.mark("page_load")
+
                 if isinstance(command, str):
                     if "localhost" in command or "http" not in command or "///" in command:
                         url = "{0}?type=vod&action=create_link&cmd={1}&series={2}&forced_storage=&disable_ad=0&download=0&force_ch_link_check=0&JsHttpRequest=1-xml".format(self.portal, command, episode_id)
@@ -1108,6 +1027,8 @@ class EStalker_VodPlayer(
                         if isinstance(response, dict) and "js" in response and "cmd" in response["js"]:
                             next_url = str(response["js"]["cmd"])
 
+                        self.zap.mark("create_link")
+
                     else:
                         next_url = command
 
@@ -1154,13 +1075,25 @@ class EStalker_VodPlayer(
         self.session.open(MessageBox, message, type=MessageBox.TYPE_INFO, timeout=1)
 
     def createLink(self, url):
-        response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+        direct = direct_link(url)
+        if direct:
+            return {"js": {"cmd": direct}}
+
+        response = hedged_request(url, self.headers)
 
-        if not response and self.retry is False:
+        if not response and self.retry is False and not is_open(url):
             self.retry = True
+            count_retry(url)
+            reauth_start = time.time()
             self.reauthorize()
-            response = make_request(url, method="GET", headers=self.headers, params=None, response_type="json")
+            if self.zap:
+                self.zap.add("reauthorize", time.time() - reauth_start)
+            response = hedged_request(url, self.headers)
+
+        if not response and is_open(url):
+            self.session.open(MessageBox, unreachable_message(url), MessageBox.TYPE_ERROR, timeout=3)
 
+        learn_link(url, response)
         return response
 
     def _get_profile(self, portal, mac, token, token_random, headers, param_mode):
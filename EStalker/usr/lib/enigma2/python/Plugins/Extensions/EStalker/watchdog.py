@@ -0,0 +1,118 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# One portal watchdog for the live and vod players.
+# The players report what is playing (play) and when they close (stop), the pings run on the reactor
+# with the request itself in a worker thread, so a slow portal never holds up the UI.
+# Only one ping is in flight at a time, and zaps and player switches move the schedule instead of
+# adding pings. A type change while a ping is in flight is sent once that ping is back.
+# A player closing does not stop the schedule at once: the next player opened before the
+# next ping carries on with it, otherwise the watchdog goes quiet.
+# Slow or failed pings double the interval up to max_interval, a quick answer brings it back.
+
+from twisted.internet import reactor, threads
+
+from .plugin import debugs
+from .utils import make_request
+
+
+# cur_play_type values of the stalker watchdog
+LIVE = 0
+VOD = 1
+SERIES = 2
+
+interval = 30
+max_interval = 60
+
+# a ping slower than this counts as slow
+slow_seconds = 3
+
+# after a change of play type the portal is told within type_change_delay seconds,
+# unless the last ping was less than min_gap seconds ago
+type_change_delay = 1
+min_gap = 10
+
+
+class WatchdogService(object):
+    def __init__(self):
+        self.portal = None
+        self.headers = None
+        self.play_type = LIVE
+        self.active = False
+        self.in_flight = False
+        self.type_changed = False
+        self.call = None
+        self.interval = interval
+        self.last_ping = 0
+
+    def play(self, portal, headers, play_type=LIVE):
+        changed = self.portal is not None and (portal != self.portal or play_type != self.play_type)
+
+        self.portal = portal
+        self.headers = headers
+        self.play_type = play_type
+        self.active = True
+
+        if changed and self.in_flight:
+            self.type_changed = True
+        elif changed and reactor.seconds() - self.last_ping >= min_gap:
+            self._schedule(type_change_delay)
+        else:
+            self._schedule(self.interval)
+
+    def stop(self):
+        self.active = False
+
+    def _schedule(self, delay):
+        # only ever moves the next ping earlier, a ping in flight schedules the next one when it is back
+        if self.in_flight:
+            return
+
+        if self.call is not None and self.call.active():
+            if self.call.getTime() - reactor.seconds() > delay:
+                self.call.reset(delay)
+            return
+
+        self.call = reactor.callLater(delay, self._ping)
+
+    def _ping(self):
+        self.call = None
+
+        if not self.active or not self.portal:
+            return
+
+        if debugs:
+            print("*** watchdog ping ***", self.play_type)
+
+        url = "{0}?type=watchdog&action=get_events&cur_play_type={1}&event_active_id=0&init=0&JsHttpRequest=1-xml".format(self.portal, self.play_type)
+
+        self.in_flight = True
+        self.type_changed = False
+        started = reactor.seconds()
+        d = threads.deferToThread(make_request, url, "GET", dict(self.headers or {}), None, "json")
+        d.addBoth(self._pingDone, started)
+
+    def _pingDone(self, result, started):
+        self.in_flight = False
+        self.last_ping = reactor.seconds()
+
+        if not isinstance(result, dict) or self.last_ping - started > slow_seconds:
+            self.interval = min(self.interval * 2, max_interval)
+        else:
+            self.interval = interval
+
+        if self.active:
+            # the ping that just came back carried the old play type
+            self._schedule(type_change_delay if self.type_changed else self.interval)
+            self.type_changed = False
+
+
+service = WatchdogService()
+
+
+def play(portal, headers, play_type=LIVE):
+    service.play(portal, headers, play_type)
+
+
+def stop():
+    service.stop()
@@ -0,0 +1,399 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Xtream Codes player_api.php backend for portals that front an Xtream panel.
+# The credentials are taken from a create_link answer (/movie/<user>/<pass>/..., /live/..., /series/...).
+# With them get_live_streams / get_vod_streams / get_series return a whole category in one response,
+# which is turned into the same item dicts get_ordered_list returns, so the screens parse it unchanged.
+# The result is only used when it lines up with the first stalker page (same count, ids and cmds),
+# anything else falls back to the normal 14 item paging.
+# The same create_link answers are used to build later play links locally (direct_link), skipping the
+# portal round trip once one built link has been checked, in a background thread, to answer.
+
+import re
+import threading
+import time
+
+import requests
+
+try:
+    from urllib.parse import urlparse, parse_qsl, quote
+except ImportError:
+    from urlparse import urlparse, parse_qsl
+    from urllib import quote
+
+from . import estalker_globals as glob
+from .plugin import cfg, debugs
+from .utils import make_request, xtream_request
+
+actions = {
+    "itv": "get_live_streams",
+    "vod": "get_vod_streams",
+    "series": "get_series",
+}
+
+# (portal, mac) -> credentials dict, {} when the portal has none
+credentials_cache = {}
+
+# (portal, mac, type) of catalogs that did not match the stalker list, not tried again this session
+unsupported = set()
+
+
+def _playlist_key():
+    playlist_info = glob.active_playlist.get("playlist_info", {})
+    return str(playlist_info.get("portal", "")), str(playlist_info.get("mac", "")).upper()
+
+
+def find_credentials(portal, headers, content_type, items=None):
+    """Extract Xtream credentials from the create_link answer of the first playable item."""
+    try:
+        if items is None:
+            list_url = "{}?type={}&action=get_ordered_list&genre=*&JsHttpRequest=1-xml".format(portal, content_type)
+            data = make_request(list_url, method="GET", headers=headers, params=None, response_type="json")
+
+            if not data:
+                return {}
+
+            items = (data.get("js") or {}).get("data") or []
+
+        first_item = next((v for v in items if isinstance(v, dict) and v.get("cmd")), None)
+        if not first_item:
+            return {}
+
+        cmd_val = first_item.get("cmd", "")
+        if str(cmd_val).startswith("/media/"):
+            cmd_val = cmd_val.replace("/media/", "/media/file_")
+
+        create_link_url = "{}?type={}&action=create_link&cmd={}&series=&forced_storage=&disable_ad=0&download=0&force_ch_link_check=0&JsHttpRequest=1-xml".format(
+            portal, content_type, cmd_val
+        )
+
+        link_data = make_request(create_link_url, method="GET", headers=headers, params=None, response_type="json")
+        if not link_data:
+            return {}
+
+        cmd = (link_data.get("js") or {}).get("cmd")
+        if not cmd:
+            return {}
+
+        match = re.search(r'/(?:movie|series|live)/([^/]+)/([^/]+)/', str(cmd))
+        if match:
+            return {"username": match.group(1), "password": match.group(2)}
+
+    except Exception as e:
+        print("Error fetching Xtream creds:", e, portal)
+
+    return {}
+
+
+def get_credentials(headers, content_type="vod", items=None):
+    """Cached credentials of the active playlist, {} when the portal does not expose any."""
+    key = _playlist_key()
+
+    if key not in credentials_cache:
+        portal = key[0]
+        creds = find_credentials(portal, headers, content_type, items)
+        if not creds and content_type != "vod":
+            creds = find_credentials(portal, headers, "vod")
+
+        # 32 character passwords are per session tokens, player_api does not accept them
+        if not creds.get("username") or not creds.get("password") or len(creds["password"]) == 32:
+            creds = {}
+
+        credentials_cache[key] = creds
+
+    return credentials_cache[key]
+
+
+def player_api(creds, action=None, **params):
+    host = str(glob.active_playlist.get("playlist_info", {}).get("host", "")).rstrip("/")
+    url = host + "/player_api.php?username={}&password={}".format(quote(creds["username"], safe=""), quote(creds["password"], safe=""))
+
+    if action:
+        url += "&action=" + action
+    for key, value in params.items():
+        url += "&{}={}".format(key, quote(str(value), safe=""))
+
+    return xtream_request(url)
+
+
+def _live_item(item, stream_id, cmd):
+    return {
+        "id": stream_id,
+        "name": item.get("name", ""),
+        "number": str(item.get("num", "")),
+        "logo": item.get("stream_icon") or "",
+        "tv_genre_id": str(item.get("category_id", "")),
+        "xmltv_id": item.get("epg_channel_id") or "",
+        "cmd": cmd,
+    }
+
+
+def _vod_item(item, stream_id, cmd):
+    return {
+        "id": stream_id,
+        "name": item.get("name", ""),
+        "pic": item.get("stream_icon") or "",
+        "added": str(item.get("added", "0")),
+        "category_id": str(item.get("category_id", "")),
+        "rating": str(item.get("rating", "")),
+        "year": str(item.get("year") or ""),
+        "container_extension": item.get("container_extension") or "",
+        "cmd": cmd,
+    }
+
+
+def _series_item(item, stream_id, cmd):
+    backdrop = item.get("backdrop_path") or []
+    return {
+        "id": stream_id,
+        "name": item.get("name", ""),
+        "screenshot_uri": item.get("cover") or "",
+        "added": str(item.get("last_modified", "")),
+        "category_id": str(item.get("category_id", "")),
+        "rating_imdb": str(item.get("rating", "")),
+        "description": item.get("plot") or "",
+        "actors": item.get("cast") or "",
+        "director": item.get("director") or "",
+        "genres_str": item.get("genre") or "",
+        "year": str(item.get("releaseDate") or item.get("year") or ""),
+        "screenshots": backdrop if isinstance(backdrop, list) else [backdrop],
+        "cmd": cmd,
+    }
+
+
+converters = {
+    "itv": _live_item,
+    "vod": _vod_item,
+    "series": _series_item,
+}
+
+
+def _xtream_id(content_type, item):
+    return str(item.get("series_id" if content_type == "series" else "stream_id", ""))
+
+
+def _sort(content_type, items, sortby):
+    if sortby == "name":
+        items.sort(key=lambda item: str(item.get("name", "")).lower())
+    elif sortby == "added":
+        field = "last_modified" if content_type == "series" else "added"
+        items.sort(key=lambda item: str(item.get(field, "")), reverse=True)
+    elif content_type == "itv":
+        try:
+            items.sort(key=lambda item: int(item.get("num") or 0))
+        except (ValueError, TypeError):
+            pass
+    return items
+
+
+def _template(value, xtream_id):
+    # the value split around the xtream id, joined again with another id.
+    # "ffmpeg http://localhost/ch/123_" -> ["ffmpeg http://localhost/ch/", "_"]
+    value = str(value or "")
+    if xtream_id and xtream_id in value:
+        return value.split(xtream_id)
+    return [value]
+
+
+def category_items(url, first_page, total_items, headers):
+    """
+    The whole category of a get_ordered_list url as stalker item dicts, or None to keep paging.
+    first_page is the stalker page 1 already downloaded, it is used to learn how the portal builds
+    ids and cmds from the xtream stream ids and to check the two lists are in the same order.
+    """
+    if not cfg.xtreamcatalog.value or not first_page or total_items <= len(first_page):
+        return None
+
+    query = dict(parse_qsl(urlparse(url).query))
+    content_type = query.get("type", "")
+
+    if content_type not in actions or query.get("search") or query.get("movie_id", "0") not in ("0", ""):
+        return None
+
+    key = _playlist_key() + (content_type,)
+    if key in unsupported:
+        return None
+
+    creds = get_credentials(headers, content_type, first_page)
+    if not creds:
+        return None
+
+    category = query.get("genre" if content_type == "itv" else "category", "*")
+
+    if debugs:
+        print("*** xtream category_items ***", content_type, category)
+
+    params = {} if category in ("*", "", "0") else {"category_id": category}
+    response = player_api(creds, actions[content_type], **params)
+
+    if not isinstance(response, list) or len(response) != total_items:
+        unsupported.add(key)
+        return None
+
+    response = _sort(content_type, [item for item in response if isinstance(item, dict)], query.get("sortby", ""))
+
+    if len(response) != total_items:
+        unsupported.add(key)
+        return None
+
+    first_id = _xtream_id(content_type, response[0])
+    id_parts = _template(first_page[0].get("id"), first_id)
+    cmd_parts = _template(first_page[0].get("cmd"), first_id)
+
+    # the stalker id has to be built from the xtream id, a constant would match anything
+    if len(id_parts) < 2:
+        unsupported.add(key)
+        return None
+
+    convert = converters[content_type]
+    items = []
+    for item in response:
+        xtream_id = _xtream_id(content_type, item)
+        items.append(convert(item, xtream_id.join(id_parts), xtream_id.join(cmd_parts)))
+
+    for stalker_item, item in zip(first_page, items):
+        if str(stalker_item.get("id", "")) != item["id"] or str(stalker_item.get("cmd", "")) != item["cmd"]:
+            unsupported.add(key)
+            return None
+
+    # keep the stalker dicts of page 1, they carry fields player_api does not have
+    items[:len(first_page)] = first_page
+    return items
+
+
+# create_link answers of the form <base>/live|movie|series/<user>/<pass>/<id>.<ext>, learned per playlist and
+# type: (portal, mac, type) -> {"cmd": cmd split around the id, "url": answer split around the id, "checked": bool}
+link_templates = {}
+
+# (portal, mac, type) -> time until which a template whose check failed is not learned again
+rejected = {}
+reject_seconds = 30 * 60
+
+link_pattern = re.compile(r'/(?:live|movie|series)/([^/]+)/([^/]+)/(\d+)(?:\.\w+)?$')
+
+
+def _link_key(url):
+    query = dict(parse_qsl(urlparse(url).query))
+
+    # episodes are played by an xtream episode id that is not part of the stalker cmd
+    if query.get("series") not in (None, "", "0"):
+        return None, ""
+
+    return _playlist_key() + (query.get("type", ""),), query.get("cmd", "")
+
+
+def learn_link(url, response):
+    """Remember how a create_link answer was built, so the next ones can be built locally."""
+    try:
+        key, cmd = _link_key(url)
+        resolved = str(((response or {}).get("js") or {}).get("cmd") or "")
+    except Exception:
+        return
+
+    if not key or not cmd or not resolved or rejected.get(key, 0) > time.time():
+        return
+
+    link = resolved.split(None, 1)[-1]
+    match = link_pattern.search(link) if "?" not in link else None
+    stream_id = match.group(3) if match else ""
+
+    if not stream_id or cmd.count(stream_id) != 1:
+        return
+
+    template = link_templates.get(key)
+    if template and _build(template, cmd) != resolved:
+        # the portal does not build its links the same way for every item
+        link_templates.pop(key, None)
+        return
+
+    if not template:
+        position = resolved.rfind(stream_id)
+        link_templates[key] = {
+            "cmd": cmd.split(stream_id),
+            "url": [resolved[:position], resolved[position + len(stream_id):]],
+            "checked": False,
+            "checking": False,
+        }
+
+    if not credentials_cache.get(key[:2]):
+        credentials_cache[key[:2]] = {"username": match.group(1), "password": match.group(2)}
+
+
+def plain_link(url):
+    """
+    True when the create_link answers for url are plain links built from the cmd (a learned template),
+    with no play token in them, so a second create_link for the same cmd hands out the same link.
+    """
+    try:
+        key, cmd = _link_key(url)
+    except Exception:
+        return False
+
+    template = link_templates.get(key) if key else None
+    return bool(template and _build(template, cmd))
+
+
+def _build(template, cmd):
+    prefix, suffix = template["cmd"]
+    if not cmd.startswith(prefix) or not cmd.endswith(suffix):
+        return ""
+
+    stream_id = cmd[len(prefix):len(cmd) - len(suffix)]
+    if not stream_id.isdigit():
+        return ""
+
+    return stream_id.join(template["url"])
+
+
+def _probe(link):
+    # one short request per template, the connection is closed as soon as the headers are in
+    try:
+        headers = {"User-Agent": "Mozilla/5.0 (QtEmbedded; U; Linux; C) AppleWebKit/533.3 (KHTML, like Gecko) MAG200 stbapp ver: 2 rev: 250 Safari/533.3"}
+        r = requests.get(link, headers=headers, timeout=(3, 3), verify=False, stream=True, allow_redirects=True)
+        r.close()
+        return r.status_code < 400
+    except Exception:
+        return False
+
+
+def _check(key, template, link):
+    if _probe(link):
+        template["checked"] = True
+    else:
+        # a panel refusing the check (max connections, blocked) would refuse it again on the next zap
+        rejected[key] = time.time() + reject_seconds
+        if link_templates.get(key) is template:
+            link_templates.pop(key, None)
+
+        if debugs:
+            print("*** xtream direct link check failed ***", link)
+
+    template["checking"] = False
+
+
+def direct_link(url, probe=True):
+    """
+    The answer create_link would give for a create_link url, built locally. "" when it can not be
+    built (no template yet, other link format, episodes) or the template has not been checked yet.
+    probe=True starts the check of a new template in a background thread, the caller never waits for it.
+    """
+    if not cfg.xtreamlinks.value:
+        return ""
+
+    key, cmd = _link_key(url)
+    template = link_templates.get(key) if key else None
+    if not template:
+        return ""
+
+    resolved = _build(template, cmd)
+    if not resolved or template["checked"]:
+        return resolved
+
+    if probe and not template["checking"]:
+        template["checking"] = True
+        thread = threading.Thread(target=_check, args=(key, template, resolved.split(None, 1)[-1]))
+        thread.daemon = True
+        thread.start()
+
+    return ""
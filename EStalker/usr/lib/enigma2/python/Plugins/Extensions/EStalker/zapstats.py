@@ -0,0 +1,129 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Zap latency timings for the live and vod players.
+# Each zap records how long each phase took into a ring buffer, report() gives p50/p95 per portal.
+
+import json
+
+from collections import OrderedDict, deque
+from time import time
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+from . import _
+from .plugin import cfg
+
+
+ring_size = 200
+log_file = "/tmp/estalker_zaptimes.log"
+
+# display order, anything else recorded is listed after these
+phases = ["page_load", "create_link", "reauthorize", "play_service", "service_start", "first_frame", "total"]
+
+records = deque(maxlen=ring_size)
+
+
+class ZapTimer(object):
+    def __init__(self, player, portal):
+        self.player = player
+        self.portal = portal or ""
+        self.started = time()
+        self.last = self.started
+        self.phases = OrderedDict()
+        self.done = False
+
+    def mark(self, phase):
+        # time since the previous mark is booked against phase
+        if self.done:
+            return
+
+        now = time()
+        self.phases[phase] = self.phases.get(phase, 0) + (now - self.last)
+        self.last = now
+
+    def add(self, phase, seconds):
+        # for phases nested inside another one (reauthorize inside create_link)
+        if self.done:
+            return
+
+        self.phases[phase] = self.phases.get(phase, 0) + seconds
+
+    def finish(self, phase="first_frame"):
+        if self.done:
+            return
+
+        self.mark(phase)
+        self.done = True
+
+        record = {
+            "time": int(self.started),
+            "player": self.player,
+            "portal": self.portal,
+            "phases": dict((k, round(v, 3)) for k, v in self.phases.items()),
+            "total": round(self.last - self.started, 3),
+        }
+        records.append(record)
+
+        if cfg.zaplog.value:
+            try:
+                with open(log_file, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+            except Exception as e:
+                print("[EStalker] zap log error:", e)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+
+    values = sorted(values)
+    index = int(round((pct / 100.0) * (len(values) - 1)))
+    return values[index]
+
+
+def summary():
+    """Returns {(portal, player): {phase: (count, p50, p95)}}"""
+    grouped = OrderedDict()
+
+    for record in records:
+        group = grouped.setdefault((record["portal"], record["player"]), {})
+        for phase, seconds in record["phases"].items():
+            group.setdefault(phase, []).append(seconds)
+        group.setdefault("total", []).append(record["total"])
+
+    results = OrderedDict()
+    for key, group in grouped.items():
+        results[key] = OrderedDict()
+        ordered = [p for p in phases if p in group] + sorted(p for p in group if p not in phases)
+        for phase in ordered:
+            values = group[phase]
+            results[key][phase] = (len(values), percentile(values, 50), percentile(values, 95))
+
+    return results
+
+
+def report():
+    results = summary()
+
+    if not results:
+        return _("No zap timings recorded yet.")
+
+    lines = []
+    for (portal, player), group in results.items():
+        host = urlparse(portal).netloc or portal
+        lines.append("{} ({}) - {} {}".format(host, player, group["total"][0], _("zaps")))
+
+        for phase, (count, p50, p95) in group.items():
+            lines.append("    {:<14} p50 {:>6} ms   p95 {:>6} ms".format(phase, int(p50 * 1000), int(p95 * 1000)))
+
+        lines.append("")
+
+    return "\n".join(lines).strip()
+
+
+def clear():
+    records.clear()
@@ -0,0 +1,300 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Headless benchmark for the list pipelines of the live, vod and series screens (see e2stubs.py).
+# Times the real response parsers, list builders and sorts on synthetic catalogs:
+#   live    getLevel2, buildList2, sort / applyPreviousSort (categories and channels)
+#   vod     getVodCategoryStreams, buildVod, sort / applyPreviousSort (categories and streams)
+#   series  getSeries, buildSeries, getSeasons, buildSeasons, getEpisodes, buildEpisodes, sort (categories and titles)
+# Sorting a stream list re-requests the first page from the portal, here downloadApiData returns
+# the synthetic response, so those rows measure the re-parse and rebuild without the network.
+# Peak memory is the tracemalloc peak of one extra run (python 3 only).
+#
+#   python benchmarks/bench_lists.py                        1k, 10k and 100k, compare with lists_thresholds.json
+#   python benchmarks/bench_lists.py --size 10000 -v        one size, print every run
+#   python benchmarks/bench_lists.py --write-thresholds     store 3x the measured times as new thresholds
+#
+# Exit code 1 when a case is slower than its threshold.
+
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, bench_dir)
+
+import e2stubs  # noqa: E402
+from portal_sim import Catalog, Options  # noqa: E402
+
+EStalker = e2stubs.load()
+
+from EStalker import estalker_globals as glob  # noqa: E402
+from EStalker import live, series, vod  # noqa: E402
+from EStalker.eStaticText import StaticText  # noqa: E402
+from EStalker.virtuallist import VirtualList  # noqa: E402
+
+thresholds_file = os.path.join(bench_dir, "lists_thresholds.json")
+
+sizes = [1000, 10000, 100000]
+
+portal = "http://127.0.0.1/portal.php"
+
+
+def set_active_playlist(catalog):
+    categories = {"js": catalog.genres}
+    glob.active_playlist = {
+        "playlist_info": {"index": 0, "name": "bench", "host": "http://127.0.0.1", "portal": portal, "mac": "00:1A:79:00:00:01"},
+        "data": {"live_categories": categories, "vod_categories": categories, "series_categories": categories},
+        "player_info": {"showlive": True, "showvod": True, "showseries": True, "livehidden": [], "vodhidden": [], "serieshidden": [],
+                        "livefavourites": [], "vodfavourites": [], "seriesfavourites": [], "liverecents": [], "vodwatched": [], "serieswatched": []},
+    }
+    glob.nextlist = [{"next_url": "", "index": 0, "level": 1, "sort": "Sort: A-Z", "filter": ""}]
+
+
+def screen(cls, level, response=None, **attrs):
+    # a screen instance without running its enigma2 __init__. resetButtons / selectionChanged
+    # drive the widgets and page downloads, neither is part of the list pipeline
+    instance = cls.__new__(cls)
+    e2stubs.Screen.__init__(instance, e2stubs.Stub())
+    instance["main_list"] = e2stubs.List()
+    instance["epg_list"] = e2stubs.List()
+    instance["key_yellow"] = StaticText("Sort: A-Z")
+    instance["key_blue"] = StaticText("Search")
+    instance["key_epg"] = StaticText("")
+    instance.__dict__.update(
+        level=level, chosen_category="", current_category="*", portal=portal, sortText="Sort: A-Z", sortby="number", do_sort=False,
+        list1=[], list2=[], list3=[], list4=[], prelist=[], main_list=[], firstlist=True, seriesfirstlist=True, seasonsfirstlist=True,
+        episodesfirstlist=True, pages_downloaded=set(), current_page=1, all_data=[],
+        _px_play=None, _px_play2=None, _px_fav=None, _px_watched=None, _px_more=None,
+        resetButtons=lambda: None, selectionChanged=lambda: None, downloadApiData=lambda url, page=1: response,
+    )
+    instance.virtual_list = VirtualList(instance["main_list"], 14)
+    instance.__dict__.update(attrs)
+    return instance
+
+
+def series_parent():
+    # the level 2 row getSeasons / getEpisodes inherit from
+    return dict(title2="Series", cover2="", rating2="", plot2="", cast2="", director2="", genre2="", tmdb2="", releaseDate2="", backdrop_path2="")
+
+
+def no_build(instance):
+    instance.buildLists = lambda: None
+    return instance
+
+
+class Data(object):
+    """Synthetic portal responses for one catalog size."""
+
+    def __init__(self, size):
+        options = Options(genres=size, channels=size, vod=size, series=size)
+        self.catalog = Catalog(options, "http://127.0.0.1")
+        self.channels = self.catalog.channels
+        self.vod = self.catalog.vod
+        self.series = self.catalog.series
+        self.seasons = self.catalog.seasons("1", Options(seasons=size, episodes=1))
+        self.episodes = self.catalog.seasons("1", Options(seasons=1, episodes=size))
+        self.parent = series_parent()
+        self.parent["storedseasonid"] = self.episodes[0]["id"]
+
+
+# cases are (screen, name, setup, argument): setup(data) returns the callable to time,
+# argument names the Data response it is called with
+
+def live_categories(data):
+    instance = screen(live.EStalker_Live_Categories, 1)
+    no_build(instance).getCategories()
+    del instance.buildLists
+    return instance
+
+
+def live_channels(data):
+    instance = no_build(screen(live.EStalker_Live_Categories, 2, data.channels))
+    instance.getLevel2(data.channels)
+    del instance.buildLists
+    return instance
+
+
+def vod_categories(data):
+    instance = screen(vod.EStalker_Vod_Categories, 1)
+    no_build(instance).getCategories()
+    del instance.buildLists
+    return instance
+
+
+def vod_streams(data):
+    instance = no_build(screen(vod.EStalker_Vod_Categories, 2, data.vod))
+    instance.getVodCategoryStreams(data.vod)
+    del instance.buildLists
+    return instance
+
+
+def series_categories(data):
+    instance = screen(series.EStalker_Series_Categories, 1)
+    no_build(instance).getCategories()
+    del instance.buildLists
+    return instance
+
+
+def series_titles(data):
+    instance = no_build(screen(series.EStalker_Series_Categories, 2, data.series))
+    instance.getSeries(data.series)
+    del instance.buildLists
+    return instance
+
+
+def series_seasons(data):
+    instance = no_build(screen(series.EStalker_Series_Categories, 3, data.seasons, **data.parent))
+    instance.getSeasons(data.seasons)
+    del instance.buildLists
+    return instance
+
+
+def series_episodes(data):
+    instance = no_build(screen(series.EStalker_Series_Categories, 4, data.episodes, **data.parent))
+    instance.getEpisodes(data.episodes)
+    del instance.buildLists
+    return instance
+
+
+cases = [
+    ("live", "getLevel2", lambda d: no_build(screen(live.EStalker_Live_Categories, 2)).getLevel2, "channels"),
+    ("live", "buildList2", lambda d: live_channels(d).buildList2, None),
+    ("live", "sort categories", lambda d: live_categories(d).sort, None),
+    ("live", "applyPreviousSort categories", lambda d: live_categories(d).applyPreviousSort, None),
+    ("live", "sort channels", lambda d: live_channels(d).sort, None),
+    ("live", "applyPreviousSort channels", lambda d: live_channels(d).applyPreviousSort, None),
+
+    ("vod", "getVodCategoryStreams", lambda d: no_build(screen(vod.EStalker_Vod_Categories, 2)).getVodCategoryStreams, "vod"),
+    ("vod", "buildVod", lambda d: vod_streams(d).buildVod, None),
+    ("vod", "sort categories", lambda d: vod_categories(d).sort, None),
+    ("vod", "applyPreviousSort categories", lambda d: vod_categories(d).applyPreviousSort, None),
+    ("vod", "sort streams", lambda d: vod_streams(d).sort, None),
+    ("vod", "applyPreviousSort streams", lambda d: vod_streams(d).applyPreviousSort, None),
+
+    ("series", "getSeries", lambda d: no_build(screen(series.EStalker_Series_Categories, 2)).getSeries, "series"),
+    ("series", "buildSeries", lambda d: series_titles(d).buildSeries, None),
+    ("series", "getSeasons", lambda d: no_build(screen(series.EStalker_Series_Categories, 3, **d.parent)).getSeasons, "seasons"),
+    ("series", "buildSeasons", lambda d: series_seasons(d).buildSeasons, None),
+    ("series", "getEpisodes", lambda d: no_build(screen(series.EStalker_Series_Categories, 4, **d.parent)).getEpisodes, "episodes"),
+    ("series", "buildEpisodes", lambda d: series_episodes(d).buildEpisodes, None),
+    ("series", "sort categories", lambda d: series_categories(d).sort, None),
+    ("series", "applyPreviousSort categories", lambda d: series_categories(d).applyPreviousSort, None),
+    ("series", "sort titles", lambda d: series_titles(d).sort, None),
+    ("series", "applyPreviousSort titles", lambda d: series_titles(d).applyPreviousSort, None),
+]
+
+
+def prepare(data, setup, argument):
+    func = setup(data)
+    if argument:
+        response = getattr(data, argument)
+        return lambda: func(response)
+    return func
+
+
+def run_once(data, setup, argument):
+    set_active_playlist(data.catalog)
+    func = prepare(data, setup, argument)
+    gc.collect()
+    start = time.time()
+    func()
+    return time.time() - start
+
+
+def peak_memory(data, setup, argument):
+    if tracemalloc is None:
+        return None
+    set_active_playlist(data.catalog)
+    func = prepare(data, setup, argument)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def load_thresholds():
+    try:
+        with open(thresholds_file, "r") as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EStalker list builder and sort benchmark")
+    parser.add_argument("--size", type=int, action="append", help="catalog size(s), default {}".format(" ".join(str(s) for s in sizes)))
+    parser.add_argument("--module", action="append", choices=["live", "vod", "series"], help="screen(s) to run, default all")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the median is reported")
+    parser.add_argument("--write-thresholds", action="store_true", help="store 3x the measured medians in lists_thresholds.json")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    thresholds = load_thresholds()
+    measured = {}
+    failures = []
+
+    print("{:<7} {:<7} {:<30} {:>10} {:>10} {:>10}  {}".format("size", "screen", "case", "median ms", "limit ms", "peak MB", "result"))
+
+    for size in args.size or sizes:
+        data = Data(size)
+
+        for module, name, setup, argument in cases:
+            if args.module and module not in args.module:
+                continue
+
+            times = []
+            for run in range(args.repeat):
+                elapsed = run_once(data, setup, argument)
+                times.append(elapsed)
+                if args.verbose:
+                    print("    {} {} {} run {}: {:.1f} ms".format(size, module, name, run + 1, elapsed * 1000))
+
+            times.sort()
+            median = times[len(times) // 2] * 1000
+            peak = peak_memory(data, setup, argument)
+
+            key = "{} {}".format(module, name)
+            limit = thresholds.get(str(size), {}).get(key)
+            result = "ok"
+            if limit is not None and median > limit:
+                result = "REGRESSION"
+                failures.append((size, key, result))
+
+            measured.setdefault(str(size), {})[key] = median
+            print("{:<7} {:<7} {:<30} {:>10.1f} {:>10} {:>10}  {}".format(
+                size, module, name, median, "-" if limit is None else "{:.1f}".format(limit),
+                "-" if peak is None else "{:.1f}".format(peak / 1048576.0), result))
+
+        del data
+        gc.collect()
+
+    if args.write_thresholds:
+        for size, values in measured.items():
+            thresholds.setdefault(size, {}).update(dict((key, round(value * 3 + 5, 1)) for key, value in values.items()))
+        with open(thresholds_file, "w") as f:
+            json.dump(thresholds, f, indent=4, sort_keys=True)
+        print("thresholds written to", thresholds_file)
+
+    if failures:
+        print("")
+        for failure in failures:
+            print("FAIL {} {}: {}".format(*failure))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
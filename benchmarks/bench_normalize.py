@@ -0,0 +1,89 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Benchmark for normalize.stripjunk over a synthetic 20k title catalog.
+# Runs on a desktop python, no enigma2 needed:
+#   python benchmarks/bench_normalize.py [count]
+
+from __future__ import print_function
+
+import os
+import random
+import sys
+import time
+
+plugin_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "EStalker", "usr", "lib", "enigma2", "python", "Plugins", "Extensions", "EStalker")
+
+try:
+    import importlib.util
+
+    spec = importlib.util.spec_from_file_location("normalize", os.path.join(plugin_dir, "normalize.py"))
+    normalize = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(normalize)
+except (ImportError, AttributeError):
+    import imp
+    normalize = imp.load_source("normalize", os.path.join(plugin_dir, "normalize.py"))
+
+
+words = [
+    "the", "last", "night", "city", "dark", "love", "war", "king", "house", "blue", "star", "road", "lost",
+    "man", "woman", "dream", "fire", "ice", "shadow", "river", "secret", "storm", "heart", "game", "island",
+    "amélie", "señor", "über", "niño", "café", "château", "crème", "björn", "łódź", "žena"
+]
+
+prefixes = ["", "", "", "EN: ", "DE: ", "NL - ", "BE-NL - ", "|UK| ", "||MULTI|| ", u"┃FR┃ ", "EN|FR ", "4K-EN - "]
+suffixes = ["", "", "", " (2019)", " [HD]", " 1080p", " 4K", " FHD", " - 2021", " (Director's Cut)", " HEVC", " multi-sub", ", The"]
+qualities = ["", "", " x264", " 720p", " hdrip", " dolby audio"]
+
+
+def make_corpus(count, seed=1):
+    rnd = random.Random(seed)
+    corpus = []
+
+    for i in range(count):
+        title = " ".join(rnd.choice(words) for _ in range(rnd.randint(1, 5))).title()
+        title = rnd.choice(prefixes) + title + rnd.choice(qualities) + rnd.choice(suffixes)
+        corpus.append(title)
+
+    return corpus
+
+
+def timed(label, func, count):
+    start = time.time()
+    func()
+    elapsed = time.time() - start
+    print("{:<32} {:8.1f} ms  {:6.2f} us/title".format(label, elapsed * 1000, (elapsed / count) * 1000000))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    corpus = make_corpus(count)
+    unique = len(set(corpus))
+
+    print("titles: {}  unique: {}  memo size: {}".format(count, unique, normalize.memo_max))
+
+    timed("uncached (_stripjunk)", lambda: [normalize._stripjunk(t) for t in corpus], count)
+
+    normalize.clear_memo()
+    timed("stripjunk, cold memo", lambda: [normalize.stripjunk(t) for t in corpus], count)
+    timed("stripjunk, warm memo", lambda: [normalize.stripjunk(t) for t in corpus], count)
+
+    working_set = corpus[:2000]
+    normalize.clear_memo()
+    [normalize.stripjunk(t) for t in working_set]
+    timed("stripjunk, 2k working set", lambda: [normalize.stripjunk(t) for t in working_set], len(working_set))
+
+    page = corpus[:14]
+    normalize.clear_memo()
+    timed("stripjunk_batch, 14 title page", lambda: normalize.stripjunk_batch(page), len(page))
+
+    normalize.clear_memo()
+    timed("stripjunk_batch, full catalog", lambda: normalize.stripjunk_batch(corpus), count)
+
+    print("")
+    for title in corpus[:10]:
+        print(u"{!r:<60} -> {!r}".format(title, normalize.stripjunk(title)))
+
+
+if __name__ == "__main__":
+    main()
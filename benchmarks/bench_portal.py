@@ -0,0 +1,325 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# End to end network benchmark against the local portal simulator (portal_sim.py).
+# Drives the real plugin code headless (see e2stubs.py):
+#   auth       utils.perform_handshake + utils.get_profile_data
+#   playlists  EStalker_Playlists.process_downloads -> download_url, one playlist per mac
+#   menu       EStalker_Menu.process_downloads (live / vod / series categories)
+#   paging     EStalker_Live_Categories.downloadApiData over the pages of one genre
+#   link       create_link through utils.make_request
+#   catalog    the same genre with the Xtream player_api catalog backend (xtream.py), one download
+#   direct     EStalker_Live_Categories.createLink with locally built Xtream links (xtream.direct_link)
+# each under several simulator profiles (clean, slow, lossy, storm).
+#
+#   python benchmarks/bench_portal.py                       run all, compare with portal_thresholds.json
+#   python benchmarks/bench_portal.py --profile clean -v    one profile, print every run
+#   python benchmarks/bench_portal.py --write-thresholds    store 3x the measured times as new thresholds
+#
+# Exit code 1 when a scenario is slower than its threshold or too few of its operations succeed.
+
+from __future__ import print_function
+
+import argparse
+import json
+import os
+import sys
+import time
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, bench_dir)
+
+import e2stubs  # noqa: E402
+from portal_sim import PortalSimulator, page_size  # noqa: E402
+
+EStalker = e2stubs.load()
+
+from EStalker import estalker_globals as glob  # noqa: E402
+from EStalker import breaker, live, menu, playlists, ratelimit, utils, xtream  # noqa: E402
+from EStalker.plugin import cfg  # noqa: E402
+
+thresholds_file = os.path.join(bench_dir, "portal_thresholds.json")
+
+profiles = {
+    "clean": dict(latency=5),
+    "slow": dict(latency=120, jitter=60),
+    "lossy": dict(latency=20, error_rate=0.1),
+    "storm": dict(latency=20, storm_every=2, storm_length=0.5),
+}
+
+# share of operations that must succeed per profile. make_request does not retry,
+# so with injected errors some operations are expected to fail. A short scenario can
+# land entirely inside a 503 storm, so storm is checked over all its scenarios together
+# (min_profile_success). Every scenario has to reach the portal, a run that sends no
+# requests (open circuit breaker) fails.
+min_success = {"clean": 1.0, "slow": 1.0, "lossy": 0.5, "storm": 0.0}
+min_profile_success = {"storm": 0.6}
+
+# small catalog, the network paths are what is measured here
+catalog = dict(genres=20, channels=700, vod=1000, series=200, xtream=True)
+
+macs = ["00:1A:79:00:00:{:02X}".format(i) for i in range(1, 9)]
+
+
+def headers_for(sim, mac):
+    return {
+        "User-Agent": "Mozilla/5.0 (QtEmbedded; U; Linux; C) AppleWebKit/533.3 (KHTML, like Gecko) MAG200 stbapp ver: 2 rev: 250 Safari/533.3",
+        "X-User-Agent": "Model: MAG250; Link: WiFi",
+        "Referer": sim.host + "/c/index.html",
+        "Cookie": "mac={}; stb_lang=en; timezone=Europe%2FLondon".format(mac),
+    }
+
+
+def login(sim, mac=macs[0]):
+    portal, token, token_random, headers = utils.perform_handshake(sim.portal, sim.host, mac, headers_for(sim, mac))
+    if token:
+        utils.get_profile_data(portal, mac, token, token_random, headers, "full")
+    return portal, token, token_random, headers
+
+
+def set_active_playlist(sim, token, token_random):
+    glob.active_playlist = {
+        "playlist_info": {
+            "index": 0, "name": "bench", "host": sim.host, "domain": sim.host.split("//")[1], "port": "",
+            "mac": macs[0], "portal": sim.portal, "version": "5.3.1", "path_prefix": "/c/",
+            "token": token or "", "token_random": token_random or "", "play_token": "", "status": 0, "blocked": "0",
+        },
+        "data": {},
+        "player_info": {"showlive": True, "showvod": True, "showseries": True, "livehidden": [], "vodhidden": [], "serieshidden": [],
+                        "livefavourites": [], "vodfavourites": [], "seriesfavourites": [], "liverecents": [], "vodwatched": [], "serieswatched": []},
+    }
+
+
+def screen(cls, **attrs):
+    # a screen instance without running its enigma2 __init__
+    instance = cls.__new__(cls)
+    e2stubs.Screen.__init__(instance, e2stubs.Stub())
+    instance.__dict__.update(attrs)
+    return instance
+
+
+# scenarios return (operations, succeeded)
+
+def run_auth(sim):
+    ok = 0
+    for mac in macs:
+        portal, token, token_random, headers = login(sim, mac)
+        ok += bool(token)
+    return len(macs), ok
+
+
+def run_playlists(sim):
+    playlists_all = []
+    for index, mac in enumerate(macs):
+        playlists_all.append({"playlist_info": {"index": index, "host": sim.host, "domain": sim.host.split("//")[1], "port": "", "mac": mac,
+                                                "portal": "", "version": "", "path_prefix": "/c/", "url": sim.host + "/c/"}})
+    captured = []
+    instance = screen(playlists.EStalker_Playlists, playlists_all=playlists_all, timezone="Europe/London")
+    instance.url_list = [(i, mac, sim.host, sim.host.split("//")[1], "Europe/London") for i, mac in enumerate(macs)]
+    instance.update_results = captured.extend
+    instance.process_downloads()
+
+    valid = sum(1 for result in captured if result and result[1].get("valid"))
+    return len(macs), valid
+
+
+def run_menu(sim):
+    portal, token, token_random, headers = login(sim)
+    set_active_playlist(sim, token, token_random)
+
+    instance = screen(menu.EStalker_Menu)
+    instance.portal = sim.portal
+    instance.host = sim.host
+    instance.mac = macs[0]
+    instance.headers = headers
+    instance.createSetup = lambda: None
+    instance.url_list = [
+        [sim.portal + "?type=itv&action=get_genres&sortby=number&JsHttpRequest=1-xml", 0],
+        [sim.portal + "?type=vod&action=get_categories&sortby=number&JsHttpRequest=1-xml", 1],
+        [sim.portal + "?type=series&action=get_categories&sortby=number&JsHttpRequest=1-xml", 2],
+    ]
+    instance.process_downloads()
+
+    data = glob.active_playlist["data"]
+    return 3, sum(1 for key in ("live_categories", "vod_categories", "series_categories") if data.get(key))
+
+
+def run_paging(sim, pages=10):
+    portal, token, token_random, headers = login(sim)
+    set_active_playlist(sim, token, token_random)
+
+    instance = screen(live.EStalker_Live_Categories, portal=sim.portal, host=sim.host, mac=macs[0], headers=headers,
+                      pages_downloaded=set(), retry=False, all_data=[], total_items=0)
+    url = "{}?type=itv&action=get_ordered_list&genre=*&sortby=number&p=1&JsHttpRequest=1-xml".format(sim.portal)
+
+    for page in range(1, pages + 1):
+        instance.current_page = page
+        instance.retry = False
+        instance.downloadApiData(url, page)
+
+    filled = [bool(item) for item in list(instance.all_data)[:pages * page_size]]
+    return pages, sum(1 for i in range(0, len(filled), page_size) if all(filled[i:i + page_size]))
+
+
+def run_catalog(sim):
+    portal, token, token_random, headers = login(sim)
+    set_active_playlist(sim, token, token_random)
+    xtream.credentials_cache.clear()
+    xtream.unsupported.clear()
+
+    instance = screen(live.EStalker_Live_Categories, portal=sim.portal, host=sim.host, mac=macs[0], headers=headers,
+                      pages_downloaded=set(), retry=False, all_data=[], total_items=0, current_page=1)
+    url = "{}?type=itv&action=get_ordered_list&genre=*&sortby=number&p=1&JsHttpRequest=1-xml".format(sim.portal)
+
+    cfg.xtreamcatalog.value = True
+    try:
+        instance.downloadApiData(url)
+    finally:
+        cfg.xtreamcatalog.value = False
+
+    loaded = sum(1 for item in instance.all_data if item)
+    return 1, int(loaded == len(sim.catalog.channels))
+
+
+def run_link(sim, count=20):
+    portal, token, token_random, headers = login(sim)
+    ok = 0
+    for i in range(count):
+        url = "{}?type=itv&action=create_link&cmd=ffmpeg%20http://localhost/ch/{}_&series=&forced_storage=0&disable_ad=0&download=0&force_ch_link_check=0&JsHttpRequest=1-xml".format(portal, i)
+        response = utils.make_request(url, method="GET", headers=headers, params=None, response_type="json")
+        ok += bool(response and response.get("js", {}).get("cmd"))
+    return count, ok
+
+
+def run_direct(sim, count=20):
+    portal, token, token_random, headers = login(sim)
+    set_active_playlist(sim, token, token_random)
+    xtream.link_templates.clear()
+    xtream.rejected.clear()
+
+    instance = screen(live.EStalker_Live_Categories, portal=portal, host=sim.host, mac=macs[0], headers=headers, retry=False)
+
+    cfg.xtreamlinks.value = True
+    ok = 0
+    try:
+        for i in range(1, count + 1):
+            url = "{}?type=itv&action=create_link&cmd=ffmpeg http://localhost/ch/{}_&series=0&forced_storage=0&disable_ad=0&download=0&force_ch_link_check=0&JsHttpRequest=1-xml".format(portal, i)
+            response = instance.createLink(url)
+            ok += str((response or {}).get("js", {}).get("cmd", "")).endswith("/{}.ts".format(i))
+    finally:
+        cfg.xtreamlinks.value = False
+    return count, ok
+
+
+scenarios = [
+    ("auth", run_auth),
+    ("playlists", run_playlists),
+    ("menu", run_menu),
+    ("paging", run_paging),
+    ("link", run_link),
+    ("catalog", run_catalog),
+    ("direct", run_direct),
+]
+
+
+def reset_state():
+    # every run starts with closed circuits and full buckets, a failing run must not skew the next one
+    with breaker.breakers_lock:
+        breaker.breakers.clear()
+    with ratelimit.buckets_lock:
+        ratelimit.buckets.clear()
+
+
+def load_thresholds():
+    try:
+        with open(thresholds_file, "r") as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EStalker portal end to end benchmark")
+    parser.add_argument("--profile", action="append", choices=sorted(profiles), help="profile(s) to run, default all")
+    parser.add_argument("--scenario", action="append", choices=[name for name, _ in scenarios], help="scenario(s) to run, default all")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario, the median is reported")
+    parser.add_argument("--write-thresholds", action="store_true", help="store 3x the measured medians in portal_thresholds.json")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    thresholds = load_thresholds()
+    measured = {}
+    failures = []
+
+    print("{:<8} {:<10} {:>10} {:>10} {:>10} {:>9} {:>8}  {}".format("profile", "scenario", "median s", "per op ms", "limit s", "requests", "success", "result"))
+
+    for profile in args.profile or sorted(profiles):
+        sim = PortalSimulator(**dict(catalog, **profiles[profile])).start()
+        profile_total = profile_succeeded = 0
+
+        try:
+            for name, func in scenarios:
+                if args.scenario and name not in args.scenario:
+                    continue
+
+                times = []
+                total = succeeded = 0
+                sim.reset_counts()
+                for run in range(args.repeat):
+                    reset_state()
+                    start = time.time()
+                    ops, run_ok = func(sim)
+                    elapsed = time.time() - start
+                    times.append(elapsed)
+                    total += ops
+                    succeeded += run_ok
+                    if args.verbose:
+                        print("    {} {} run {}: {:.3f}s {}/{} ok".format(profile, name, run + 1, elapsed, run_ok, ops))
+
+                times.sort()
+                median = times[len(times) // 2]
+                limit = thresholds.get(profile, {}).get(name)
+                requests = sim.requests() // args.repeat
+
+                profile_total += total
+                profile_succeeded += succeeded
+
+                success = succeeded / float(total)
+                result = "ok"
+                if requests == 0:
+                    result = "NO REQUESTS"
+                    failures.append((profile, name, result))
+                elif success < min_success[profile]:
+                    result = "LOW SUCCESS"
+                    failures.append((profile, name, result))
+                elif limit is not None and median > limit:
+                    result = "REGRESSION"
+                    failures.append((profile, name, result))
+
+                measured.setdefault(profile, {})[name] = median
+                print("{:<8} {:<10} {:>10.3f} {:>10.1f} {:>10} {:>9} {:>7.0f}%  {}".format(
+                    profile, name, median, median / ops * 1000, "-" if limit is None else "{:.3f}".format(limit), requests, success * 100, result))
+
+            if profile_total and profile in min_profile_success:
+                success = profile_succeeded / float(profile_total)
+                if success < min_profile_success[profile]:
+                    failures.append((profile, "all", "LOW SUCCESS {:.0f}%".format(success * 100)))
+        finally:
+            sim.stop()
+
+    if args.write_thresholds:
+        for profile, values in measured.items():
+            thresholds.setdefault(profile, {}).update(dict((name, round(value * 3 + 0.05, 3)) for name, value in values.items()))
+        with open(thresholds_file, "w") as f:
+            json.dump(thresholds, f, indent=4, sort_keys=True)
+        print("thresholds written to", thresholds_file)
+
+    if failures:
+        print("")
+        for failure in failures:
+            print("FAIL {} {}: {}".format(*failure))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
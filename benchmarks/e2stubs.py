@@ -0,0 +1,350 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Headless loader for the benchmarks.
+# Registers stand-ins for the enigma2 modules (enigma, Components, Screens, Tools, Plugins, skin)
+# and a minimal EStalker.plugin, so utils.py, menu.py, playlists.py, live.py ... can be imported
+# and their network / list code timed on a desktop python. Nothing here is used on a box.
+#
+#   import e2stubs
+#   EStalker = e2stubs.load()
+#   from EStalker import utils
+
+from __future__ import print_function
+
+import os
+import sys
+import tempfile
+import types
+
+plugin_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "EStalker", "usr", "lib", "enigma2", "python", "Plugins", "Extensions", "EStalker")
+plugin_dir = os.path.normpath(plugin_dir)
+
+stub_roots = ("enigma", "Components", "Screens", "Tools", "Plugins", "skin", "ServiceReference", "Navigation", "RecordTimer")
+
+_loaded = None
+
+
+class _StubMeta(type):
+    # class level lookups too, e.g. MessageBox.TYPE_WARNING
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Stub()
+
+
+class _StubBase(object):
+    """Accepts any call, attribute, item or subclassing. Falsy, so optional features stay off."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __call__(self, *args, **kwargs):
+        return Stub()
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Stub()
+
+    def __getitem__(self, key):
+        return Stub()
+
+    def __setitem__(self, key, value):
+        pass
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __bool__(self):
+        return False
+
+    __nonzero__ = __bool__
+
+
+Stub = _StubMeta("Stub", (_StubBase,), {})
+
+
+class eTimer(object):
+    def __init__(self):
+        self.callback = []
+        self.running = False
+
+    def start(self, msec, singleshot=False):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def isActive(self):
+        return self.running
+
+    @property
+    def timeout(self):
+        return Stub()
+
+
+class _Size(object):
+    def __init__(self, width, height):
+        self._width = width
+        self._height = height
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+
+class _Desktop(object):
+    def size(self):
+        return _Size(1920, 1080)
+
+
+def getDesktop(screen):
+    return _Desktop()
+
+
+class Screen(dict):
+    # enigma2's Screen is a dict of widgets
+    def __init__(self, session=None, parent=None):
+        dict.__init__(self)
+        self.session = session
+        self.onFirstExecBegin = []
+        self.onLayoutFinish = []
+        self.onShow = []
+        self.onHide = []
+        self.onClose = []
+
+    def __getitem__(self, key):
+        if key not in self:
+            dict.__setitem__(self, key, Stub())
+        return dict.__getitem__(self, key)
+
+    def setTitle(self, title):
+        pass
+
+    def close(self, *args):
+        pass
+
+
+class List(object):
+    def __init__(self, list=None, enableWrapAround=False):
+        self.list = list or []
+        self.index = 0
+        self.onSelectionChanged = []
+
+    def setList(self, list):
+        self.list = list
+
+    def updateList(self, list):
+        self.list = list
+
+    def getCurrent(self):
+        return self.list[self.index] if self.list else None
+
+    def getIndex(self):
+        return self.index
+
+    def setIndex(self, index):
+        self.index = index
+        for callback in self.onSelectionChanged:
+            callback()
+
+    def count(self):
+        return len(self.list)
+
+
+class ConfigElement(object):
+    def __init__(self, default=None, *args, **kwargs):
+        self.value = kwargs.get("default", default)
+        self.default = self.value
+        self.choices = kwargs.get("choices", [])
+
+    def save(self):
+        pass
+
+    def addNotifier(self, *args, **kwargs):
+        pass
+
+
+class ConfigSelectionNumber(ConfigElement):
+    def __init__(self, min=0, max=0, stepwidth=1, default=None, wraparound=False):
+        ConfigElement.__init__(self, default if default is not None else min)
+
+
+class ConfigSubsection(object):
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        value = ConfigSubsection()
+        setattr(self, name, value)
+        return value
+
+
+class PluginConfig(object):
+    """cfg for the headless plugin. Known values are set in load(), anything else reads as False."""
+
+    def __init__(self, values):
+        for key, value in values.items():
+            setattr(self, key, ConfigElement(value))
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        element = ConfigElement(False)
+        setattr(self, name, element)
+        return element
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__path__ = []
+    module.__dict__.update(attrs)
+    module.__getattr__ = lambda attr: Stub if attr[:1].isupper() or attr[:1] == "e" else Stub()
+    return module
+
+
+def _specific():
+    return {
+        "enigma": dict(eTimer=eTimer, getDesktop=getDesktop, addFont=lambda *a: None, iServiceInformation=Stub(), iPlayableService=Stub()),
+        "Components.config": dict(
+            config=ConfigSubsection(), ConfigSubsection=ConfigSubsection, ConfigSelectionNumber=ConfigSelectionNumber,
+            ConfigSelection=ConfigElement, ConfigDirectory=ConfigElement, ConfigYesNo=ConfigElement, ConfigPIN=ConfigElement,
+            ConfigInteger=ConfigElement, ConfigText=ConfigElement, ConfigClock=ConfigElement, ConfigNumber=ConfigElement,
+            configfile=Stub(), getConfigListEntry=lambda *a: a, NoSave=lambda x: x,
+        ),
+        "Components.Sources.List": dict(List=List),
+        "Screens.Screen": dict(Screen=Screen),
+        "Tools.BoundFunction": dict(boundFunction=lambda f, *a, **k: (lambda *b, **c: f(*(a + b), **dict(k, **c)))),
+        "Tools.Directories": dict(resolveFilename=lambda *a: "", SCOPE_PLUGINS=0, fileExists=os.path.exists),
+    }
+
+
+class _StubFinder(object):
+    """Meta path hook returning stand-in modules for the enigma2 packages."""
+
+    def __init__(self):
+        self.specific = _specific()
+
+    def _wanted(self, fullname):
+        return fullname.split(".")[0] in stub_roots
+
+    def _make(self, fullname):
+        module = _module(fullname, **self.specific.get(fullname, {}))
+        module.__loader__ = self
+        return module
+
+    # python 3
+    def find_spec(self, fullname, path=None, target=None):
+        if not self._wanted(fullname):
+            return None
+        import importlib.machinery
+        return importlib.machinery.ModuleSpec(fullname, self, is_package=True)
+
+    def create_module(self, spec):
+        return self._make(spec.name)
+
+    def exec_module(self, module):
+        pass
+
+    # python 2
+    def find_module(self, fullname, path=None):
+        return self if self._wanted(fullname) else None
+
+    def load_module(self, fullname):
+        if fullname not in sys.modules:
+            sys.modules[fullname] = self._make(fullname)
+        return sys.modules[fullname]
+
+
+def _optional(name, **attrs):
+    # third party modules the box has but a desktop python may not (PIL, old twisted helpers)
+    try:
+        __import__(name)
+        module = sys.modules[name]
+    except ImportError:
+        module = sys.modules[name] = _module(name)
+    for attr, value in attrs.items():
+        if not hasattr(module, attr):
+            setattr(module, attr, value)
+    return module
+
+
+def load(etc_dir=None, **cfg_values):
+    """Install the stubs and return the EStalker package (not its __init__, which needs gettext paths)."""
+    global _loaded
+    if _loaded is not None:
+        return _loaded
+
+    sys.meta_path.insert(0, _StubFinder())
+
+    _optional("PIL")
+    _optional("PIL.Image")
+    sys.modules["PIL"].Image = sys.modules["PIL.Image"]
+    try:
+        _optional("twisted.web.client", downloadPage=Stub())
+    except Exception:
+        pass
+
+    etc_dir = etc_dir or tempfile.mkdtemp(prefix="estalker_bench_")
+    if not etc_dir.endswith("/"):
+        etc_dir += "/"
+
+    values = {
+        "playlists_json": os.path.join(etc_dir, "playlists.json"),
+        "playlist_file": os.path.join(etc_dir, "playlists.txt"),
+        "location": etc_dir,
+        "timeout": 20,
+        "livetype": "4097",
+        "vodtype": "4097",
+        "skin": "default",
+        "TMDBLanguage2": "",
+        "prefetchlinks": True,
+        "resumemax": 1000,
+        "resumecheckpoint": 60,
+        "channelpicons": False,
+        "channelcovers": False,
+        "infobarpicons": False,
+        "infobarcovers": False,
+    }
+    values.update(cfg_values)
+
+    package = types.ModuleType("EStalker")
+    package.__path__ = [plugin_dir]
+    package._ = lambda text: text
+    sys.modules["EStalker"] = package
+
+    import multiprocessing.pool  # noqa: F401
+
+    plugin = types.ModuleType("EStalker.plugin")
+    plugin.__dict__.update(
+        cfg=PluginConfig(values),
+        pythonVer=sys.version_info.major,
+        pythonFull=float("{}.{}".format(sys.version_info.major, sys.version_info.minor)),
+        debugs=False,
+        isDreambox=False,
+        isVTI=False,
+        hasConcurrent=True,
+        hasMultiprocessing=True,
+        version="bench",
+        screenwidth=_Size(1920, 1080),
+        dir_etc=etc_dir,
+        dir_tmp=os.path.join(etc_dir, "tmp/"),
+        dir_plugins=plugin_dir + "/",
+        skin_directory=os.path.join(plugin_dir, "skin", "fhd") + "/",
+        common_path=os.path.join(plugin_dir, "skin", "common") + "/",
+        playlist_file=values["playlist_file"],
+        playlists_json=values["playlists_json"],
+    )
+    sys.modules["EStalker.plugin"] = plugin
+    package.plugin = plugin
+
+    if not os.path.isdir(plugin.dir_tmp):
+        os.makedirs(plugin.dir_tmp)
+
+    _loaded = package
+    return package
@@ -0,0 +1,413 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Local Stalker / MAG portal stand-in for testing EStalker's network code without a live portal.
+# Standard library only. Serves the c/ index, xpcom.common.js, version.js and portal.php with:
+#   handshake, get_profile, account_info, get_genres, get_categories, get_ordered_list (paged),
+#   get_all_channels, get_short_epg, create_link and watchdog.
+# With --xtream the portal fronts an Xtream panel: create_link answers /live/ and /movie/ urls carrying
+# the credentials, and player_api.php serves user_info, get_live_streams, get_vod_streams and get_series.
+# Latency, jitter, random errors, 503 storms, token expiry and catalog sizes are configurable.
+#
+#   python benchmarks/portal_sim.py --port 8085 --latency 50 --error-rate 0.05
+#   portal url in EStalker: http://127.0.0.1:8085/c/   any mac
+
+from __future__ import print_function
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+
+from collections import defaultdict
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlparse, parse_qsl
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlparse, parse_qsl
+
+
+page_size = 14
+
+xtream_username = "benchuser"
+xtream_password = "benchpass"
+
+words = [
+    "last", "night", "city", "dark", "love", "war", "king", "house", "blue", "star", "road", "lost", "man",
+    "woman", "dream", "fire", "ice", "shadow", "river", "secret", "storm", "heart", "game", "island"
+]
+
+
+class Options(object):
+    def __init__(self, **kwargs):
+        self.latency = 0            # ms added to every request
+        self.jitter = 0             # ms, random 0..jitter on top of latency
+        self.error_rate = 0.0       # fraction of portal.php requests answered with 500
+        self.storm_every = 0.0      # seconds between 503 storms, 0 = off
+        self.storm_length = 0.0     # seconds each storm lasts
+        self.token_ttl = 0          # seconds before a token stops working, 0 = never
+        self.genres = 40
+        self.channels = 2000
+        self.vod = 5000
+        self.series = 1000
+        self.seasons = 4
+        self.episodes = 10
+        self.seed = 1
+        self.xtream = False         # front an Xtream panel, see player_api
+        self.__dict__.update(kwargs)
+
+
+class Catalog(object):
+    """Deterministic synthetic catalog, built once per simulator."""
+
+    def __init__(self, options, host):
+        rnd = random.Random(options.seed)
+        self.host = host
+
+        def title():
+            return " ".join(rnd.choice(words) for _ in range(rnd.randint(1, 4))).title()
+
+        self.genres = [{"id": str(i), "title": "Genre {}".format(i), "alias": "genre{}".format(i), "censored": 0} for i in range(1, options.genres + 1)]
+
+        self.channels = []
+        for i in range(1, options.channels + 1):
+            self.channels.append({
+                "id": str(i),
+                "name": "{} {}".format(title(), i),
+                "number": str(i),
+                "cmd": "ffmpeg http://localhost/ch/{}_".format(i),
+                "logo": "",
+                "tv_genre_id": str(rnd.randint(1, max(1, options.genres))),
+                "xmltv_id": "ch{}".format(i),
+                "censored": "0",
+                "use_http_tmp_link": "1",
+            })
+
+        self.vod = [self._movie(i, title(), rnd, options) for i in range(1, options.vod + 1)]
+        self.series = [self._movie(i, title(), rnd, options, is_series=True) for i in range(1, options.series + 1)]
+        self.series_by_id = dict((item["id"], item) for item in self.series)
+
+        self.by_genre = defaultdict(list)
+        for channel in self.channels:
+            self.by_genre[channel["tv_genre_id"]].append(channel)
+
+        self.by_category = {"vod": defaultdict(list), "series": defaultdict(list)}
+        for kind in ("vod", "series"):
+            for item in getattr(self, kind):
+                self.by_category[kind][item["category_id"]].append(item)
+
+    def _movie(self, i, name, rnd, options, is_series=False):
+        year = rnd.randint(1970, 2025)
+        return {
+            "id": str(i),
+            "name": "{} ({})".format(name, year),
+            "o_name": name,
+            "year": str(year),
+            "category_id": str(rnd.randint(1, max(1, options.genres))),
+            "genres_str": "Drama, Action",
+            "description": "Synthetic {} {}".format("series" if is_series else "movie", i),
+            "director": "Director {}".format(i % 97),
+            "actors": "Actor {}, Actor {}".format(i % 89, i % 83),
+            "rating_imdb": "{:.1f}".format(rnd.uniform(4, 9)),
+            "time": str(rnd.randint(80, 160)),
+            "added": "2024-01-01 00:00:00",
+            "screenshot_uri": "",
+            "cmd": "/media/file_{}.mp4".format(i) if not is_series else "",
+            "is_series": 1 if is_series else 0,
+        }
+
+    def seasons(self, movie_id, options):
+        seasons = []
+        for n in range(1, options.seasons + 1):
+            seasons.append({
+                "id": "{}:{}".format(movie_id, n),
+                "name": "Season {}".format(n),
+                "is_season": True,
+                "series": list(range(1, options.episodes + 1)),
+                "cmd": "/media/file_{}_{}.mp4".format(movie_id, n),
+            })
+        return seasons
+
+    def epg(self, ch_id, limit):
+        now = int(time.time()) // 1800 * 1800
+        programmes = []
+        for n in range(limit):
+            start = now + n * 1800
+            programmes.append({
+                "id": "{}{}".format(ch_id, n),
+                "ch_id": str(ch_id),
+                "name": "Programme {}".format(n),
+                "descr": "Synthetic programme",
+                "time": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start)),
+                "time_to": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(start + 1800)),
+                "start_timestamp": start,
+                "stop_timestamp": start + 1800,
+                "t_time": time.strftime("%H:%M", time.localtime(start)),
+                "t_time_to": time.strftime("%H:%M", time.localtime(start + 1800)),
+            })
+        return programmes
+
+
+def paged(items, page):
+    page = max(1, page)
+    start = (page - 1) * page_size
+    return {"js": {"total_items": len(items), "max_page_items": page_size, "selected_item": 0, "cur_page": page, "data": items[start:start + page_size]}}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        sim = self.server.simulator
+        parsed = urlparse(self.path)
+        query = dict(parse_qsl(parsed.query))
+        action = "{}/{}".format(query.get("type", ""), query.get("action", "")) if query else parsed.path
+
+        sim.delay()
+
+        status, body, content_type = sim.route(parsed.path, query, self.headers)
+        sim.count(action, status)
+
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+        if not isinstance(body, bytes):
+            body = body.encode("utf-8")
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class PortalSimulator(object):
+    def __init__(self, host="127.0.0.1", port=0, **options):
+        self.options = Options(**options)
+        self.server = ThreadingServer((host, port), Handler)
+        self.server.simulator = self
+        self.host = "http://{}:{}".format(host, self.server.server_address[1])
+        self.catalog = Catalog(self.options, self.host)
+        self.random = random.Random(self.options.seed)
+        self.started = time.time()
+        self.tokens = {}
+        self.lock = threading.Lock()
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self.thread = None
+
+    @property
+    def portal(self):
+        return self.host + "/portal.php"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counts(self):
+        with self.lock:
+            self.counts.clear()
+
+    def count(self, action, status):
+        with self.lock:
+            self.counts[action][status] += 1
+
+    def requests(self, action=None):
+        with self.lock:
+            if action:
+                return sum(self.counts.get(action, {}).values())
+            return sum(sum(c.values()) for c in self.counts.values())
+
+    def delay(self):
+        ms = self.options.latency
+        if self.options.jitter:
+            with self.lock:
+                ms += self.random.uniform(0, self.options.jitter)
+        if ms:
+            time.sleep(ms / 1000.0)
+
+    def in_storm(self):
+        every = self.options.storm_every
+        if not every or not self.options.storm_length:
+            return False
+        return (time.time() - self.started) % every < self.options.storm_length
+
+    def token_valid(self, headers):
+        auth = headers.get("Authorization") or ""
+        token = auth[7:] if auth.startswith("Bearer ") else ""
+        issued = self.tokens.get(token)
+        if issued is None:
+            return False
+        return not self.options.token_ttl or time.time() - issued < self.options.token_ttl
+
+    def route(self, path, query, headers):
+        if path.endswith("/c/") or path.endswith("/c/index.html"):
+            return 200, "<html><body>stalker</body></html>", "text/html"
+
+        if path.endswith("xpcom.common.js"):
+            return 200, "this.ajax_loader = this.portal_protocol+'://'+this.portal_ip+'/portal.php';\n", "application/javascript"
+
+        if path.endswith("version.js"):
+            return 200, "var ver = '5.3.1';\n", "application/javascript"
+
+        if self.options.xtream and path.endswith("player_api.php"):
+            return self.player_api(query)
+
+        if self.options.xtream and re.match(r"^/(live|movie|series)/{}/{}/\d+\.\w+$".format(xtream_username, xtream_password), path):
+            return 200, "stream", "video/mp2t"
+
+        if not path.endswith("portal.php"):
+            return 404, "not found", "text/plain"
+
+        if self.in_storm():
+            return 503, "Service Unavailable", "text/plain"
+
+        if self.options.error_rate:
+            with self.lock:
+                failed = self.random.random() < self.options.error_rate
+            if failed:
+                return 500, "Internal Server Error", "text/plain"
+
+        kind = query.get("type", "")
+        action = query.get("action", "")
+
+        if action == "handshake":
+            token = "".join(self.random.choice("ABCDEF0123456789") for _ in range(32))
+            with self.lock:
+                self.tokens[token] = time.time()
+            return 200, {"js": {"token": token, "random": "bench"}}, "application/json"
+
+        # real portals answer 200 with a plain text body when the token is missing or stale
+        if not self.token_valid(headers):
+            return 200, "Authorization failed.", "text/html"
+
+        return 200, self.api(kind, action, query), "application/json"
+
+    def api(self, kind, action, query):
+        catalog = self.catalog
+        page = int(query.get("p", 1) or 1)
+
+        if action == "get_profile":
+            return {"js": {"id": 1, "status": 0, "blocked": "0", "play_token": "bench", "mac": query.get("mac", "")}}
+
+        if kind == "account_info":
+            return {"js": {"mac": "", "phone": "", "end_date": "2030-01-01"}}
+
+        if kind == "itv" and action == "get_genres":
+            return {"js": [{"id": "*", "title": "All", "alias": "all", "censored": 0}] + catalog.genres}
+
+        if kind in ("vod", "series") and action == "get_categories":
+            return {"js": [{"id": "*", "title": "All", "alias": "all", "censored": 0}] + catalog.genres}
+
+        if kind == "itv" and action == "get_all_channels":
+            return {"js": {"total_items": len(catalog.channels), "data": catalog.channels}}
+
+        if kind == "itv" and action == "get_ordered_list":
+            genre = query.get("genre", "*")
+            items = catalog.channels if genre in ("*", "") else catalog.by_genre.get(genre, [])
+            return paged(items, page)
+
+        if kind in ("vod", "series") and action == "get_ordered_list":
+            movie_id = query.get("movie_id")
+            if kind == "series" and movie_id and movie_id != "0":
+                movie_id = movie_id.split(":")[0]
+                return paged(catalog.seasons(movie_id, self.options), page)
+
+            category = query.get("category", "*")
+            items = getattr(catalog, kind)
+            if category not in ("*", "", "0"):
+                items = catalog.by_category[kind].get(category, [])
+            return paged(items, page)
+
+        if kind == "itv" and action == "get_short_epg":
+            limit = int(query.get("size", query.get("limit", 10)) or 10)
+            return {"js": catalog.epg(query.get("ch_id", "0"), limit)}
+
+        if action == "create_link":
+            cmd = query.get("cmd", "")
+            if self.options.xtream:
+                stream = "live" if kind == "itv" else "movie"
+                stream_id = (re.findall(r"\d+", cmd) or ["0"])[0]
+                return {"js": {"id": cmd, "cmd": "ffmpeg {}/{}/{}/{}/{}.{}".format(
+                    self.host, stream, xtream_username, xtream_password, stream_id, "ts" if kind == "itv" else "mp4")}}
+            return {"js": {"id": cmd, "cmd": "ffmpeg {}/play/{}.ts?token=bench".format(self.host, abs(hash(cmd)) % 100000)}}
+
+        if kind == "watchdog":
+            return {"js": {"data": {"msgs": 0, "additional_services_on": "1"}}, "text": "ok"}
+
+        return {"js": []}
+
+    def player_api(self, query):
+        if query.get("username") != xtream_username or query.get("password") != xtream_password:
+            return 200, {"user_info": {"auth": 0}}, "application/json"
+
+        catalog = self.catalog
+        action = query.get("action", "")
+        category = query.get("category_id")
+
+        if not action:
+            return 200, {"user_info": {"auth": 1, "status": "Active", "exp_date": "1893456000", "is_trial": "0", "active_cons": "0",
+                                       "max_connections": "1", "created_at": "1704067200", "username": xtream_username}}, "application/json"
+
+        if action == "get_live_streams":
+            items = catalog.channels if not category else catalog.by_genre.get(category, [])
+            return 200, [{"num": int(item["number"]), "name": item["name"], "stream_id": int(item["id"]), "stream_icon": item["logo"],
+                          "epg_channel_id": item["xmltv_id"], "category_id": item["tv_genre_id"]} for item in items], "application/json"
+
+        if action in ("get_vod_streams", "get_series"):
+            kind = "vod" if action == "get_vod_streams" else "series"
+            items = getattr(catalog, kind) if not category else catalog.by_category[kind].get(category, [])
+            if kind == "vod":
+                return 200, [{"num": n + 1, "name": item["name"], "stream_id": int(item["id"]), "stream_icon": "", "added": "1704067200",
+                              "rating": item["rating_imdb"], "category_id": item["category_id"], "container_extension": "mp4"}
+                             for n, item in enumerate(items)], "application/json"
+            return 200, [{"num": n + 1, "name": item["name"], "series_id": int(item["id"]), "cover": "", "plot": item["description"],
+                          "cast": item["actors"], "director": item["director"], "genre": item["genres_str"], "releaseDate": item["year"],
+                          "last_modified": "1704067200", "rating": item["rating_imdb"], "category_id": item["category_id"], "backdrop_path": []}
+                         for n, item in enumerate(items)], "application/json"
+
+        return 200, [], "application/json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stalker portal simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8085)
+    defaults = Options()
+    for name in ("latency", "jitter", "error_rate", "storm_every", "storm_length", "token_ttl", "genres", "channels", "vod", "series", "seasons", "episodes", "seed"):
+        value = getattr(defaults, name)
+        parser.add_argument("--" + name.replace("_", "-"), type=type(value), default=value)
+    parser.add_argument("--xtream", action="store_true", help="front an Xtream panel (player_api.php, credentials in create_link)")
+    args = vars(parser.parse_args())
+
+    host = args.pop("host")
+    port = args.pop("port")
+    sim = PortalSimulator(host, port, **args)
+    print("portal simulator on {}/c/  (portal {})".format(sim.host, sim.portal))
+
+    try:
+        sim.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()